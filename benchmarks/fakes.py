@@ -0,0 +1,91 @@
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.llms import LLM
+from langchain_core.outputs import GenerationChunk
+from typing import Any, AsyncIterator, Iterator, List, Optional
+import numpy as np
+import asyncio
+import hashlib
+import re
+import time
+
+
+class FakeEmbeddings(Embeddings):
+    """Deterministic offline embeddings with configurable latency.
+
+    Texts are embedded by hashing their words into a fixed-size vector and
+    normalizing it, so related texts share dimensions and classification and
+    retrieval behave sensibly without a real model. Each call sleeps for
+    `call_latency_ms` plus `per_text_latency_ms` per text, which models a
+    batched backend: one round-trip cost plus a per-item cost.
+    """
+
+    def __init__(self, dimension: int = 384, call_latency_ms: float = 0.0, per_text_latency_ms: float = 0.0):
+        self.dimension = dimension
+        self.call_latency_ms = call_latency_ms
+        self.per_text_latency_ms = per_text_latency_ms
+        self.calls = 0
+        self.texts_embedded = 0
+
+    def _embed(self, text: str) -> List[float]:
+        vector = np.zeros(self.dimension, dtype=np.float32)
+        for word in re.findall(r"[a-z0-9]+", text.lower()):
+            digest = hashlib.md5(word.encode()).digest()
+            vector[int.from_bytes(digest[:4], 'little') % self.dimension] += 1.0
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def _wait(self, count: int):
+        self.calls += 1
+        self.texts_embedded += count
+        delay = self.call_latency_ms + self.per_text_latency_ms * count
+        if delay > 0:
+            time.sleep(delay / 1000.0)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self._wait(len(texts))
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        self._wait(1)
+        return self._embed(text)
+
+
+class FakeLLM(LLM):
+    """Offline LLM returning a fixed answer after a configurable delay.
+
+    `latency_ms` is the time to the first token and `token_latency_ms` the gap
+    between streamed tokens, so both full-generation time and time-to-first-
+    token can be modelled.
+    """
+
+    response: str = ("Please reset your password through the self-service portal "
+                     "and contact IT support if your account stays locked.")
+    latency_ms: float = 0.0
+    token_latency_ms: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-benchmark"
+
+    def _tokens(self) -> List[str]:
+        return re.findall(r"\S+\s*", self.response)
+
+    def _call(self, prompt: str, stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> str:
+        time.sleep((self.latency_ms + self.token_latency_ms * len(self._tokens())) / 1000.0)
+        return self.response
+
+    async def _acall(self, prompt: str, stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> str:
+        await asyncio.sleep((self.latency_ms + self.token_latency_ms * len(self._tokens())) / 1000.0)
+        return self.response
+
+    def _stream(self, prompt: str, stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> Iterator[GenerationChunk]:
+        time.sleep(self.latency_ms / 1000.0)
+        for token in self._tokens():
+            yield GenerationChunk(text=token)
+            time.sleep(self.token_latency_ms / 1000.0)
+
+    async def _astream(self, prompt: str, stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> AsyncIterator[GenerationChunk]:
+        await asyncio.sleep(self.latency_ms / 1000.0)
+        for token in self._tokens():
+            yield GenerationChunk(text=token)
+            await asyncio.sleep(self.token_latency_ms / 1000.0)
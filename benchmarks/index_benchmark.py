@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Recall versus latency of the knowledge index types
+
+Each index type from src/core/vector_index.py is built the way the knowledge
+agent builds it (trained on the first `train_size` vectors, then filled with
+all of them) and searched with the same queries. Recall@k is
+measured against exact flat search, next to build time, index size and
+per-query latency, for every nprobe / efSearch value in the sweep:
+
+    python -m benchmarks.index_benchmark --vectors 200000 --queries 500
+    python -m benchmarks.index_benchmark --input embeddings.npy --types ivf,ivfpq --nprobe 4,16,64
+
+Without --input, unit vectors are drawn around random cluster centres, which
+is closer to real sentence embeddings than uniform noise.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import faiss
+import numpy as np
+
+from benchmarks.run_benchmarks import RESULTS_DIR, peak_rss_mb, percentiles
+from src.core.vector_index import INDEX_TYPES, VectorIndexConfig, describe_index
+
+
+def synthetic_vectors(count: int, dimension: int, clusters: int, seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dimension)).astype(np.float32)
+    vectors = centers[rng.integers(clusters, size=count)]
+    vectors += 0.5 * rng.normal(size=vectors.shape).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def recall_at_k(found: np.ndarray, exact: np.ndarray) -> float:
+    k = exact.shape[1]
+    return float(np.mean([len(set(f) & set(e)) / k for f, e in zip(found, exact)]))
+
+
+def search_latencies(index: faiss.Index, queries: np.ndarray, k: int):
+    """Search one query at a time, as the knowledge agent does"""
+    samples, found = [], []
+    for query in queries:
+        start = time.perf_counter()
+        _, ids = index.search(query[None, :], k)
+        samples.append(time.perf_counter() - start)
+        found.append(ids[0])
+    return samples, np.array(found)
+
+
+def bench_index_type(config: VectorIndexConfig, vectors: np.ndarray, queries: np.ndarray,
+                     exact: np.ndarray, k: int, sweep: list) -> dict:
+    # Like KnowledgeAgent: trained types only see the first train_size vectors
+    train_size = config.train_size or len(vectors)
+    start = time.perf_counter()
+    index = config.build(vectors[:train_size])
+    trained = time.perf_counter()
+    index.add(vectors)
+    built = time.perf_counter()
+
+    result = {
+        "index": describe_index(index),
+        "trained_on": min(train_size, len(vectors)) if config.train_size else 0,
+        "train_seconds": round(trained - start, 3),
+        "add_seconds": round(built - trained, 3),
+        "size_mb": round(faiss.serialize_index(index).nbytes / (1024 * 1024), 2),
+        "search": []
+    }
+    # nprobe for IVF types, efSearch for HNSW, nothing to tune otherwise
+    parameter = {"ivf": "nprobe", "ivfpq": "nprobe", "hnsw": "ef_search"}.get(config.index_type)
+    for value in (sweep if parameter else [None]):
+        if parameter:
+            setattr(config, parameter, value)
+            config.configure(index)
+        samples, found = search_latencies(index, queries, k)
+        result["search"].append({
+            "parameter": parameter,
+            "value": value,
+            f"recall_at_{k}": round(recall_at_k(found, exact), 4),
+            "latency": percentiles(samples)
+        })
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Knowledge index recall versus latency")
+    parser.add_argument("--input", help=".npy file of embeddings to index instead of synthetic vectors")
+    parser.add_argument("--vectors", type=int, default=50000, help="synthetic vectors to index")
+    parser.add_argument("--dimension", type=int, default=384, help="synthetic vector dimension")
+    parser.add_argument("--clusters", type=int, default=500, help="synthetic topic clusters")
+    parser.add_argument("--queries", type=int, default=200, help="queries, held out from the indexed vectors")
+    parser.add_argument("--k", type=int, default=6, help="neighbours per query (the agent retrieves 6)")
+    parser.add_argument("--types", default=",".join(INDEX_TYPES), help="comma-separated index types")
+    parser.add_argument("--nprobe", default="1,4,8,16,64", help="nprobe values for ivf and ivfpq")
+    parser.add_argument("--ef-search", default="16,32,64,128", help="efSearch values for hnsw")
+    parser.add_argument("--nlist", type=int, default=0, help="IVF cells (0 = sqrt of the vector count)")
+    parser.add_argument("--pq-m", type=int, default=16, help="product-quantizer codes per vector")
+    parser.add_argument("--pq-bits", type=int, default=8, help="bits per product-quantizer code")
+    parser.add_argument("--train-size", type=int, default=50000,
+                        help="vectors trained types learn from (KNOWLEDGE_INDEX_TRAIN_SIZE)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="results file (default: benchmarks/results/index-<timestamp>.json)")
+    args = parser.parse_args()
+
+    if args.input:
+        data = np.load(args.input).astype(np.float32)
+    else:
+        data = synthetic_vectors(args.vectors + args.queries, args.dimension, args.clusters, args.seed)
+    vectors, queries = data[:-args.queries], data[-args.queries:]
+
+    exact_index = faiss.IndexFlatL2(vectors.shape[1])
+    exact_index.add(vectors)
+    _, exact = exact_index.search(queries, args.k)
+
+    results = {}
+    for index_type in args.types.split(","):
+        config = VectorIndexConfig(index_type, nlist=args.nlist, pq_m=args.pq_m, pq_bits=args.pq_bits)
+        config.train_sample = args.train_size
+        sweep = [int(v) for v in (args.ef_search if index_type == 'hnsw' else args.nprobe).split(",")]
+        results[index_type] = bench_index_type(config, vectors, queries, exact, args.k, sweep)
+        for point in results[index_type]["search"]:
+            setting = f"{point['parameter']}={point['value']}" if point["parameter"] else ""
+            print(f"{index_type:<6} {setting:<14} recall@{args.k}={point[f'recall_at_{args.k}']:.3f} "
+                  f"p50={point['latency']['p50_ms']}ms p95={point['latency']['p95_ms']}ms "
+                  f"size={results[index_type]['size_mb']}MB")
+
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "parameters": {**vars(args), "indexed": len(vectors), "dimension": vectors.shape[1]},
+        "results": results,
+        "peak_rss_mb": peak_rss_mb()
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"index-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults saved to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Offline performance benchmarks for the Help Desk System
+
+Every agent and the full workflow run against FakeEmbeddings and FakeLLM, so
+no network access or API key is needed and latency is controlled by flags.
+Results are written as JSON so runs can be compared for regressions:
+
+    python -m benchmarks.run_benchmarks --requests 200 --concurrency 1,8,32
+    python -m benchmarks.run_benchmarks --compare benchmarks/results/<earlier>.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fakes import FakeEmbeddings, FakeLLM
+from config.settings import Config
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+
+def percentiles(samples: list) -> dict:
+    """Latency summary in milliseconds"""
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+
+    def pick(q):
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000.0, 3)
+
+    return {
+        "count": len(ordered),
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000.0, 3),
+        "p50_ms": pick(0.50),
+        "p90_ms": pick(0.90),
+        "p95_ms": pick(0.95),
+        "p99_ms": pick(0.99),
+        "max_ms": round(ordered[-1] * 1000.0, 3)
+    }
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is reported in kilobytes on Linux
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0, 1)
+
+
+def load_requests(count: int) -> list:
+    with open(Config().test_requests_file, 'r') as f:
+        texts = [case['request'] for case in json.load(f)['test_requests']]
+    return [texts[i % len(texts)] for i in range(count)]
+
+
+def build_workflow(args, cache_dir: str):
+    from src.core.embeddings import EmbeddingService
+    from src.core.escalation_queue import EscalationQueue
+    from src.core.index_cache import IndexCache
+    from src.workflows.helpdesk_workflow import HelpDeskWorkflow
+
+    embeddings = FakeEmbeddings(
+        call_latency_ms=args.embed_latency_ms,
+        per_text_latency_ms=args.embed_per_text_ms
+    )
+    llm = FakeLLM(latency_ms=args.llm_latency_ms, token_latency_ms=args.llm_token_latency_ms)
+    return HelpDeskWorkflow(
+        EmbeddingService(model=embeddings, model_name='fake-hash-384'),
+        IndexCache(cache_dir),
+        llm=llm,
+        escalation_queue=EscalationQueue(os.path.join(cache_dir, 'escalations.db'))
+    )
+
+
+def bench_startup(args, cache_dir: str) -> dict:
+    # Module imports are timed on their own; must run before anything imports src
+    start = time.perf_counter()
+    import src.workflows.helpdesk_workflow  # noqa: F401
+    imports = time.perf_counter() - start
+
+    start = time.perf_counter()
+    build_workflow(args, cache_dir).close()
+    cold = time.perf_counter() - start
+
+    start = time.perf_counter()
+    build_workflow(args, cache_dir).close()
+    warm = time.perf_counter() - start
+
+    return {
+        "import_seconds": round(imports, 4),
+        "cold_index_cache_seconds": round(cold, 4),
+        "warm_index_cache_seconds": round(warm, 4)
+    }
+
+
+def bench_nodes(workflow, texts: list) -> dict:
+    """Time each agent on its own, always exercising its full code path"""
+    timings = {"classify": [], "check_escalation": [], "retrieve_knowledge": [], "generate_response": []}
+
+    for text in texts:
+        state = workflow._initial_state(text)
+
+        start = time.perf_counter()
+        workflow.classifier_agent.classify(state)
+        timings["classify"].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        workflow.escalation_agent.check_escalation(state)
+        timings["check_escalation"].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        workflow.knowledge_agent.retrieve_knowledge(state)
+        timings["retrieve_knowledge"].append(time.perf_counter() - start)
+
+        # Measure the LLM path even for tickets that would be escalated
+        state["escalate"] = False
+        start = time.perf_counter()
+        workflow.response_agent.generate_response(state)
+        timings["generate_response"].append(time.perf_counter() - start)
+
+    return {node: percentiles(samples) for node, samples in timings.items()}
+
+
+def bench_sequential(workflow, texts: list) -> dict:
+    latencies = []
+    for text in texts:
+        start = time.perf_counter()
+        workflow.process_request(text)
+        latencies.append(time.perf_counter() - start)
+    return percentiles(latencies)
+
+
+async def bench_concurrency(workflow, texts: list, concurrency: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def run(text):
+        async with semaphore:
+            start = time.perf_counter()
+            await workflow.aprocess_request(text)
+            latencies.append(time.perf_counter() - start)
+
+    coalesced_before = workflow.coalescer.coalesced
+    start = time.perf_counter()
+    await asyncio.gather(*[run(text) for text in texts])
+    elapsed = time.perf_counter() - start
+
+    return {
+        "concurrency": concurrency,
+        "throughput_rps": round(len(texts) / elapsed, 2),
+        "latency": percentiles(latencies),
+        # Requests answered by another request's run instead of their own
+        "coalesced": workflow.coalescer.coalesced - coalesced_before
+    }
+
+
+def flatten(results: dict, prefix: str = "") -> dict:
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{name}."))
+        elif isinstance(value, list):
+            for item in value:
+                if isinstance(item, dict) and "concurrency" in item:
+                    flat.update(flatten(item, f"{name}.c{item['concurrency']}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def compare(current: dict, baseline_file: str):
+    with open(baseline_file, 'r') as f:
+        baseline = flatten(json.load(f)["results"])
+    current = flatten(current)
+
+    print(f"\nComparison with {baseline_file}")
+    print("-" * 70)
+    for key in sorted(current):
+        if key in baseline and baseline[key] and not key.endswith(("count", "concurrency")):
+            change = (current[key] - baseline[key]) / baseline[key] * 100.0
+            print(f"{key:<50} {baseline[key]:>10} -> {current[key]:>10} ({change:+.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline Help Desk benchmarks")
+    parser.add_argument("--requests", type=int, default=100, help="requests per measurement")
+    parser.add_argument("--concurrency", default="1,8,32", help="comma-separated concurrency levels")
+    parser.add_argument("--embed-latency-ms", type=float, default=2.0, help="fake embedding latency per call")
+    parser.add_argument("--embed-per-text-ms", type=float, default=0.5, help="fake embedding latency per text")
+    parser.add_argument("--llm-latency-ms", type=float, default=200.0, help="fake LLM time to first token")
+    parser.add_argument("--llm-token-latency-ms", type=float, default=0.0, help="fake LLM delay between tokens")
+    parser.add_argument("--response-cache", action="store_true", help="keep the semantic response cache enabled")
+    parser.add_argument("--coalescing", action="store_true", help="keep request coalescing enabled")
+    parser.add_argument("--output", help="results file (default: benchmarks/results/benchmark-<timestamp>.json)")
+    parser.add_argument("--compare", metavar="BASELINE", help="print changes relative to an earlier results file")
+    args = parser.parse_args()
+
+    if not args.response_cache:
+        # Repeated benchmark texts would otherwise be served from the cache
+        os.environ['RESPONSE_CACHE_SIZE'] = '0'
+    if not args.coalescing:
+        # Concurrent copies of the same text would otherwise share one workflow run
+        os.environ['REQUEST_COALESCING'] = 'false'
+
+    texts = load_requests(args.requests)
+    levels = [int(level) for level in args.concurrency.split(",") if level]
+
+    # The workflow keeps its index cache and escalation queue in cache_dir, so
+    # every phase runs and the queue is flushed before the directory goes away
+    with tempfile.TemporaryDirectory() as cache_dir:
+        startup = bench_startup(args, cache_dir)
+        workflow = build_workflow(args, cache_dir)
+        try:
+            results = {
+                "startup": startup,
+                "nodes": bench_nodes(workflow, texts),
+                "workflow_sequential": bench_sequential(workflow, texts),
+                "workflow_concurrent": [asyncio.run(bench_concurrency(workflow, texts, level)) for level in levels],
+                "embedding": workflow.embedding_service.get_info(),
+                "coalescing": workflow.coalescer.get_stats(),
+                "peak_rss_mb": peak_rss_mb()
+            }
+        finally:
+            workflow.close()
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "parameters": vars(args),
+        "results": results
+    }
+
+    output = args.output or os.path.join(RESULTS_DIR, f"benchmark-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    print(json.dumps(results, indent=2))
+    print(f"\nResults saved to {output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -19,6 +19,15 @@ class Config:
         self.installation_guides_file = os.path.join(self.data_dir, 'installation_guides.json')
         self.policies_file = os.path.join(self.data_dir, 'company_it_policies.md')
         self.test_requests_file = os.path.join(self.data_dir, 'test_requests.json')
+        
+        # Seconds between knowledge file checks for hot reload (0 disables the watcher)
+        self.knowledge_reload_interval = float(os.getenv('KNOWLEDGE_RELOAD_INTERVAL', '0'))
+        # Send one query through the models and indexes before reporting ready
+        self.warm_up = os.getenv('WARM_UP', 'true').lower() == 'true'
+        # POST escalated tickets from the escalation queue to this URL
+        self.escalation_webhook_url = os.getenv('ESCALATION_WEBHOOK_URL')
+        # False in worker processes whose parent runs the dispatcher
+        self.escalation_dispatch = os.getenv('ESCALATION_DISPATCH', 'true').lower() == 'true'
     
     def validate(self) -> bool:
         """Validate configuration based on selected provider"""
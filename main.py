@@ -1,11 +1,43 @@
 from src.workflows.helpdesk_workflow import HelpDeskWorkflow
+from src.core.batch_processor import BatchProcessor, aiter_text_lines
+from src.core.help_desk_system import HelpDeskSystem
+import argparse
+import asyncio
 import os
+import sys
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
+def run_batch(input_path: str, output_path: str = None, chunk_size: int = None, concurrency: int = None):
+    """Stream a JSONL file of HelpDeskRequest records through the system"""
+    processor = BatchProcessor(HelpDeskSystem(), chunk_size=chunk_size, concurrency=concurrency)
+    
+    async def process(infile, outfile):
+        async for line in processor.process_lines(aiter_text_lines(infile)):
+            outfile.write(line)
+            outfile.flush()
+    
+    with open(input_path, 'r') as infile:
+        if output_path:
+            with open(output_path, 'w') as outfile:
+                asyncio.run(process(infile, outfile))
+        else:
+            asyncio.run(process(infile, sys.stdout))
+
 def main():
+    parser = argparse.ArgumentParser(description="Multi-Agent Help Desk System")
+    parser.add_argument("--batch", metavar="INPUT", help="process a JSONL file of requests instead of the interactive prompt")
+    parser.add_argument("--output", metavar="OUTPUT", help="write batch results to this JSONL file (default: stdout)")
+    parser.add_argument("--chunk-size", type=int, help="requests embedded and classified together (default: BATCH_CHUNK_SIZE or 64)")
+    parser.add_argument("--concurrency", type=int, help="requests in the LLM stage at once (default: BATCH_CONCURRENCY or 8)")
+    args = parser.parse_args()
+    
+    if args.batch:
+        run_batch(args.batch, args.output, args.chunk_size, args.concurrency)
+        return
+    
     # Initialize the multi-agent workflow
     helpdesk = HelpDeskWorkflow()
     
@@ -39,4 +71,4 @@ def main():
             print(f"Error processing request: {e}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -2,23 +2,24 @@
 """
 Simple script to run the Help Desk API server
 """
-import uvicorn
+import argparse
+import os
 from dotenv import load_dotenv
-from src.api.routes import create_app
+from src.api.serving import serve
 
 if __name__ == "__main__":
     load_dotenv()
-    
+
+    parser = argparse.ArgumentParser(description="Run the Help Desk API server")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", "1")),
+                        help="worker processes sharing one embedding model and memory-mapped indexes")
+    args = parser.parse_args()
+
     print("Starting Intelligent Help Desk System...")
-    print("API will be available at: http://localhost:8000")
-    print("API documentation at: http://localhost:8000/docs")
-    
-    app = create_app()
-    
-    uvicorn.run(
-        "src.api.routes:create_app",
-        host="0.0.0.0",
-        port=8000,
-        reload=True,
-        factory=True
-    )
\ No newline at end of file
+    print(f"API will be available at: http://localhost:{args.port}")
+    print(f"API documentation at: http://localhost:{args.port}/docs")
+
+    # Auto-reload only makes sense for a single development process
+    serve(args.host, args.port, workers=args.workers, reload=args.workers <= 1)
@@ -1,30 +1,49 @@
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
-from langchain_community.embeddings import HuggingFaceEmbeddings
 import os
+import random
 import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
+from langchain_core.documents import Document
+from typing import List, Optional, Tuple
 import json
-import os
-from ..core.state import HelpDeskState, ClassificationResult, RequestCategory
+from ..core.embeddings import EmbeddingService, get_query_embedding, aget_query_embedding
+from ..core.index_cache import IndexCache
+from ..core.state import HelpDeskState, CategoryScore, ClassificationResult, RequestCategory
+from .lexical_classifier import LexicalClassifier
+
+# Used for categories without a confidence_threshold in categories.json
+DEFAULT_CONFIDENCE_THRESHOLD = 0.3
+# Admission priority (lower is served first) for categories without one and
+# for tickets the lexical fast path can't place
+DEFAULT_PRIORITY = 4
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    # Zero vectors stay zero instead of turning into NaN
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
 
 class ClassifierAgent:
-    def __init__(self):
-        # Use Google embeddings if Gemini API key is available, otherwise HuggingFace
-        if os.getenv('GEMINI_API_KEY'):
-            self.embeddings = GoogleGenerativeAIEmbeddings(
-                model="models/embedding-001",
-                google_api_key=os.getenv('GEMINI_API_KEY')
-            )
-        else:
-            self.embeddings = HuggingFaceEmbeddings(model_name='all-MiniLM-L6-v2')
+    def __init__(self, embeddings: EmbeddingService, index_cache: IndexCache = None,
+                 documents: List[Document] = ()):
+        # Shared embedding service owned by the workflow
+        self.embeddings = embeddings
+        self.index_cache = index_cache or IndexCache()
+        # Number of scored categories reported with each classification
+        self.top_k = int(os.getenv('CLASSIFIER_TOP_K', '3'))
+        # Share of lexical hits that are also embedded to measure agreement
+        self.agreement_sample_rate = float(os.getenv('LEXICAL_AGREEMENT_SAMPLE_RATE', '0.05'))
         
         self.categories = self._load_categories()
         self.category_embeddings = None
         self._train()
+        self.lexical = self._build_lexical(documents)
+    
+    def _categories_file(self):
+        return os.path.join(os.path.dirname(__file__), '..', '..', 'data', 'categories.json')
     
     def _load_categories(self):
-        categories_file = os.path.join(os.path.dirname(__file__), '..', '..', 'data', 'categories.json')
-        with open(categories_file, 'r') as f:
+        with open(self._categories_file(), 'r') as f:
             return json.load(f)['categories']
     
     def _train(self):
@@ -36,25 +55,152 @@ class ClassifierAgent:
             category_texts.append(text)
             self.category_names.append(cat_name)
         
-        self.category_embeddings = self.embeddings.embed_documents(category_texts)
+        # Category vectors only change with categories.json or the embedding model
+        manifest = self.index_cache.fingerprint([self._categories_file()], self.embeddings.model_id)
+        category_embeddings = self.index_cache.load_array('categories', manifest)
+        if category_embeddings is None:
+            category_embeddings = self.embeddings.embed_documents(category_texts)
+            self.index_cache.save_array('categories', category_embeddings, manifest)
+        self.category_embeddings = category_embeddings
+        
+        # Unit-length rows, so cosine similarity for a batch is one matrix product
+        self.category_matrix = _normalize_rows(np.asarray(category_embeddings, dtype=np.float32))
+        self.category_enums = [RequestCategory(name) for name in self.category_names]
+        self.thresholds = np.array([
+            self.categories[name].get('confidence_threshold', DEFAULT_CONFIDENCE_THRESHOLD)
+            for name in self.category_names
+        ], dtype=np.float32)
+    
+    def _build_lexical(self, documents: List[Document]) -> Optional[LexicalClassifier]:
+        if os.getenv('LEXICAL_CLASSIFIER', 'true').lower() != 'true':
+            return None
+        return LexicalClassifier(
+            self.categories, documents,
+            min_margin=float(os.getenv('LEXICAL_MIN_MARGIN', '0.5')),
+            source_weight=float(os.getenv('LEXICAL_SOURCE_WEIGHT', '0.5'))
+        )
+    
+    def rebuild_lexical(self, documents: List[Document]):
+        """Pick up edited knowledge sections"""
+        if self.lexical is not None:
+            self.lexical.build(self.categories, documents)
+    
+    def classify_lexical(self, request: str, record: bool = True) -> Optional[ClassificationResult]:
+        """Keyword fast path; None when the embedding classifier has to decide"""
+        if self.lexical is None:
+            return None
+        return self.lexical.classify(request, self.top_k, record)
+    
+    def admission_priority(self, request: str) -> Tuple[int, str]:
+        """(priority, category) from the lexical fast path, without the embedding model.
+        
+        Not counted in the fast-path statistics; the workflow counts the ticket
+        when it classifies it.
+        """
+        classification = self.classify_lexical(request, record=False)
+        if classification is None:
+            return DEFAULT_PRIORITY, "unclassified"
+        category = classification.category.value
+        return self.categories.get(category, {}).get('priority', DEFAULT_PRIORITY), category
+    
+    def _wants_agreement_sample(self, classification: ClassificationResult) -> bool:
+        return classification.method == "lexical" and random.random() < self.agreement_sample_rate
     
     def classify(self, state: HelpDeskState) -> HelpDeskState:
-        request = state["request"]
-        request_embedding = self.embeddings.embed_query(request)
-        similarities = cosine_similarity([request_embedding], self.category_embeddings)[0]
+        # Batch mode classifies ahead of the graph and pre-fills the state
+        if state.get("classification") is None:
+            classification = self.classify_lexical(state["request"])
+            if classification is None:
+                # Embed the request once; retrieval and escalation reuse this vector
+                request_embedding = get_query_embedding(state, self.embeddings)
+                classification = self.classify_batch([request_embedding])[0]
+            elif self._wants_agreement_sample(classification):
+                get_query_embedding(state, self.embeddings)
+            state["classification"] = self._continue_session(state, classification)
+        
+        state["next_action"] = "check_escalation"
+        return state
+    
+    async def aclassify(self, state: HelpDeskState) -> HelpDeskState:
+        if state.get("classification") is None:
+            classification = self.classify_lexical(state["request"])
+            if classification is None:
+                request_embedding = await aget_query_embedding(state, self.embeddings)
+                classification = self.classify_batch([request_embedding])[0]
+            elif self._wants_agreement_sample(classification):
+                await aget_query_embedding(state, self.embeddings)
+            state["classification"] = self._continue_session(state, classification)
         
-        best_match_idx = np.argmax(similarities)
-        confidence = similarities[best_match_idx]
+        state["next_action"] = "check_escalation"
+        return state
+    
+    def _continue_session(self, state: HelpDeskState, classification: ClassificationResult) -> ClassificationResult:
+        """Decide whether the ticket follows up on the user's previous one.
+        
+        A ticket in the previous category continues the session, and so does
+        one the embedding classifier can only file under general ("that
+        didn't work, still locked out"), which keeps the previous category.
+        Anything else starts a new topic and the session is dropped from the
+        state.
+        """
+        session = state.get("session")
+        if session is None:
+            return classification
+        previous = session.classification
+        if classification.category == previous.category:
+            return classification
+        if classification.method == "embedding" and classification.category == RequestCategory.GENERAL:
+            return previous.model_copy(update={"method": "session"})
+        state["session"] = None
+        return classification
+    
+    def record_agreement(self, state: HelpDeskState):
+        """Compare a lexical classification with the embedding classifier.
         
-        # Use general category for low confidence classifications
-        if confidence < 0.3:
-            category = RequestCategory('general')
-        else:
-            category = RequestCategory(self.category_names[best_match_idx])
+        Runs after the workflow: tickets answered by the LLM were embedded
+        for retrieval anyway, and a sample of the others was embedded during
+        classification, so the check costs no extra model call.
+        """
+        classification = state.get("classification")
+        if self.lexical is None or classification is None or classification.method != "lexical":
+            return
+        if state.get("query_embedding") is not None:
+            self.lexical.record_agreement(classification, self.classify_batch([state["query_embedding"]])[0])
+    
+    def score_batch(self, request_embeddings) -> np.ndarray:
+        """Cosine similarity of each request (rows) to each category (columns)"""
+        requests = _normalize_rows(np.asarray(request_embeddings, dtype=np.float32))
+        return requests @ self.category_matrix.T
+    
+    def classify_batch(self, request_embeddings, top_k: int = None) -> List[ClassificationResult]:
+        """Classify many request vectors with one matrix multiply"""
+        top_k = min(top_k or self.top_k, len(self.category_names))
+        similarities = self.score_batch(request_embeddings)
         
-        classification = ClassificationResult(category=category, confidence=float(confidence))
+        # Top-k per row without sorting every category
+        top = np.argpartition(-similarities, top_k - 1, axis=1)[:, :top_k]
+        top_scores = np.take_along_axis(similarities, top, axis=1)
+        order = np.argsort(-top_scores, axis=1)
+        top = np.take_along_axis(top, order, axis=1)
+        top_scores = np.take_along_axis(top_scores, order, axis=1)
         
-        state["classification"] = classification
-        state["next_action"] = "retrieve_knowledge"
+        classifications = []
+        for idxs, scores in zip(top.tolist(), top_scores.tolist()):
+            best_match_idx, confidence = idxs[0], scores[0]
+            
+            # Use general category for low confidence classifications
+            if confidence < self.thresholds[best_match_idx]:
+                category = RequestCategory.GENERAL
+            else:
+                category = self.category_enums[best_match_idx]
+            
+            classifications.append(ClassificationResult(
+                category=category,
+                confidence=confidence,
+                top_categories=[
+                    CategoryScore(category=self.category_enums[idx], score=score)
+                    for idx, score in zip(idxs, scores)
+                ]
+            ))
         
-        return state
\ No newline at end of file
+        return classifications
@@ -1,81 +1,173 @@
-from langchain.vectorstores import FAISS
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
-from langchain_community.embeddings import HuggingFaceEmbeddings
-from langchain.schema import Document
+import numpy as np
+from typing import Dict, List, NamedTuple, Optional, Pattern
 import json
 import os
-from ..core.state import HelpDeskState
+import re
+import threading
+from ..core.embeddings import EmbeddingService, get_query_embedding, aget_query_embedding
+from ..core.index_cache import IndexCache
+from ..core.state import HelpDeskState, RequestCategory
+from .classifier_agent import DEFAULT_CONFIDENCE_THRESHOLD
+
+# Cosine similarity a request needs to a trigger phrase; for normalized
+# vectors this is the former FAISS squared-L2 distance limit of 0.4
+DEFAULT_TRIGGER_SIMILARITY = 0.8
+
+
+class CategoryRules(NamedTuple):
+    always_escalate: bool
+    # Keywords and regexes from categories.json, compiled into one pattern
+    pattern: Optional[Pattern]
+    # Unit-length trigger phrase vectors, one row per phrase
+    trigger_vectors: Optional[np.ndarray]
+    trigger_similarity: float
+    # Classifications less confident than this go to a human
+    confidence_threshold: float
+
 
 class EscalationAgent:
-    def __init__(self):
-        # Use Google embeddings if Gemini API key is available, otherwise HuggingFace
-        if os.getenv('GEMINI_API_KEY'):
-            self.embeddings = GoogleGenerativeAIEmbeddings(
-                model="models/embedding-001",
-                google_api_key=os.getenv('GEMINI_API_KEY')
-            )
-        else:
-            self.embeddings = HuggingFaceEmbeddings(model_name='all-MiniLM-L6-v2')
-        
+    """Escalation rules compiled per category from categories.json.
+
+    A category escalates when it is marked `always_escalate`, when the
+    request matches one of its `escalation_keywords` or `escalation_patterns`
+    (no embedding needed), when the request vector is close to one of its
+    `escalation_triggers` phrases, which is one small matrix-vector product,
+    or when the classification is less confident than its
+    `confidence_threshold`. Rules are swapped in as a whole by `reload_rules`.
+    """
+
+    def __init__(self, embeddings: EmbeddingService, index_cache: IndexCache = None):
+        # Shared embedding service owned by the workflow
+        self.embeddings = embeddings
+        self.index_cache = index_cache or IndexCache()
+
+        self._reload_lock = threading.Lock()
         self.categories = self._load_categories()
-        self.escalation_vectorstore = self._build_escalation_vectorstore()
-    
+        self.rules = self._compile_rules(self.categories)
+
+    @property
+    def auto_escalate_categories(self) -> set:
+        return {category for category, rules in self.rules.items() if rules.always_escalate}
+
+    def _categories_file(self):
+        return os.path.join(os.path.dirname(__file__), '..', '..', 'data', 'categories.json')
+
     def _load_categories(self):
-        categories_file = os.path.join(os.path.dirname(__file__), '..', '..', 'data', 'categories.json')
-        with open(categories_file, 'r') as f:
+        with open(self._categories_file(), 'r') as f:
             return json.load(f)['categories']
-    
-    def _build_escalation_vectorstore(self):
-        escalation_docs = [
-            Document(page_content="multiple failed resets account security concerns", 
-                    metadata={'type': 'password_reset', 'category': 'password_reset'}),
-            Document(page_content="unapproved software requests system compatibility issues", 
-                    metadata={'type': 'software_installation', 'category': 'software_installation'}),
-            Document(page_content="all hardware failures require escalation", 
-                    metadata={'type': 'hardware_failure', 'category': 'hardware_failure'}),
-            Document(page_content="network infrastructure issues multiple users affected", 
-                    metadata={'type': 'network_connectivity', 'category': 'network_connectivity'}),
-            Document(page_content="server configuration changes distribution list modifications", 
-                    metadata={'type': 'email_configuration', 'category': 'email_configuration'}),
-            Document(page_content="all security incidents require immediate escalation", 
-                    metadata={'type': 'security_incident', 'category': 'security_incident'}),
-            Document(page_content="policy clarification needed exception requests", 
-                    metadata={'type': 'policy_question', 'category': 'policy_question'})
+
+    def _compile_rules(self, categories: dict) -> Dict[RequestCategory, CategoryRules]:
+        # Trigger phrases of categories that always escalate are never compared
+        trigger_texts = [
+            (name, trigger)
+            for name, info in categories.items() if not info.get('always_escalate', False)
+            for trigger in info.get('escalation_triggers', [])
         ]
-        return FAISS.from_documents(escalation_docs, self.embeddings)
-    
+        vectors = self._trigger_vectors([trigger for _, trigger in trigger_texts])
+
+        rules = {}
+        for name, info in categories.items():
+            expressions = [rf"\b{re.escape(keyword)}\b" for keyword in info.get('escalation_keywords', [])]
+            expressions += info.get('escalation_patterns', [])
+            rows = [i for i, (category, _) in enumerate(trigger_texts) if category == name]
+            rules[RequestCategory(name)] = CategoryRules(
+                always_escalate=info.get('always_escalate', False),
+                pattern=re.compile("|".join(f"(?:{e})" for e in expressions), re.IGNORECASE) if expressions else None,
+                trigger_vectors=vectors[rows] if rows else None,
+                trigger_similarity=info.get('trigger_similarity', DEFAULT_TRIGGER_SIMILARITY),
+                confidence_threshold=info.get('confidence_threshold', DEFAULT_CONFIDENCE_THRESHOLD)
+            )
+        return rules
+
+    def _trigger_vectors(self, triggers: List[str]) -> np.ndarray:
+        if not triggers:
+            return np.zeros((0, 0), dtype=np.float32)
+        # Trigger vectors only change with the phrases or the embedding model
+        manifest = self.index_cache.fingerprint([], self.embeddings.model_id, extra=triggers)
+        vectors = self.index_cache.load_array('escalation_triggers', manifest)
+        if vectors is None:
+            vectors = self.embeddings.embed_documents(triggers)
+            self.index_cache.save_array('escalation_triggers', vectors, manifest)
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def reload_rules(self) -> dict:
+        """Recompile the rules from categories.json and swap them in"""
+        with self._reload_lock:
+            categories = self._load_categories()
+            rules = self._compile_rules(categories)
+            self.categories = categories
+            self.rules = rules
+        return {
+            "categories": len(rules),
+            "always_escalate": sorted(category.value for category in self.auto_escalate_categories),
+            "trigger_phrases": sum(len(r.trigger_vectors) for r in rules.values() if r.trigger_vectors is not None)
+        }
+
     def check_escalation(self, state: HelpDeskState) -> HelpDeskState:
-        request = state["request"]
-        classification = state["classification"]
-        
-        # Always escalate certain categories
-        if classification.category in ['security_incident', 'hardware_failure', 'general']:
-            state["escalate"] = True
-            state["escalation_reason"] = f"{classification.category.value} requires automatic escalation"
-            state["next_action"] = "generate_response"
+        rules = self.rules.get(state["classification"].category)
+        if self._apply_static_rules(state, rules):
             return state
-        
-        # Check vector similarity for escalation triggers
-        similar_docs = self.escalation_vectorstore.similarity_search_with_score(request, k=3)
-        for doc, score in similar_docs:
-            if score < 0.4:
-                doc_category = doc.metadata.get('category')
-                if doc_category == classification.category.value:
-                    escalation_type = doc.metadata['type']
-                    state["escalate"] = True
-                    state["escalation_reason"] = f"{escalation_type.replace('_', ' ').title()} escalation detected"
-                    state["next_action"] = "generate_response"
-                    return state
-        
-        # Low confidence classification
-        if classification.confidence < 0.3:
-            state["escalate"] = True
-            state["escalation_reason"] = "Low confidence in classification - human review needed"
-            state["next_action"] = "generate_response"
+
+        matched = False
+        if rules is not None and rules.trigger_vectors is not None:
+            matched = self._near_trigger(rules, get_query_embedding(state, self.embeddings))
+        return self._apply_trigger_match(state, rules, matched)
+
+    async def acheck_escalation(self, state: HelpDeskState) -> HelpDeskState:
+        rules = self.rules.get(state["classification"].category)
+        if self._apply_static_rules(state, rules):
             return state
-        
+
+        matched = False
+        if rules is not None and rules.trigger_vectors is not None:
+            matched = self._near_trigger(rules, await aget_query_embedding(state, self.embeddings))
+        return self._apply_trigger_match(state, rules, matched)
+
+    def _near_trigger(self, rules: CategoryRules, query_embedding) -> bool:
+        query = np.asarray(query_embedding, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm == 0:
+            return False
+        return float(np.max(rules.trigger_vectors @ query)) / norm > rules.trigger_similarity
+
+    def _escalate(self, state: HelpDeskState, reason: str) -> HelpDeskState:
+        state["escalate"] = True
+        state["escalation_reason"] = reason
+        state["next_action"] = "generate_response"
+        return state
+
+    def _apply_static_rules(self, state: HelpDeskState, rules: Optional[CategoryRules]) -> bool:
+        """Rules decided without the request vector; True when the ticket escalated"""
+        if rules is None:
+            return False
+        category = state["classification"].category
+
+        # Always escalate certain categories
+        if rules.always_escalate:
+            self._escalate(state, f"{category.value} requires automatic escalation")
+            return True
+        if rules.pattern is not None and rules.pattern.search(state["request"]):
+            self._escalate(state, f"{category.value.replace('_', ' ').title()} escalation detected")
+            return True
+        return False
+
+    def _apply_trigger_match(self, state: HelpDeskState, rules: Optional[CategoryRules], matched: bool) -> HelpDeskState:
+        classification = state["classification"]
+
+        if matched:
+            return self._escalate(state, f"{classification.category.value.replace('_', ' ').title()} escalation detected")
+
+        # Low confidence classification
+        threshold = rules.confidence_threshold if rules is not None else DEFAULT_CONFIDENCE_THRESHOLD
+        if classification.confidence < threshold:
+            return self._escalate(state, "Low confidence in classification - human review needed")
+
+        # Only tickets answered by the LLM need knowledge retrieval
         state["escalate"] = False
         state["escalation_reason"] = None
-        state["next_action"] = "generate_response"
-        
-        return state
\ No newline at end of file
+        state["next_action"] = "retrieve_knowledge"
+
+        return state
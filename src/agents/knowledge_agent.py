@@ -1,91 +1,298 @@
-from langchain.vectorstores import FAISS
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
-from langchain_community.embeddings import HuggingFaceEmbeddings
-from langchain.schema import Document
+from langchain_community.vectorstores import FAISS
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_core.documents import Document
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+import numpy as np
+import hashlib
 import json
 import os
+import threading
+from ..core.embeddings import EmbeddingService, get_query_embedding, aget_query_embedding
+from ..core.index_cache import IndexCache
+from ..core.ingestion import (ChunkEmbedder, IngestionProgress, VectorSpool, chunked, load_source,
+                              markdown_sections)
 from ..core.state import HelpDeskState, KnowledgeItem
+from ..core.text import split_sentences
+from ..core.vector_index import VectorIndexConfig, describe_index
+
+def _section_key(doc: Document) -> str:
+    # A section is re-embedded only when its source or content changes
+    return hashlib.sha256(f"{doc.metadata['source']}\n{doc.page_content}".encode()).hexdigest()
+
 
 class KnowledgeAgent:
-    def __init__(self):
-        # Use Google embeddings if Gemini API key is available, otherwise HuggingFace
-        if os.getenv('GEMINI_API_KEY'):
-            self.embeddings = GoogleGenerativeAIEmbeddings(
-                model="models/embedding-001",
-                google_api_key=os.getenv('GEMINI_API_KEY')
-            )
+    def __init__(self, embeddings: EmbeddingService, index_cache: IndexCache = None, data_dir: str = None,
+                 index_config: VectorIndexConfig = None):
+        # Shared embedding service owned by the workflow
+        self.embeddings = embeddings
+        self.index_cache = index_cache or IndexCache()
+        # FAISS index type (flat, ivf, hnsw, ivfpq, sq8) and its parameters
+        self.index_config = index_config or VectorIndexConfig()
+        
+        self.data_dir = data_dir or os.path.join(os.path.dirname(__file__), '..', '..', 'data')
+        # Extra .md, .json or .jsonl corpora, e.g. exported ticket history
+        self.extra_sources = [
+            os.path.join(self.data_dir, path.strip())
+            for path in os.getenv('KNOWLEDGE_SOURCES', '').split(',') if path.strip()
+        ]
+        # Longer sections are indexed as passages of at most this many characters (0 keeps whole sections)
+        self.passage_chars = int(os.getenv('KNOWLEDGE_PASSAGE_CHARS', '800'))
+        # Passages are embedded and added to the index this many at a time
+        self.chunk_size = int(os.getenv('KNOWLEDGE_INGEST_CHUNK_SIZE', '256'))
+        workers = int(os.getenv('KNOWLEDGE_INGEST_WORKERS', '0')) or min(4, os.cpu_count() or 1)
+        self.embedder = ChunkEmbedder(self.embeddings.embed_documents, self.embeddings.model_factory(), workers)
+        # Weight of the previous ticket's vector and items when retrieving for a follow-up
+        self.session_weight = float(os.getenv('SESSION_CONTEXT_WEIGHT', '0.5'))
+        self.last_ingestion = None
+        self._reload_lock = threading.Lock()
+        self.vectorstore = self._load_or_build_vectorstore()
+    
+    def _source_files(self):
+        return [
+            os.path.join(self.data_dir, 'knowledge_base.md'),
+            os.path.join(self.data_dir, 'troubleshooting_database.json'),
+            os.path.join(self.data_dir, 'installation_guides.json'),
+            os.path.join(self.data_dir, 'company_it_policies.md')
+        ] + self.extra_sources
+    
+    def _manifest(self) -> dict:
+        return self.index_cache.fingerprint(
+            self._source_files(), self.embeddings.model_id,
+            extra={"passage_chars": self.passage_chars, "index": self.index_config.build_params()}
+        )
+    
+    def _load_or_build_vectorstore(self):
+        # Reuse the on-disk index unless a source file or the embedding model changed
+        manifest = self._manifest()
+        # Identifies the knowledge base content; answers cached against an
+        # older version are discarded
+        self.version = self.index_cache.digest(manifest)
+        self._manifest_loaded = manifest
+        vectorstore = self.index_cache.load_faiss('knowledge', manifest, self.embeddings)
+        if vectorstore is None:
+            vectorstore, exact, _ = self._build_vectorstore(self.iter_documents())
+            self._save_vectorstore(vectorstore, exact, manifest)
         else:
-            self.embeddings = HuggingFaceEmbeddings(model_name='all-MiniLM-L6-v2')
+            self.index_config.configure(vectorstore.index)
+        return vectorstore
+    
+    def reload(self) -> dict:
+        """Re-read the source files and swap in an updated index.
         
-        self.vectorstore = self._build_vectorstore()
+        Only sections whose content changed are embedded again. The new index
+        is built next to the live one and replaces it with a single reference
+        assignment, so requests already searching the old index finish on it.
+        """
+        with self._reload_lock:
+            manifest = self._manifest()
+            version = self.index_cache.digest(manifest)
+            if version == self.version:
+                return {"reloaded": False, "version": self.version}
+            
+            known, fetch = self._reusable_vectors()
+            vectorstore, exact, reused_keys = self._build_vectorstore(self.iter_documents(), known, fetch)
+            progress = self.last_ingestion
+            
+            self.vectorstore = vectorstore
+            self.version = version
+            self._manifest_loaded = manifest
+            self._save_vectorstore(vectorstore, exact, manifest)
+            
+            return {
+                "reloaded": True,
+                "version": version,
+                "sections": progress["documents"],
+                "passages": progress["passages"],
+                "embedded": progress["embedded"],
+                "reused": progress["passages"] - progress["embedded"],
+                "removed": len(known) - len(reused_keys)
+            }
     
-    def _build_vectorstore(self):
-        documents = []
-        data_dir = os.path.join(os.path.dirname(__file__), '..', '..', 'data')
+    def _position_keys(self, vectorstore: FAISS) -> Dict[int, str]:
+        return {
+            position: _section_key(vectorstore.docstore.search(docstore_id))
+            for position, docstore_id in vectorstore.index_to_docstore_id.items()
+        }
+    
+    def _reusable_vectors(self) -> Tuple[Dict[str, int], Callable[[List[int]], np.ndarray]]:
+        """Passage key -> position in the live index, and a function fetching vectors by position"""
+        vectorstore = self.vectorstore
+        known = {key: position for position, key in self._position_keys(vectorstore).items()}
+        exact = None
+        if self.index_config.lossy:
+            # Compressed codes only approximate the vectors; the exact ones are kept next to them
+            exact = self.index_cache.load_array('knowledge_vectors', self._manifest_loaded, mmap=True)
+        if exact is not None:
+            return known, lambda positions: np.asarray(exact[positions], dtype=np.float32)
+        return known, lambda positions: vectorstore.index.reconstruct_batch(np.asarray(positions, dtype=np.int64))
+    
+    def _save_vectorstore(self, vectorstore: FAISS, exact: Optional[VectorSpool], manifest: dict):
+        self.index_cache.save_faiss('knowledge', vectorstore, manifest)
+        if exact is not None:
+            self.index_cache.save_array('knowledge_vectors', exact.array(), manifest)
+            exact.close()
+    
+    def _split_passages(self, documents: Iterable[Document]) -> Iterator[Document]:
+        """Split long sections at sentence boundaries into passages of at most passage_chars"""
+        for doc in documents:
+            if self.passage_chars <= 0 or len(doc.page_content) <= self.passage_chars:
+                yield doc
+                continue
+            
+            chunks, current = [], []
+            for sentence in split_sentences(doc.page_content):
+                if current and len("\n".join(current + [sentence])) > self.passage_chars:
+                    chunks.append("\n".join(current))
+                    current = []
+                current.append(sentence)
+            if current:
+                chunks.append("\n".join(current))
+            
+            for index, chunk in enumerate(chunks):
+                yield Document(page_content=chunk, metadata={**doc.metadata, 'passage': index})
+    
+    def _build_vectorstore(self, documents: Iterable[Document], known: Dict[str, int] = None,
+                           fetch: Callable[[List[int]], np.ndarray] = None):
+        """Stream the passages of documents into a new index, chunk by chunk.
+        
+        Passages whose key is in `known` reuse the vector `fetch` returns for
+        it; the others are embedded. Trained index types buffer the first
+        `train_size` vectors to train on, every other chunk is added as soon
+        as it is embedded. Returns the store, the exact vectors spooled to
+        disk for lossy index types (else None) and the reused keys.
+        """
+        known = known or {}
+        progress = IngestionProgress("Knowledge ingestion")
+        exact = VectorSpool() if self.index_config.lossy and self.index_cache.enabled else None
+        reused_keys = set()
+        vectorstore, untrained = None, []
+        
+        def chunks():
+            passages = self._split_passages(progress.count_documents(documents))
+            for docs in chunked(passages, self.chunk_size):
+                keys = [_section_key(doc) for doc in docs]
+                missing = [i for i, key in enumerate(keys) if key not in known]
+                yield (docs, keys, missing), [docs[i].page_content for i in missing]
+        
+        try:
+            for (docs, keys, missing), embedded in self.embedder.map(chunks()):
+                reused = [i for i, key in enumerate(keys) if key in known]
+                vectors = None
+                if missing:
+                    vectors = np.empty((len(docs), embedded.shape[1]), dtype=np.float32)
+                    vectors[missing] = embedded
+                if reused:
+                    reused_vectors = fetch([known[keys[i]] for i in reused])
+                    if vectors is None:
+                        vectors = np.empty((len(docs), reused_vectors.shape[1]), dtype=np.float32)
+                    vectors[reused] = reused_vectors
+                    reused_keys.update(keys[i] for i in reused)
+                
+                if exact is not None:
+                    exact.append(vectors)
+                progress.update(len(docs), len(missing))
+                if vectorstore is not None:
+                    self._add_passages(vectorstore, docs, vectors)
+                    continue
+                
+                untrained.append((docs, vectors))
+                if sum(len(chunk) for chunk, _ in untrained) >= self.index_config.train_size:
+                    vectorstore = self._flush_untrained(untrained)
+                    untrained = []
+        finally:
+            # The worker processes each hold a model copy; they are not kept between builds
+            self.embedder.close()
+        
+        if vectorstore is None:
+            if not untrained:
+                raise ValueError("No knowledge documents to index")
+            vectorstore = self._flush_untrained(untrained)
+        self.last_ingestion = progress.as_dict()
+        return vectorstore, exact, reused_keys
+    
+    def _flush_untrained(self, untrained: list) -> FAISS:
+        # Trained index types learn their cells or codebooks from these vectors
+        index = self.index_config.build(np.concatenate([vectors for _, vectors in untrained]))
+        vectorstore = FAISS(self.embeddings, index, InMemoryDocstore(), {})
+        for docs, vectors in untrained:
+            self._add_passages(vectorstore, docs, vectors)
+        return vectorstore
+    
+    def _add_passages(self, vectorstore: FAISS, docs: List[Document], vectors: np.ndarray):
+        vectorstore.add_embeddings(
+            zip([doc.page_content for doc in docs], vectors),
+            metadatas=[doc.metadata for doc in docs]
+        )
+    
+    def iter_documents(self) -> Iterator[Document]:
+        """Every document to index: the curated data files, then KNOWLEDGE_SOURCES"""
+        yield from self._curated_documents()
+        for path in self.extra_sources:
+            yield from load_source(path)
+    
+    def load_documents(self) -> List[Document]:
+        """The curated knowledge sections, e.g. for the lexical classifier"""
+        return list(self._curated_documents())
+    
+    def _curated_documents(self) -> Iterator[Document]:
+        data_dir = self.data_dir
         
         # Load knowledge base
-        kb_file = os.path.join(data_dir, 'knowledge_base.md')
-        with open(kb_file, 'r') as f:
-            content = f.read()
-            sections = content.split('## ')
-            for section in sections[1:]:
-                title = section.split('\n')[0]
-                body = '\n'.join(section.split('\n')[1:])
-                doc = Document(
-                    page_content=body.strip(),
-                    metadata={'source': f'knowledge_base.md#{title}'}
-                )
-                documents.append(doc)
+        yield from markdown_sections(os.path.join(data_dir, 'knowledge_base.md'))
         
         # Load troubleshooting database
         ts_file = os.path.join(data_dir, 'troubleshooting_database.json')
         with open(ts_file, 'r') as f:
             troubleshooting = json.load(f)
-            for key, item in troubleshooting['troubleshooting_steps'].items():
-                content = f"Steps: {' '.join(item['steps'])}"
-                doc = Document(
-                    page_content=content,
-                    metadata={'source': f'troubleshooting_database.json#{key}'}
-                )
-                documents.append(doc)
+        for key, item in troubleshooting['troubleshooting_steps'].items():
+            content = f"Steps: {' '.join(item['steps'])}"
+            yield Document(
+                page_content=content,
+                metadata={'source': f'troubleshooting_database.json#{key}'}
+            )
         
         # Load installation guides
         install_file = os.path.join(data_dir, 'installation_guides.json')
         with open(install_file, 'r') as f:
             guides = json.load(f)
-            for software, guide in guides['software_guides'].items():
-                content = f"Title: {guide['title']}\nSteps: {' '.join(guide['steps'])}"
-                if 'common_issues' in guide:
-                    issues = ' '.join([f"{issue['issue']}: {issue['solution']}" for issue in guide['common_issues']])
-                    content += f"\nCommon Issues: {issues}"
-                doc = Document(
-                    page_content=content,
-                    metadata={'source': f'installation_guides.json#{software}'}
-                )
-                documents.append(doc)
+        for software, guide in guides['software_guides'].items():
+            content = f"Title: {guide['title']}\nSteps: {' '.join(guide['steps'])}"
+            if 'common_issues' in guide:
+                issues = ' '.join([f"{issue['issue']}: {issue['solution']}" for issue in guide['common_issues']])
+                content += f"\nCommon Issues: {issues}"
+            yield Document(
+                page_content=content,
+                metadata={'source': f'installation_guides.json#{software}'}
+            )
         
         # Load company IT policies
-        policies_file = os.path.join(data_dir, 'company_it_policies.md')
-        with open(policies_file, 'r') as f:
-            content = f.read()
-            sections = content.split('## ')
-            for section in sections[1:]:
-                title = section.split('\n')[0]
-                body = '\n'.join(section.split('\n')[1:])
-                doc = Document(
-                    page_content=body.strip(),
-                    metadata={'source': f'company_it_policies.md#{title}'}
-                )
-                documents.append(doc)
-        
-        return FAISS.from_documents(documents, self.embeddings)
+        yield from markdown_sections(os.path.join(data_dir, 'company_it_policies.md'))
     
     def retrieve_knowledge(self, state: HelpDeskState) -> HelpDeskState:
-        request = state["request"]
+        query_embedding = self._search_vector(state, get_query_embedding(state, self.embeddings))
         
         # Get similar documents
-        docs = self.vectorstore.similarity_search_with_score(request, k=6)
-        
+        docs = self.vectorstore.similarity_search_with_score_by_vector(query_embedding, k=6)
+        return self._apply_results(state, docs)
+    
+    async def aretrieve_knowledge(self, state: HelpDeskState) -> HelpDeskState:
+        query_embedding = self._search_vector(state, await aget_query_embedding(state, self.embeddings))
+        docs = await self.vectorstore.asimilarity_search_with_score_by_vector(query_embedding, k=6)
+        return self._apply_results(state, docs)
+    
+    def _search_vector(self, state: HelpDeskState, query_embedding: List[float]) -> List[float]:
+        # A follow-up searches with its own vector pulled towards the previous ticket's
+        session = state.get("session")
+        if session is None or session.query_embedding is None:
+            return query_embedding
+        vector = np.asarray(query_embedding, dtype=np.float32)
+        previous = np.asarray(session.query_embedding, dtype=np.float32)
+        blended = vector + self.session_weight * previous
+        # Keep the query's length so distances stay on the same scale
+        norm = np.linalg.norm(blended)
+        return (blended * (np.linalg.norm(vector) / norm) if norm else vector).tolist()
+    
+    def _apply_results(self, state: HelpDeskState, docs) -> HelpDeskState:
         # Sort by score and take top 3
         docs.sort(key=lambda x: x[1])
         
@@ -97,7 +304,30 @@ class KnowledgeAgent:
                 relevance_score=float(1.0 - score)
             ))
         
+        session = state.get("session")
+        if session is not None:
+            knowledge_items = self._merge_session_items(knowledge_items, session.knowledge_items)
+        
         state["knowledge_items"] = knowledge_items
-        state["next_action"] = "check_escalation"
+        state["next_action"] = "generate_response"
         
-        return state
\ No newline at end of file
+        return state
+    
+    def _merge_session_items(self, items: List[KnowledgeItem], previous: List[KnowledgeItem]) -> List[KnowledgeItem]:
+        """Fresh results plus the previous ticket's items, down-weighted, best 3 passages"""
+        # Several passages can share a source, so passages are told apart by their text too
+        merged = {(item.source, item.content): item for item in items}
+        for item in previous if self.session_weight > 0 else ():
+            if (item.source, item.content) not in merged:
+                # Relevance is 1 - distance; older items count as 1 / weight times as far
+                score = 1.0 - (1.0 - item.relevance_score) / self.session_weight
+                merged[item.source, item.content] = item.model_copy(update={"relevance_score": score})
+        return sorted(merged.values(), key=lambda item: item.relevance_score, reverse=True)[:3]
+    
+    def get_index_info(self) -> dict:
+        """Configured index type, the kind of index actually built and the last ingestion run"""
+        return {
+            "type": self.index_config.index_type,
+            **describe_index(self.vectorstore.index),
+            "last_ingestion": self.last_ingestion
+        }
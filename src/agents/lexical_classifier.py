@@ -0,0 +1,156 @@
+from langchain_core.documents import Document
+from typing import Dict, List, Optional
+import math
+
+from ..core.state import CategoryScore, ClassificationResult, RequestCategory
+from ..core.text import STOPWORDS, tokenize
+
+
+class LexicalClassifier:
+    """Keyword and BM25 classifier used before the embedding classifier.
+
+    Each category is a BM25 document with two fields: its own text
+    (description, escalation triggers and keywords) and the knowledge
+    sections listed under `sources` in categories.json. Source sections
+    mention other categories' terms too (the password policy talks about
+    phishing), so their weights are scaled by `source_weight`. Postings are
+    stored with their precomputed weight, so scoring a ticket is a
+    dictionary lookup per query term.
+
+    A ticket is classified here only when a category keyword matched and the
+    best category leads the runner-up by `min_margin` (relative to its
+    score); otherwise `classify` returns None and the embedding classifier
+    decides. Confidence is that relative margin.
+    """
+
+    def __init__(self, categories: dict, documents: List[Document] = (), min_margin: float = 0.5,
+                 keyword_boost: float = 2.0, source_weight: float = 0.5, k1: float = 1.2, b: float = 0.75):
+        self.min_margin = min_margin
+        self.keyword_boost = keyword_boost
+        self.source_weight = source_weight
+        self.k1 = k1
+        self.b = b
+        self.build(categories, documents)
+
+        self.hits = 0
+        self.misses = 0
+        self.agreements = 0
+        self.disagreements = 0
+
+    def build(self, categories: dict, documents: List[Document] = ()):
+        """(Re)build the index, e.g. after the knowledge base was reloaded"""
+        sections = {doc.metadata['source']: doc.page_content for doc in documents}
+        category_tokens = []
+        source_tokens = []
+        # First keyword token -> [(category index, full keyword tokens)]
+        keywords: Dict[str, List[tuple]] = {}
+        for idx, info in enumerate(categories.values()):
+            text = " ".join([info['description'], *info.get('escalation_triggers', []), *info.get('keywords', [])])
+            category_tokens.append([token for token in tokenize(text) if token not in STOPWORDS])
+            text = " ".join(sections.get(source, "") for source in info.get('sources', []))
+            source_tokens.append([token for token in tokenize(text) if token not in STOPWORDS])
+            for keyword in info.get('keywords', []):
+                keyword_tokens = tuple(tokenize(keyword))
+                if keyword_tokens:
+                    keywords.setdefault(keyword_tokens[0], []).append((idx, keyword_tokens))
+
+        self.category_enums = [RequestCategory(name) for name in categories]
+        self._keywords = keywords
+        self._postings = self._build_postings(category_tokens, self.k1, self.b)
+        for token, postings in self._build_postings(source_tokens, self.k1, self.b).items():
+            self._postings.setdefault(token, []).extend(
+                (idx, weight * self.source_weight) for idx, weight in postings)
+
+    @staticmethod
+    def _build_postings(category_tokens: List[List[str]], k1: float, b: float) -> Dict[str, List[tuple]]:
+        avg_length = sum(len(tokens) for tokens in category_tokens) / max(1, len(category_tokens))
+        term_counts = []
+        document_frequency: Dict[str, int] = {}
+        for tokens in category_tokens:
+            counts: Dict[str, int] = {}
+            for token in tokens:
+                counts[token] = counts.get(token, 0) + 1
+            term_counts.append(counts)
+            for token in counts:
+                document_frequency[token] = document_frequency.get(token, 0) + 1
+
+        total = len(category_tokens)
+        postings: Dict[str, List[tuple]] = {}
+        for idx, (tokens, counts) in enumerate(zip(category_tokens, term_counts)):
+            length_norm = k1 * (1 - b + b * len(tokens) / avg_length) if avg_length else k1
+            for token, tf in counts.items():
+                df = document_frequency[token]
+                idf = math.log(1 + (total - df + 0.5) / (df + 0.5))
+                postings.setdefault(token, []).append((idx, idf * tf * (k1 + 1) / (tf + length_norm)))
+        return postings
+
+    def score(self, text: str) -> tuple:
+        """BM25 plus keyword boost per category, and which categories had a keyword match"""
+        tokens = tokenize(text)
+        scores = [0.0] * len(self.category_enums)
+        for token in set(tokens):
+            for idx, weight in self._postings.get(token, ()):
+                scores[idx] += weight
+
+        matched = set()
+        for position, token in enumerate(tokens):
+            for idx, keyword_tokens in self._keywords.get(token, ()):
+                if idx not in matched and tuple(tokens[position:position + len(keyword_tokens)]) == keyword_tokens:
+                    matched.add(idx)
+                    scores[idx] += self.keyword_boost
+        return scores, matched
+
+    def classify(self, text: str, top_k: int = 3, record: bool = True) -> Optional[ClassificationResult]:
+        """Category of a ticket with a clear keyword lead, else None.
+
+        `record=False` leaves the hit/fallback counts alone, for looking at a
+        ticket before it is processed.
+        """
+        scores, matched = self.score(text)
+        ranked = sorted(range(len(scores)), key=scores.__getitem__, reverse=True)
+        best, runner_up = ranked[0], ranked[1] if len(ranked) > 1 else None
+        top_score = scores[best]
+
+        margin = 1.0 - scores[runner_up] / top_score if top_score > 0 and runner_up is not None else 0.0
+        if best not in matched or margin < self.min_margin:
+            self.misses += record
+            return None
+
+        self.hits += record
+        return ClassificationResult(
+            category=self.category_enums[best],
+            confidence=margin,
+            method="lexical",
+            top_categories=[
+                CategoryScore(category=self.category_enums[idx], score=scores[idx] / top_score)
+                for idx in ranked[:top_k]
+            ]
+        )
+
+    def record_agreement(self, lexical: ClassificationResult, embedding: ClassificationResult):
+        if lexical.category == embedding.category:
+            self.agreements += 1
+        else:
+            self.disagreements += 1
+
+    def collect_metrics(self):
+        """Scrape-time samples for the metrics registry"""
+        return [
+            ("helpdesk_lexical_classifications_total", "counter",
+             "Tickets offered to the lexical fast path by outcome",
+             [({"result": "hit"}, self.hits), ({"result": "fallback"}, self.misses)]),
+            ("helpdesk_lexical_agreement_total", "counter",
+             "Lexical classifications checked against the embedding classifier",
+             [({"result": "agree"}, self.agreements), ({"result": "disagree"}, self.disagreements)])
+        ]
+
+    def get_stats(self) -> dict:
+        offered = self.hits + self.misses
+        checked = self.agreements + self.disagreements
+        return {
+            "hits": self.hits,
+            "fallbacks": self.misses,
+            "hit_rate": round(self.hits / offered, 4) if offered else 0.0,
+            "agreement_checks": checked,
+            "agreement_rate": round(self.agreements / checked, 4) if checked else None
+        }
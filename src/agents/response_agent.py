@@ -1,26 +1,37 @@
-from langchain_openai import ChatOpenAI
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain.prompts import PromptTemplate
-from langchain.chains import LLMChain
-import os
+from langchain_core.prompts import PromptTemplate
+from langchain_core.language_models import BaseLanguageModel
+from typing import AsyncIterator
+import time
+from ..core.context_builder import ContextBuilder
+from ..core.llm_gateway import LLMGateway
+from ..core.metrics import LLM_CALLS, LLM_DURATION, LLM_ERRORS, PROMPT_TOKENS, CONTEXT_TOKENS_TRIMMED
+from ..core.response_cache import SemanticResponseCache
 from ..core.state import HelpDeskState
+from ..core.text import count_tokens
+
+ESCALATION_MESSAGE = "This request has been escalated to the right support team. You will receive a response within the next business hour."
+FALLBACK_MESSAGE = "I apologize, but I'm having trouble generating a response right now. Please contact IT support directly."
+
+def _non_empty(response: str) -> str:
+    # An empty answer is a failed generation: it gets the fallback message and is never cached
+    response = response.strip()
+    if not response:
+        raise ValueError("LLM returned an empty response")
+    return response
+
 
 class ResponseAgent:
-    def __init__(self):
-        llm_provider = os.getenv('LLM_PROVIDER', 'gemini')
+    def __init__(self, cache: SemanticResponseCache = None, llm: BaseLanguageModel = None,
+                 context_builder: ContextBuilder = None, gateway: LLMGateway = None):
+        self.cache = cache or SemanticResponseCache()
+        self.context_builder = context_builder or ContextBuilder()
+        self._llm_metrics = {
+            mode: (LLM_CALLS.labels(mode), LLM_DURATION.labels(mode), LLM_ERRORS.labels(mode))
+            for mode in ('invoke', 'ainvoke', 'stream')
+        }
         
-        if llm_provider == 'gemini':
-            self.llm = ChatGoogleGenerativeAI(
-                model="gemini-2.5-pro",
-                google_api_key=os.getenv('GEMINI_API_KEY'),
-                temperature=0.7
-            )
-        else:
-            self.llm = ChatOpenAI(
-                openai_api_key=os.getenv('OPENAI_API_KEY'),
-                temperature=0.7,
-                max_tokens=300
-            )
+        # Deadlines, hedging and provider failover; clients live as long as the agent
+        self.gateway = gateway or LLMGateway.from_env(llm)
         
         self.prompt_template = PromptTemplate(
             input_variables=["request", "category", "context"],
@@ -41,29 +52,116 @@ Please provide a helpful, concise response that:
 
 RESPONSE:"""
         )
-        
-        self.chain = LLMChain(llm=self.llm, prompt=self.prompt_template)
     
     def generate_response(self, state: HelpDeskState) -> HelpDeskState:
         if state["escalate"]:
-            escalation_reason = state["escalation_reason"] or ""
-            state["response"] = f"This request has been escalated to the right support team. You will receive a response within the next business hour."
+            state["response"] = ESCALATION_MESSAGE
+        else:
+            cached = self.cache.lookup(*self._cache_key(state))
+            if cached is not None:
+                state["response"] = cached
+            else:
+                start = time.perf_counter()
+                try:
+                    prompt = self._build_prompt(state)
+                    response = self.gateway.invoke(prompt)
+                    state["response"] = _non_empty(response)
+                    self.cache.store(*self._cache_key(state), state["response"])
+                except Exception as e:
+                    self._llm_metrics['invoke'][2].inc()
+                    state["response"] = FALLBACK_MESSAGE
+                finally:
+                    self._record_llm_call('invoke', start)
+        
+        state["next_action"] = "END"
+        return state
+    
+    async def agenerate_response(self, state: HelpDeskState) -> HelpDeskState:
+        if state["escalate"]:
+            state["response"] = ESCALATION_MESSAGE
         else:
-            # Create context from knowledge items
-            context = "\n\n".join([
-                f"Source: {item.source}\nContent: {item.content}"
-                for item in state["knowledge_items"]
-            ])
-            
-            try:
-                response = self.chain.run(
-                    request=state["request"],
-                    category=state["classification"].category.value,
-                    context=context
-                )
-                state["response"] = response.strip()
-            except Exception as e:
-                state["response"] = "I apologize, but I'm having trouble generating a response right now. Please contact IT support directly."
+            cached = self.cache.lookup(*self._cache_key(state))
+            if cached is not None:
+                state["response"] = cached
+            else:
+                start = time.perf_counter()
+                try:
+                    prompt = self._build_prompt(state)
+                    response = await self.gateway.ainvoke(prompt)
+                    state["response"] = _non_empty(response)
+                    self.cache.store(*self._cache_key(state), state["response"])
+                except Exception as e:
+                    self._llm_metrics['ainvoke'][2].inc()
+                    state["response"] = FALLBACK_MESSAGE
+                finally:
+                    self._record_llm_call('ainvoke', start)
         
         state["next_action"] = "END"
-        return state
\ No newline at end of file
+        return state
+    
+    async def astream_response(self, state: HelpDeskState) -> AsyncIterator[str]:
+        """Stream the response text; the full text is left on state["response"]"""
+        if state["escalate"]:
+            state["response"] = ESCALATION_MESSAGE
+        else:
+            state["response"] = self.cache.lookup(*self._cache_key(state))
+        
+        if state["response"] is not None:
+            state["next_action"] = "END"
+            yield state["response"]
+            return
+        
+        chunks = []
+        start = time.perf_counter()
+        try:
+            prompt = self._build_prompt(state)
+            async for text in self.gateway.astream(prompt):
+                if text:
+                    chunks.append(text)
+                    yield text
+            state["response"] = _non_empty("".join(chunks))
+            self.cache.store(*self._cache_key(state), state["response"])
+        except Exception as e:
+            self._llm_metrics['stream'][2].inc()
+            if "".join(chunks).strip():
+                # Keep what the user has already seen
+                state["response"] = "".join(chunks).strip()
+            else:
+                state["response"] = FALLBACK_MESSAGE
+                yield FALLBACK_MESSAGE
+        finally:
+            self._record_llm_call('stream', start)
+        
+        state["next_action"] = "END"
+    
+    def _record_llm_call(self, mode: str, start: float):
+        calls, duration, _ = self._llm_metrics[mode]
+        calls.inc()
+        duration.observe(time.perf_counter() - start)
+    
+    def _cache_key(self, state: HelpDeskState) -> tuple:
+        # Answers are only shared between requests grounded in the same sources;
+        # a follow-up's answer depends on the earlier ticket, so it is never shared
+        return (
+            state.get("query_embedding") if state.get("session") is None else None,
+            state["classification"].category.value,
+            [item.source for item in state["knowledge_items"]]
+        )
+    
+    def _build_prompt(self, state: HelpDeskState) -> str:
+        # Only the most relevant sentences of the knowledge items, within the token budget
+        request = state["request"]
+        session = state.get("session")
+        if session is not None:
+            request = f"{session.request}\nFOLLOW-UP: {request}"
+        context, full_context_tokens = self.context_builder.build(request, state["knowledge_items"])
+        prompt = self.prompt_template.format(
+            request=request,
+            category=state["classification"].category.value,
+            context=context
+        )
+        
+        state["prompt_tokens"] = count_tokens(prompt)
+        PROMPT_TOKENS.observe(state["prompt_tokens"])
+        CONTEXT_TOKENS_TRIMMED.inc(max(0, full_context_tokens - count_tokens(context)))
+        return prompt
@@ -1,37 +1,259 @@
-from fastapi import FastAPI, HTTPException
-from src.core.help_desk_system import HelpDeskSystem
+import asyncio
+import io
+import json
+import tempfile
+import time
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.background import BackgroundTask
+from pydantic import BaseModel
+from src.core.admission import BATCH_PRIORITY, Admission, AdmissionController, Overloaded
+from src.core.batch_processor import BatchProcessor, aiter_text_lines
+from src.core.escalation_queue import EscalationDispatcher, webhook
+from src.core.metrics import REGISTRY, REQUEST_DURATION, REQUESTS_IN_FLIGHT
+from src.core.startup import STARTUP_REPORT, NotReady, Readiness
 from src.core.state import HelpDeskRequest, HelpDeskResponse
 from config.settings import Config
 from fastapi.middleware.cors import CORSMiddleware
 
+def _build_help_desk():
+    # The workflow pulls in langgraph, FAISS and the agents; importing it here
+    # keeps it off the path to the first /health response
+    with STARTUP_REPORT.phase("imports"):
+        from src.core.help_desk_system import HelpDeskSystem
+    return HelpDeskSystem()
+
 def create_app() -> FastAPI:
-    app = FastAPI(title="Intelligent Help Desk System", version="1.0.0")
     config = Config()
-    help_desk = HelpDeskSystem()
+    watchers = []
+    dispatchers = []
+
+    def warm_up(help_desk):
+        with STARTUP_REPORT.phase("warm_up"):
+            help_desk.warm_up()
+
+    def start_knowledge_watcher(help_desk):
+        watcher = help_desk.multi_agent_workflow.knowledge_watcher(config.knowledge_reload_interval)
+        watcher.start()
+        watchers.append(watcher)
+
+    def start_escalation_dispatcher(help_desk):
+        dispatcher = EscalationDispatcher(help_desk.multi_agent_workflow.escalation_queue,
+                                          webhook(config.escalation_webhook_url))
+        dispatcher.start()
+        dispatchers.append(dispatcher)
+
+    def report_startup(help_desk):
+        print(f"Help desk ready after {STARTUP_REPORT.summary()}")
+
+    # The help desk is built in the background so /health answers at once;
+    # more hooks can be added to readiness.warm_up before startup
+    readiness = Readiness(_build_help_desk, warm_up=[warm_up] if config.warm_up else [])
+    if config.knowledge_reload_interval > 0:
+        readiness.warm_up.append(start_knowledge_watcher)
+    if config.escalation_webhook_url and config.escalation_dispatch:
+        readiness.warm_up.append(start_escalation_dispatcher)
+    readiness.warm_up.append(report_startup)
+
+    def system():
+        try:
+            return readiness.get()
+        except NotReady as e:
+            raise HTTPException(status_code=503, detail=f"Service not ready: {e}", headers={"Retry-After": "5"})
+
+    # Bounds the requests running and waiting per worker; urgent categories go first
+    admission = AdmissionController()
+    REGISTRY.set_collector("admission", admission.collect_metrics)
+
+    async def admit(help_desk, request: HelpDeskRequest) -> Admission:
+        priority, category = help_desk.admission_priority(request)
+        return await acquire(priority, category)
+
+    async def acquire(priority: int, label: str) -> Admission:
+        try:
+            return await admission.acquire(priority, label)
+        except Overloaded as e:
+            raise HTTPException(status_code=e.status_code, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        readiness.start()
+        yield
+        for watcher in watchers:
+            watcher.stop()
+        for dispatcher in dispatchers:
+            dispatcher.stop()
+        if readiness.ready:
+            # Buffered escalations are written before the process exits
+            await asyncio.to_thread(readiness.get().close)
+
+    app = FastAPI(title="Intelligent Help Desk System", version="1.0.0", lifespan=lifespan)
+    app.state.readiness = readiness
+    app.state.admission = admission
+    # (in-flight gauge, duration histogram) per endpoint, resolved once
+    endpoint_metrics = {
+        endpoint: (REQUESTS_IN_FLIGHT.labels(endpoint), REQUEST_DURATION.labels(endpoint))
+        for endpoint in ("support", "support_stream", "support_batch")
+    }
 
     @app.post("/support", response_model=HelpDeskResponse)
     async def process_support_request(request: HelpDeskRequest):
         """Process a help desk support request"""
+        help_desk = system()
+        slot = await admit(help_desk, request)
+        in_flight, duration = endpoint_metrics["support"]
+        in_flight.inc()
+        start = time.perf_counter()
         try:
-            response = help_desk.process_request(request)
+            response = await help_desk.aprocess_request(request)
             return response
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Error processing request: {str(e)}")
+        finally:
+            slot.release()
+            in_flight.dec()
+            duration.observe(time.perf_counter() - start)
+
+    @app.post("/support/stream")
+    async def stream_support_request(request: HelpDeskRequest):
+        """Process a support request, streaming progress and response tokens as Server-Sent Events"""
+        help_desk = system()
+        slot = await admit(help_desk, request)
+        
+        async def events():
+            in_flight, duration = endpoint_metrics["support_stream"]
+            in_flight.inc()
+            start = time.perf_counter()
+            try:
+                async for event, data in help_desk.astream_request(request):
+                    if isinstance(data, BaseModel):
+                        payload = data.model_dump_json()
+                    else:
+                        payload = json.dumps(data)
+                    yield f"event: {event}\ndata: {payload}\n\n"
+            except Exception as e:
+                yield f"event: error\ndata: {json.dumps({'detail': f'Error processing request: {str(e)}'})}\n\n"
+            finally:
+                slot.release()
+                in_flight.dec()
+                duration.observe(time.perf_counter() - start)
+        
+        return StreamingResponse(
+            events(),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+            # Also frees the slot if the client left before the stream started
+            background=BackgroundTask(slot.release)
+        )
+
+    @app.post("/support/batch")
+    async def process_support_batch(request: Request):
+        """Process a JSONL body of support requests, streaming JSONL results back"""
+        help_desk = system()
+        # Spool the body to disk rather than memory; it can't be read while
+        # the streaming response is running since both share the ASGI channel
+        spool = tempfile.TemporaryFile()
+        async for chunk in request.stream():
+            spool.write(chunk)
+        spool.seek(0)
+        
+        # The first chunk's slot is taken up front, so an overloaded server
+        # answers 429 or 503 before streaming; later chunks queue for their own
+        try:
+            first_slot = await acquire(BATCH_PRIORITY, "batch")
+        except HTTPException:
+            spool.close()
+            raise
+        slots = [first_slot]
+        
+        async def admit_chunk() -> Admission:
+            return slots.pop() if slots else await admission.acquire(BATCH_PRIORITY, "batch")
+        
+        processor = BatchProcessor(help_desk, admit=admit_chunk)
+        
+        async def results():
+            in_flight, duration = endpoint_metrics["support_batch"]
+            in_flight.inc()
+            start = time.perf_counter()
+            try:
+                lines = io.TextIOWrapper(spool, encoding="utf-8")
+                async for line in processor.process_lines(aiter_text_lines(lines)):
+                    yield line
+            finally:
+                spool.close()
+                first_slot.release()
+                in_flight.dec()
+                duration.observe(time.perf_counter() - start)
+        
+        # Also frees the first slot if the client left before the stream started
+        return StreamingResponse(results(), media_type="application/x-ndjson",
+                                 background=BackgroundTask(first_slot.release))
 
     @app.get("/health")
     async def health_check():
-        """Health check endpoint"""
+        """Liveness: the process is up, whether or not it is ready"""
         return {"status": "healthy"}
 
+    @app.get("/ready")
+    async def readiness_check():
+        """Readiness: 200 once models and indexes are loaded and warmed up, 503 before"""
+        body = {**readiness.status(), "startup": STARTUP_REPORT.as_dict()}
+        return JSONResponse(body, status_code=200 if readiness.ready else 503)
+
+    @app.get("/metrics", response_class=PlainTextResponse)
+    async def get_metrics():
+        """Prometheus metrics for nodes, provider calls, escalations and in-flight requests"""
+        return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+    @app.post("/admin/reload-knowledge")
+    async def reload_knowledge():
+        """Re-embed changed knowledge base sections and swap the index in place"""
+        help_desk = system()
+        try:
+            return await asyncio.to_thread(help_desk.reload_knowledge)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Error reloading knowledge base: {str(e)}")
+
+    @app.post("/admin/reload-escalation-rules")
+    async def reload_escalation_rules():
+        """Recompile escalation rules from categories.json"""
+        help_desk = system()
+        try:
+            return await asyncio.to_thread(help_desk.reload_escalation_rules)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Error reloading escalation rules: {str(e)}")
+
+    @app.get("/admin/escalations")
+    async def list_escalations(after_id: int = 0, limit: int = 100):
+        """Escalated tickets recorded after `after_id`, oldest first"""
+        escalation_queue = system().multi_agent_workflow.escalation_queue
+        tickets = await asyncio.to_thread(escalation_queue.read, after_id, min(limit, 1000))
+        return {"escalations": tickets, "next_after_id": tickets[-1]["id"] if tickets else after_id}
+
     @app.get("/categories")
     async def get_categories():
         """Get available request categories"""
-        return {"categories": list(help_desk.classifier.categories.keys())}
+        return {"categories": list(system().multi_agent_workflow.classifier_agent.categories.keys())}
 
     @app.get("/config")
     async def get_config():
         """Get current system configuration"""
-        return config.get_provider_info()
+        help_desk = system()
+        info = config.get_provider_info()
+        info["startup"] = STARTUP_REPORT.as_dict()
+        info["admission"] = admission.get_stats()
+        info["embeddings"] = help_desk.multi_agent_workflow.embedding_service.get_info()
+        info["knowledge_index"] = help_desk.multi_agent_workflow.knowledge_agent.get_index_info()
+        info["response_cache"] = help_desk.multi_agent_workflow.response_agent.cache.get_stats()
+        info["request_coalescing"] = help_desk.multi_agent_workflow.coalescer.get_stats()
+        info["sessions"] = help_desk.multi_agent_workflow.sessions.get_stats()
+        info["escalation_queue"] = help_desk.multi_agent_workflow.escalation_queue.get_stats()
+        info["escalation_dispatchers"] = [dispatcher.get_stats() for dispatcher in dispatchers]
+        info["llm_gateway"] = help_desk.multi_agent_workflow.response_agent.gateway.get_stats()
+        lexical = help_desk.multi_agent_workflow.classifier_agent.lexical
+        info["lexical_classifier"] = lexical.get_stats() if lexical is not None else None
+        return info
     
     app.add_middleware(
         CORSMiddleware,
@@ -0,0 +1,67 @@
+import os
+import tempfile
+import uvicorn
+
+from ..core.embedding_server import EmbeddingServer
+from ..core.embeddings import EmbeddingService
+from ..core.escalation_queue import EscalationDispatcher, EscalationQueue, webhook
+from ..core.index_cache import IndexCache
+from ..agents.classifier_agent import ClassifierAgent
+from ..agents.escalation_agent import EscalationAgent
+from ..agents.knowledge_agent import KnowledgeAgent
+
+APP_FACTORY = "src.api.routes:create_app"
+
+
+def prepare_shared_state() -> EmbeddingService:
+    """Load the embedding model and build or load every cached index once"""
+    embeddings = EmbeddingService()
+    index_cache = IndexCache(mmap=False)
+    # Constructing the agents writes any missing or stale index to the cache
+    KnowledgeAgent(embeddings, index_cache)
+    ClassifierAgent(embeddings, index_cache)
+    EscalationAgent(embeddings, index_cache)
+    return embeddings
+
+
+def serve(host: str = "0.0.0.0", port: int = 8000, workers: int = 1, reload: bool = False):
+    """Run the API, in one process or as `workers` processes sharing one model.
+
+    With several workers the parent process loads the embedding model, writes
+    the indexes to the index cache and serves embeddings over a Unix socket.
+    Workers memory-map the cached indexes read-only (INDEX_MMAP) and embed
+    through that socket (EMBEDDING_SERVER_ADDRESS), so the model and the
+    vectors are held once instead of once per worker. The parent also runs
+    the escalation webhook dispatcher, which the workers share through the
+    queue's SQLite file.
+    """
+    if workers <= 1:
+        uvicorn.run(APP_FACTORY, host=host, port=port, reload=reload, factory=True)
+        return
+
+    if not IndexCache().enabled:
+        print("Warning: INDEX_CACHE_DIR is disabled; every worker builds its own indexes in memory")
+    embeddings = prepare_shared_state()
+
+    address = os.path.join(tempfile.mkdtemp(prefix="helpdesk-"), "embeddings.sock")
+    authkey = os.urandom(16)
+    server = EmbeddingServer(embeddings, address, authkey)
+    server.start()
+    # Inherited by the worker processes
+    os.environ["EMBEDDING_SERVER_ADDRESS"] = address
+    os.environ["EMBEDDING_SERVER_AUTHKEY"] = authkey.hex()
+    os.environ["INDEX_MMAP"] = "true"
+    dispatcher = None
+    if os.getenv('ESCALATION_WEBHOOK_URL'):
+        dispatcher = EscalationDispatcher(EscalationQueue(), webhook(os.environ['ESCALATION_WEBHOOK_URL']))
+        dispatcher.start()
+        os.environ["ESCALATION_DISPATCH"] = "false"
+    try:
+        uvicorn.run(APP_FACTORY, host=host, port=port, workers=workers, factory=True)
+    finally:
+        if dispatcher is not None:
+            dispatcher.stop()
+        server.close()
+        if os.path.exists(address):
+            os.unlink(address)
+        os.rmdir(os.path.dirname(address))
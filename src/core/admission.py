@@ -0,0 +1,191 @@
+from contextlib import asynccontextmanager
+from typing import List, Optional
+import asyncio
+import heapq
+import itertools
+import math
+import os
+import time
+
+from .metrics import ADMISSION_QUEUE_WAIT, ADMISSION_REJECTIONS
+
+# Batch chunks rank below every ticket category, so interactive requests go first
+BATCH_PRIORITY = 1000
+
+
+class Overloaded(Exception):
+    """A request was turned away; `status_code` is 429 or 503"""
+
+    def __init__(self, status_code: int, reason: str, retry_after: int):
+        super().__init__(f"Server overloaded ({reason}), retry after {retry_after}s")
+        self.status_code = status_code
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class Admission:
+    """A granted slot; `release` is idempotent"""
+
+    def __init__(self, controller: "AdmissionController", label: str, wait_seconds: float):
+        self.controller = controller
+        self.label = label
+        self.wait_seconds = wait_seconds
+        self.started_at = time.perf_counter()
+        self._released = False
+
+    def release(self):
+        if not self._released:
+            self._released = True
+            self.controller._release(time.perf_counter() - self.started_at)
+
+
+class AdmissionController:
+    """Concurrency cap and bounded priority queue in front of the workflow.
+
+    At most `max_concurrency` requests run at once. Others wait in a queue
+    of at most `max_queue` entries served by priority (lower first, then
+    arrival order), so a security incident overtakes routine password
+    resets. When the queue is full a newcomer displaces the lowest-priority
+    waiter if it outranks it, and is rejected with 429 otherwise; a request
+    still queued after `max_wait` seconds gets 503. Retry-After is estimated
+    from the queue length and the recent processing time. Queue wait is
+    recorded per label, separately from processing time.
+
+    Configured through ADMISSION_MAX_CONCURRENCY (0 disables),
+    ADMISSION_QUEUE_SIZE and ADMISSION_MAX_WAIT (seconds).
+    """
+
+    def __init__(self, max_concurrency: int = None, max_queue: int = None, max_wait: float = None):
+        self.max_concurrency = max_concurrency if max_concurrency is not None else int(os.getenv('ADMISSION_MAX_CONCURRENCY', '32'))
+        self.max_queue = max_queue if max_queue is not None else int(os.getenv('ADMISSION_QUEUE_SIZE', '256'))
+        self.max_wait = max_wait if max_wait is not None else float(os.getenv('ADMISSION_MAX_WAIT', '30'))
+
+        self.active = 0
+        # (priority, arrival, future, label) min-heap; entries whose future is done are stale
+        self._queue: List[tuple] = []
+        self._arrivals = itertools.count()
+        # Moving average of processing time, for Retry-After
+        self._service_seconds = 1.0
+
+        self.admitted = 0
+        self.queued = 0
+        self.rejections = {"queue_full": 0, "shed": 0, "timeout": 0}
+        self._wait_histograms = {}
+        self._rejection_counters = {reason: ADMISSION_REJECTIONS.labels(reason) for reason in self.rejections}
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_concurrency > 0
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(1 for entry in self._queue if not entry[2].done())
+
+    def retry_after(self) -> int:
+        backlog = self.queue_depth + 1
+        seconds = backlog * self._service_seconds / max(1, self.max_concurrency)
+        return int(min(60, max(1, math.ceil(seconds))))
+
+    def _reject(self, reason: str, status_code: int) -> Overloaded:
+        self.rejections[reason] += 1
+        self._rejection_counters[reason].inc()
+        return Overloaded(status_code, reason, self.retry_after())
+
+    def _observe_wait(self, label: str, seconds: float):
+        histogram = self._wait_histograms.get(label)
+        if histogram is None:
+            histogram = self._wait_histograms[label] = ADMISSION_QUEUE_WAIT.labels(label)
+        histogram.observe(seconds)
+
+    def _shed_lowest(self, priority: int) -> bool:
+        """Reject the lowest-priority waiter if it ranks below `priority`"""
+        live = [entry for entry in self._queue if not entry[2].done()]
+        if not live:
+            return False
+        worst = max(live, key=lambda entry: (entry[0], entry[1]))
+        if worst[0] <= priority:
+            return False
+        worst[2].set_exception(self._reject("shed", 429))
+        self._queue = live
+        self._queue.remove(worst)
+        heapq.heapify(self._queue)
+        return True
+
+    async def acquire(self, priority: int, label: str = "default") -> Admission:
+        """Wait for a slot; raises Overloaded when the request is turned away"""
+        start = time.perf_counter()
+        if not self.enabled or (self.active < self.max_concurrency and not self.queue_depth):
+            self.active += 1
+            self.admitted += 1
+            self._observe_wait(label, 0.0)
+            return Admission(self, label, 0.0)
+
+        if self.queue_depth >= self.max_queue and not self._shed_lowest(priority):
+            raise self._reject("queue_full", 429)
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._queue, (priority, next(self._arrivals), future, label))
+        self.queued += 1
+        try:
+            await asyncio.wait_for(asyncio.shield(future), self.max_wait if self.max_wait > 0 else None)
+        except asyncio.TimeoutError:
+            if future.done() and not future.cancelled() and future.exception() is None:
+                # The slot was handed over just as the wait ran out
+                self._release(None)
+            else:
+                future.cancel()
+            raise self._reject("timeout", 503)
+        except asyncio.CancelledError:
+            # Client went away; give back a slot handed over in the meantime
+            if future.done() and not future.cancelled() and future.exception() is None:
+                self._release(None)
+            else:
+                future.cancel()
+            raise
+
+        wait = time.perf_counter() - start
+        self.admitted += 1
+        self._observe_wait(label, wait)
+        return Admission(self, label, wait)
+
+    def _release(self, service_seconds: Optional[float]):
+        if service_seconds is not None:
+            self._service_seconds += 0.1 * (service_seconds - self._service_seconds)
+        # Hand the slot straight to the best live waiter
+        while self._queue:
+            _, _, future, _ = heapq.heappop(self._queue)
+            if not future.done():
+                future.set_result(None)
+                return
+        self.active -= 1
+
+    @asynccontextmanager
+    async def admit(self, priority: int, label: str = "default"):
+        admission = await self.acquire(priority, label)
+        try:
+            yield admission
+        finally:
+            admission.release()
+
+    def collect_metrics(self):
+        """Scrape-time samples for the metrics registry"""
+        return [
+            ("helpdesk_admission_active", "gauge", "Requests holding an admission slot", [({}, self.active)]),
+            ("helpdesk_admission_queue_depth", "gauge", "Requests waiting for an admission slot",
+             [({}, self.queue_depth)])
+        ]
+
+    def get_stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "max_wait_seconds": self.max_wait,
+            "active": self.active,
+            "queue_depth": self.queue_depth,
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "rejections": dict(self.rejections),
+            "mean_processing_seconds": round(self._service_seconds, 3),
+            "retry_after_seconds": self.retry_after()
+        }
@@ -0,0 +1,83 @@
+from typing import AsyncIterator, Awaitable, Callable, Iterable, List, Tuple
+import json
+import os
+from .admission import Admission, Overloaded
+from .state import HelpDeskRequest
+
+
+async def aiter_text_lines(lines: Iterable[str]) -> AsyncIterator[str]:
+    """Adapt a line iterable (e.g. an open file) to an async iterator"""
+    for line in lines:
+        yield line
+
+
+class BatchProcessor:
+    """Streams JSONL HelpDeskRequest records through the help desk.
+
+    Records are read and processed in chunks of `chunk_size`, so only one
+    chunk is held in memory whatever the input size. Each chunk is embedded
+    and classified as one vectorized batch, and at most `concurrency`
+    requests are in the LLM stage at once. Every non-blank input line
+    produces one output line: the HelpDeskResponse fields plus the input
+    line number, or the line number and an error message.
+
+    When `admit` is given, each chunk holds the admission slot it returns
+    while it runs; a chunk that is turned away gets an error line per
+    request, and the client can resubmit them after the suggested delay.
+    """
+
+    def __init__(self, help_desk, chunk_size: int = None, concurrency: int = None,
+                 admit: Callable[[], Awaitable[Admission]] = None):
+        self.help_desk = help_desk
+        self.chunk_size = chunk_size or int(os.getenv('BATCH_CHUNK_SIZE', '64'))
+        self.concurrency = concurrency or int(os.getenv('BATCH_CONCURRENCY', '8'))
+        self.admit = admit
+
+    async def process_lines(self, lines: AsyncIterator[str]) -> AsyncIterator[str]:
+        chunk = []
+        line_number = 0
+        async for line in lines:
+            line_number += 1
+            if not line.strip():
+                continue
+            chunk.append((line_number, line))
+            if len(chunk) >= self.chunk_size:
+                async for output in self._process_chunk(chunk):
+                    yield output
+                chunk = []
+
+        if chunk:
+            async for output in self._process_chunk(chunk):
+                yield output
+
+    async def _process_chunk(self, chunk: List[Tuple[int, str]]) -> AsyncIterator[str]:
+        requests = []
+        outputs = {}
+        for line_number, line in chunk:
+            try:
+                requests.append((line_number, HelpDeskRequest.model_validate_json(line)))
+            except ValueError as e:
+                outputs[line_number] = {"line": line_number, "error": f"Invalid request: {e}"}
+
+        if requests:
+            responses = await self._process_requests([request for _, request in requests])
+            for (line_number, _), response in zip(requests, responses):
+                if isinstance(response, Exception):
+                    outputs[line_number] = {"line": line_number, "error": f"Error processing request: {response}"}
+                else:
+                    outputs[line_number] = {"line": line_number, **response.model_dump(mode="json")}
+
+        for line_number, _ in chunk:
+            yield json.dumps(outputs[line_number]) + "\n"
+
+    async def _process_requests(self, requests: List[HelpDeskRequest]) -> list:
+        if self.admit is None:
+            return await self.help_desk.aprocess_batch(requests, concurrency=self.concurrency)
+        try:
+            slot = await self.admit()
+        except Overloaded as e:
+            return [e] * len(requests)
+        try:
+            return await self.help_desk.aprocess_batch(requests, concurrency=self.concurrency)
+        finally:
+            slot.release()
@@ -0,0 +1,72 @@
+from typing import List, Tuple
+import os
+
+from .state import KnowledgeItem
+from .text import content_terms, count_tokens, split_sentences
+
+
+def format_knowledge_item(source: str, content: str) -> str:
+    return f"Source: {source}\nContent: {content}"
+
+
+class ContextBuilder:
+    """Assembles the knowledge part of the LLM prompt within a token budget.
+
+    Items below `relevance_floor` are dropped. The remaining sentences are
+    ranked by how many request terms they share (ties keep retrieval order,
+    then reading order) and added until `token_budget` is spent; each item
+    keeps its selected sentences in their original order. An item whose
+    sentences all fit is passed through unchanged. A budget of 0 disables
+    trimming.
+
+    CONTEXT_TOKEN_BUDGET (default 400) and CONTEXT_RELEVANCE_FLOOR (default
+    -0.6; relevance is 1 - squared L2 distance, so about cosine 0.2 for
+    normalized embeddings) configure it.
+    """
+
+    def __init__(self, token_budget: int = None, relevance_floor: float = None):
+        if token_budget is None:
+            token_budget = int(os.getenv('CONTEXT_TOKEN_BUDGET', '400'))
+        if relevance_floor is None:
+            relevance_floor = float(os.getenv('CONTEXT_RELEVANCE_FLOOR', '-0.6'))
+        self.token_budget = token_budget
+        self.relevance_floor = relevance_floor
+
+    def build(self, request: str, knowledge_items: List[KnowledgeItem]) -> Tuple[str, int]:
+        """Return the context text and the token count of the untrimmed context"""
+        full_context = "\n\n".join(format_knowledge_item(item.source, item.content) for item in knowledge_items)
+        full_tokens = count_tokens(full_context)
+
+        items = [item for item in knowledge_items if item.relevance_score >= self.relevance_floor]
+        if self.token_budget <= 0:
+            return "\n\n".join(format_knowledge_item(item.source, item.content) for item in items), full_tokens
+
+        query_terms = content_terms(request)
+        item_sentences = [split_sentences(item.content) for item in items]
+        candidates = sorted(
+            (-len(query_terms & content_terms(sentence)), item_idx, sentence_idx)
+            for item_idx, sentences in enumerate(item_sentences)
+            for sentence_idx, sentence in enumerate(sentences)
+        )
+
+        selected = [set() for _ in items]
+        used = 0
+        for _, item_idx, sentence_idx in candidates:
+            cost = count_tokens(item_sentences[item_idx][sentence_idx]) + 1
+            if not selected[item_idx]:
+                cost += count_tokens(format_knowledge_item(items[item_idx].source, ""))
+            if used + cost > self.token_budget:
+                continue
+            selected[item_idx].add(sentence_idx)
+            used += cost
+
+        parts = []
+        for item, sentences, chosen in zip(items, item_sentences, selected):
+            if not chosen:
+                continue
+            if len(chosen) == len(sentences):
+                content = item.content
+            else:
+                content = "\n".join(sentences[idx] for idx in sorted(chosen))
+            parts.append(format_knowledge_item(item.source, content))
+        return "\n\n".join(parts), full_tokens
@@ -0,0 +1,112 @@
+from typing import Awaitable, Callable, Dict, List
+import asyncio
+
+
+class EmbeddingBatcher:
+    """Micro-batching scheduler for query embeddings.
+
+    Concurrent callers enqueue their text and await a future. A single worker
+    task takes the first queued text, keeps collecting for up to `window_ms`
+    or until `max_batch_size` texts are gathered, embeds them with one batched
+    call and hands each caller its own vector. While a batch is being embedded
+    new arrivals queue up, so batches grow naturally with load.
+    """
+
+    def __init__(self, embed_batch: Callable[[List[str]], Awaitable[List[List[float]]]],
+                 max_batch_size: int = 32, window_ms: float = 2.0):
+        self.embed_batch = embed_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.window = max(0.0, window_ms) / 1000.0
+
+        # Bound lazily to the running event loop
+        self._loop = None
+        self._queue = None
+        self._worker = None
+
+        self.total_requests = 0
+        self.total_batches = 0
+        self.largest_batch = 0
+        self.batch_size_counts: Dict[int, int] = {}
+
+    def _ensure_worker(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._worker is None or self._worker.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._run())
+
+    async def embed(self, text: str) -> List[float]:
+        self._ensure_worker()
+        future = self._loop.create_future()
+        self._queue.put_nowait((text, future))
+        return await future
+
+    async def _collect_batch(self):
+        batch = [await self._queue.get()]
+        deadline = self._loop.time() + self.window
+        while len(batch) < self.max_batch_size:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            remaining = deadline - self._loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._collect_batch()
+            # Callers that gave up (e.g. client disconnect) are dropped
+            batch = [(text, future) for text, future in batch if not future.done()]
+            if not batch:
+                continue
+
+            self._record(len(batch))
+            try:
+                vectors = await self.embed_batch([text for text, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            for (_, future), vector in zip(batch, vectors):
+                if not future.done():
+                    future.set_result(vector)
+
+    def _record(self, batch_size: int):
+        self.total_requests += batch_size
+        self.total_batches += 1
+        self.largest_batch = max(self.largest_batch, batch_size)
+        self.batch_size_counts[batch_size] = self.batch_size_counts.get(batch_size, 0) + 1
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def collect_metrics(self):
+        """Scrape-time samples for the metrics registry"""
+        return [
+            ("helpdesk_embedding_queue_depth", "gauge", "Queries waiting for an embedding batch",
+             [({}, self.queue_depth)]),
+            ("helpdesk_embedding_batches_total", "counter", "Batched embedding calls made by the scheduler",
+             [({}, self.total_batches)]),
+            ("helpdesk_embedding_batched_queries_total", "counter", "Queries embedded through the scheduler",
+             [({}, self.total_requests)])
+        ]
+
+    def get_stats(self) -> dict:
+        return {
+            "queue_depth": self.queue_depth,
+            "max_batch_size": self.max_batch_size,
+            "window_ms": self.window * 1000.0,
+            "requests": self.total_requests,
+            "batches": self.total_batches,
+            "mean_batch_size": round(self.total_requests / self.total_batches, 2) if self.total_batches else 0.0,
+            "largest_batch": self.largest_batch,
+            "batch_size_counts": dict(sorted(self.batch_size_counts.items()))
+        }
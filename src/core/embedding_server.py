@@ -0,0 +1,112 @@
+from langchain_core.embeddings import Embeddings
+from multiprocessing.connection import Client, Listener
+from typing import List
+import numpy as np
+import queue
+import threading
+
+
+class EmbeddingServer:
+    """Serves one embedding model to the other processes of a deployment.
+
+    Listens on a Unix socket; every client connection gets its own thread
+    and calls into the model are serialized by a lock, so N server workers
+    share one loaded model instead of N copies. Vectors travel as float32
+    arrays. Requests are `(operation, payload)` tuples and replies are
+    `("ok", result)` or `("error", message)`.
+    """
+
+    def __init__(self, embeddings, address: str, authkey: bytes):
+        self.embeddings = embeddings
+        self.address = address
+        self._listener = Listener(address, family='AF_UNIX', authkey=authkey)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._closed = False
+
+    def start(self):
+        self._thread = threading.Thread(target=self._accept_loop, name="embedding-server", daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self._closed = True
+        self._listener.close()
+
+    def _accept_loop(self):
+        while not self._closed:
+            try:
+                conn = self._listener.accept()
+            except OSError:
+                # Listener closed
+                return
+            except Exception as e:
+                print(f"Warning: rejected embedding client: {e}")
+                continue
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _serve(self, conn):
+        with conn:
+            while True:
+                try:
+                    operation, payload = conn.recv()
+                except (EOFError, OSError):
+                    return
+                try:
+                    conn.send(("ok", self._handle(operation, payload)))
+                except Exception as e:
+                    conn.send(("error", f"{type(e).__name__}: {e}"))
+
+    def _handle(self, operation: str, payload):
+        if operation == "info":
+            return {"backend": self.embeddings.backend, "model_name": self.embeddings.model_name}
+        if operation == "documents":
+            func = self.embeddings.embed_documents
+        elif operation == "queries":
+            func = self.embeddings.embed_queries
+        elif operation == "query":
+            func = self.embeddings.embed_query
+        else:
+            raise ValueError(f"unknown operation {operation!r}")
+        with self._lock:
+            return np.asarray(func(payload), dtype=np.float32)
+
+
+class RemoteEmbeddings(Embeddings):
+    """Client for an EmbeddingServer, with a small pool of connections.
+
+    `backend` and `model_name` are those of the served model, so index cache
+    manifests written by the serving process still match.
+    """
+
+    def __init__(self, address: str, authkey: bytes):
+        self.address = address
+        self._authkey = authkey
+        self._connections = queue.LifoQueue()
+        info = self._call("info", None)
+        self.backend = info["backend"]
+        self.model_name = info["model_name"]
+
+    def _call(self, operation: str, payload):
+        try:
+            conn = self._connections.get_nowait()
+        except queue.Empty:
+            conn = Client(self.address, family='AF_UNIX', authkey=self._authkey)
+        try:
+            conn.send((operation, payload))
+            status, result = conn.recv()
+        except (EOFError, OSError) as e:
+            conn.close()
+            raise ConnectionError(f"embedding server at {self.address} is unavailable: {e}") from e
+        self._connections.put(conn)
+        if status != "ok":
+            raise RuntimeError(result)
+        return result
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._call("documents", list(texts)).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._call("query", text).tolist()
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        return self._call("queries", list(texts)).tolist()
@@ -0,0 +1,194 @@
+from langchain_core.embeddings import Embeddings
+from typing import Callable, List, Optional
+import asyncio
+import functools
+import os
+import time
+from .embedding_batcher import EmbeddingBatcher
+from .embedding_server import RemoteEmbeddings
+from .metrics import EMBEDDING_CALLS, EMBEDDING_DURATION, EMBEDDING_ERRORS, EMBEDDING_TEXTS
+
+
+def _current_rss() -> int:
+    """Resident memory of the current process in bytes (0 if unavailable)"""
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def get_query_embedding(state: dict, embeddings: Embeddings) -> List[float]:
+    """Return the request vector stored on the state, embedding it on first use"""
+    query_embedding = state.get("query_embedding")
+    if query_embedding is None:
+        query_embedding = embeddings.embed_query(state["request"])
+        state["query_embedding"] = query_embedding
+    return query_embedding
+
+
+async def aget_query_embedding(state: dict, embeddings: Embeddings) -> List[float]:
+    """Async variant of get_query_embedding"""
+    query_embedding = state.get("query_embedding")
+    if query_embedding is None:
+        query_embedding = await embeddings.aembed_query(state["request"])
+        state["query_embedding"] = query_embedding
+    return query_embedding
+
+
+class EmbeddingService(Embeddings):
+    """Process-wide embedding model shared by every agent.
+
+    The backend is chosen once here: Google embeddings when GEMINI_API_KEY is
+    set, otherwise a local HuggingFace model. EMBEDDING_MODEL overrides the
+    model name for either backend. When EMBEDDING_SERVER_ADDRESS is set (the
+    multi-worker server sets it) the model is used through that process's
+    EmbeddingServer instead of being loaded here.
+
+    Async query embeddings go through an EmbeddingBatcher so concurrent
+    requests share batched model calls. EMBED_BATCH_WINDOW_MS (default 2) and
+    EMBED_BATCH_MAX_SIZE (default 32) tune it; a window of 0 disables it.
+    """
+
+    def __init__(self, model: Optional[Embeddings] = None, model_name: Optional[str] = None):
+        rss_before = _current_rss()
+        start = time.perf_counter()
+
+        self.remote = False
+        if model is not None:
+            self.backend = 'custom'
+            self.model_name = model_name or type(model).__name__
+            self.model = model
+        elif os.getenv('EMBEDDING_SERVER_ADDRESS'):
+            self.model = RemoteEmbeddings(
+                os.getenv('EMBEDDING_SERVER_ADDRESS'),
+                bytes.fromhex(os.getenv('EMBEDDING_SERVER_AUTHKEY', ''))
+            )
+            # Same model identity as the server, so cached indexes still match
+            self.backend = self.model.backend
+            self.model_name = self.model.model_name
+            self.remote = True
+        elif os.getenv('GEMINI_API_KEY'):
+            # Provider packages are imported only for the backend in use
+            from langchain_google_genai import GoogleGenerativeAIEmbeddings
+            self.backend = 'gemini'
+            self.model_name = model_name or os.getenv('EMBEDDING_MODEL', 'models/embedding-001')
+            self.model = GoogleGenerativeAIEmbeddings(
+                model=self.model_name,
+                google_api_key=os.getenv('GEMINI_API_KEY')
+            )
+        else:
+            from langchain_community.embeddings import HuggingFaceEmbeddings
+            self.backend = 'huggingface'
+            self.model_name = model_name or os.getenv('EMBEDDING_MODEL', 'all-MiniLM-L6-v2')
+            self.model = HuggingFaceEmbeddings(model_name=self.model_name)
+
+        self.load_time = time.perf_counter() - start
+        self.memory_bytes = max(_current_rss() - rss_before, 0)
+        
+        window_ms = float(os.getenv('EMBED_BATCH_WINDOW_MS', '2'))
+        self.batcher = EmbeddingBatcher(
+            self.aembed_queries,
+            max_batch_size=int(os.getenv('EMBED_BATCH_MAX_SIZE', '32')),
+            window_ms=window_ms
+        ) if window_ms > 0 else None
+        
+        # Metric children are resolved once so recording a call allocates nothing
+        self._call_metrics = {
+            operation: (
+                EMBEDDING_CALLS.labels(operation), EMBEDDING_TEXTS.labels(operation),
+                EMBEDDING_DURATION.labels(operation), EMBEDDING_ERRORS.labels(operation)
+            )
+            for operation in ('query', 'documents', 'query_batch')
+        }
+
+    @property
+    def model_id(self) -> str:
+        """Stable identity of the embedding model, e.g. 'huggingface:all-MiniLM-L6-v2'"""
+        return f"{self.backend}:{self.model_name}"
+
+    def _measure(self, operation: str, count: int, func, *args, **kwargs):
+        calls, texts, duration, errors = self._call_metrics[operation]
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        except Exception:
+            errors.inc()
+            raise
+        finally:
+            calls.inc()
+            texts.inc(count)
+            duration.observe(time.perf_counter() - start)
+
+    async def _ameasure(self, operation: str, count: int, func, *args, **kwargs):
+        calls, texts, duration, errors = self._call_metrics[operation]
+        start = time.perf_counter()
+        try:
+            return await func(*args, **kwargs)
+        except Exception:
+            errors.inc()
+            raise
+        finally:
+            calls.inc()
+            texts.inc(count)
+            duration.observe(time.perf_counter() - start)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._measure('documents', len(texts), self.model.embed_documents, texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._measure('query', 1, self.model.embed_query, text)
+
+    def model_factory(self) -> Optional[Callable[[], Embeddings]]:
+        """Picklable constructor of the local model, for ingestion worker processes"""
+        if self.backend == 'huggingface' and not self.remote:
+            return functools.partial(type(self.model), model_name=self.model_name)
+        return None
+
+    @property
+    def is_local(self) -> bool:
+        """Local models are CPU-bound; remote ones are network-bound.
+
+        Calls to an EmbeddingServer block on its socket, so they count as local.
+        """
+        return self.remote or self.backend != 'gemini'
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        if self.is_local:
+            # Keep CPU-bound inference off the event loop
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(None, self.embed_documents, texts)
+        return await self._ameasure('documents', len(texts), self.model.aembed_documents, texts)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        if self.batcher is not None:
+            return await self.batcher.embed(text)
+        if self.is_local:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(None, self.embed_query, text)
+        return await self._ameasure('query', 1, self.model.aembed_query, text)
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """Embed several queries with a single model call"""
+        if self.remote:
+            return self._measure('query_batch', len(texts), self.model.embed_queries, texts)
+        if self.backend == 'gemini':
+            # Batch endpoint, but with the query task type used by embed_query
+            return self._measure('query_batch', len(texts), self.model.embed_documents,
+                                 texts, task_type='retrieval_query')
+        return self._measure('query_batch', len(texts), self.model.embed_documents, texts)
+
+    async def aembed_queries(self, texts: List[str]) -> List[List[float]]:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.embed_queries, texts)
+
+    def get_info(self) -> dict:
+        """Report backend, load time and memory taken by the model"""
+        return {
+            "backend": self.backend,
+            "model": self.model_name,
+            "server": self.model.address if self.remote else None,
+            "load_time_seconds": round(self.load_time, 3),
+            "memory_mb": round(self.memory_bytes / (1024 * 1024), 1),
+            "batching": self.batcher.get_stats() if self.batcher is not None else None
+        }
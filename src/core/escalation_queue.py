@@ -0,0 +1,320 @@
+from contextlib import closing
+from typing import Callable, List, Optional
+import atexit
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+import urllib.request
+
+DEFAULT_QUEUE_PATH = os.path.join(os.path.dirname(__file__), '..', '..', '.escalations', 'escalations.db')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS escalations (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at REAL NOT NULL,
+    user_id TEXT,
+    category TEXT NOT NULL,
+    reason TEXT,
+    request TEXT NOT NULL,
+    details TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS consumers (
+    name TEXT PRIMARY KEY,
+    last_id INTEGER NOT NULL
+);
+"""
+
+_COLUMNS = ("user_id", "category", "reason", "request")
+
+# Tells the writer thread to flush and exit
+_STOP = object()
+
+
+class EscalationQueue:
+    """Append-only SQLite log of escalated tickets, written off the request path.
+
+    `enqueue` only puts the ticket on a bounded in-memory buffer. A writer
+    thread drains it and commits up to `batch_size` tickets per transaction,
+    waiting at most `flush_interval_ms` for a batch to fill, so a burst of
+    escalations shares one fsync. When the buffer is full the ticket is
+    dropped and counted instead of blocking the request. `close` (also run
+    at exit) flushes whatever is buffered.
+
+    Tickets are read back in id order with `read`; consumers keep their
+    position with `get_cursor` and `set_cursor`. Configured through
+    ESCALATION_QUEUE_PATH (empty disables), ESCALATION_QUEUE_BUFFER,
+    ESCALATION_QUEUE_BATCH_SIZE and ESCALATION_QUEUE_FLUSH_MS.
+    """
+
+    def __init__(self, path: str = None, buffer_size: int = None, batch_size: int = None,
+                 flush_interval_ms: float = None):
+        path = path if path is not None else os.getenv('ESCALATION_QUEUE_PATH', DEFAULT_QUEUE_PATH)
+        self.path = os.path.abspath(path) if path else None
+        self.buffer_size = buffer_size if buffer_size is not None else int(os.getenv('ESCALATION_QUEUE_BUFFER', '10000'))
+        self.batch_size = max(1, batch_size if batch_size is not None else int(os.getenv('ESCALATION_QUEUE_BATCH_SIZE', '256')))
+        flush_interval_ms = flush_interval_ms if flush_interval_ms is not None else float(os.getenv('ESCALATION_QUEUE_FLUSH_MS', '50'))
+        self.flush_interval = max(0.0, flush_interval_ms) / 1000.0
+
+        self._buffer = queue.Queue(maxsize=self.buffer_size)
+        self._lock = threading.Lock()
+        self._committed = threading.Condition()
+        self._writer = None
+        self._closed = False
+
+        self.enqueued = 0
+        self.dropped = 0
+        self.written = 0
+        self.failed = 0
+        self.commits = 0
+        self.last_id = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.path is not None
+
+    def _connect(self) -> sqlite3.Connection:
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30)
+        # WAL lets readers and the dispatcher run alongside the writer;
+        # FULL syncs every commit, which group commits make affordable
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=FULL")
+        conn.executescript(_SCHEMA)
+        return conn
+
+    def _ensure_writer(self):
+        with self._lock:
+            if self._writer is None and not self._closed:
+                self._writer = threading.Thread(target=self._run, name="escalation-writer", daemon=True)
+                self._writer.start()
+                atexit.register(self.close)
+
+    def enqueue(self, ticket: dict) -> bool:
+        """Buffer a ticket for the writer; False when disabled, closed or full"""
+        if not self.enabled or self._closed:
+            return False
+        if self._writer is None:
+            self._ensure_writer()
+        try:
+            self._buffer.put_nowait((time.time(), ticket))
+        except queue.Full:
+            self.dropped += 1
+            if self.dropped == 1 or self.dropped % 1000 == 0:
+                print(f"Warning: escalation buffer full, {self.dropped} tickets dropped so far")
+            return False
+        self.enqueued += 1
+        return True
+
+    def _run(self):
+        with closing(self._connect()) as conn:
+            stopping = False
+            while not stopping:
+                item = self._buffer.get()
+                if item is _STOP:
+                    return
+                batch = [item]
+                deadline = time.monotonic() + self.flush_interval
+                while len(batch) < self.batch_size:
+                    try:
+                        item = self._buffer.get(timeout=max(0.0, deadline - time.monotonic()))
+                    except queue.Empty:
+                        break
+                    if item is _STOP:
+                        stopping = True
+                        break
+                    batch.append(item)
+                self._write(conn, batch)
+
+    def _write(self, conn: sqlite3.Connection, batch: list):
+        rows = [
+            (created_at, *(ticket.get(column) for column in _COLUMNS),
+             json.dumps({key: value for key, value in ticket.items() if key not in _COLUMNS}))
+            for created_at, ticket in batch
+        ]
+        for attempt in range(3):
+            try:
+                with conn:
+                    conn.executemany(
+                        "INSERT INTO escalations (created_at, user_id, category, reason, request, details) "
+                        "VALUES (?, ?, ?, ?, ?, ?)", rows
+                    )
+                    last_id = conn.execute("SELECT MAX(id) FROM escalations").fetchone()[0]
+                break
+            except sqlite3.Error as e:
+                print(f"Warning: escalation write failed (attempt {attempt + 1}): {e}")
+                time.sleep(0.1 * 2 ** attempt)
+        else:
+            self.failed += len(rows)
+            return
+
+        self.written += len(rows)
+        self.commits += 1
+        with self._committed:
+            self.last_id = last_id
+            self._committed.notify_all()
+
+    def wait_for_commit(self, timeout: float) -> bool:
+        """Block until the writer commits a batch; False on timeout"""
+        with self._committed:
+            return self._committed.wait(timeout)
+
+    def close(self):
+        """Stop accepting tickets and flush the buffer to disk"""
+        with self._lock:
+            self._closed = True
+            writer, self._writer = self._writer, None
+        if writer is not None:
+            self._buffer.put(_STOP)
+            writer.join()
+
+    def read(self, after_id: int = 0, limit: int = 100) -> List[dict]:
+        """Committed tickets with an id above `after_id`, oldest first"""
+        if not self.enabled or not os.path.exists(self.path):
+            return []
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT id, created_at, user_id, category, reason, request, details FROM escalations "
+                "WHERE id > ? ORDER BY id LIMIT ?", (after_id, limit)
+            ).fetchall()
+        return [
+            {"id": id, "created_at": created_at, "user_id": user_id, "category": category,
+             "reason": reason, "request": request, **json.loads(details)}
+            for id, created_at, user_id, category, reason, request, details in rows
+        ]
+
+    def count(self) -> int:
+        if not self.enabled or not os.path.exists(self.path):
+            return 0
+        with closing(self._connect()) as conn:
+            return conn.execute("SELECT COUNT(*) FROM escalations").fetchone()[0]
+
+    def get_cursor(self, consumer: str) -> int:
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT last_id FROM consumers WHERE name = ?", (consumer,)).fetchone()
+        return row[0] if row else 0
+
+    def set_cursor(self, consumer: str, last_id: int):
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT INTO consumers (name, last_id) VALUES (?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET last_id = excluded.last_id", (consumer, last_id)
+            )
+
+    @property
+    def buffered(self) -> int:
+        return self._buffer.qsize()
+
+    def collect_metrics(self):
+        """Scrape-time samples for the metrics registry"""
+        return [
+            ("helpdesk_escalation_buffer_depth", "gauge", "Escalated tickets waiting to be written",
+             [({}, self.buffered)]),
+            ("helpdesk_escalation_tickets_total", "counter", "Escalated tickets by outcome",
+             [({"outcome": "written"}, self.written), ({"outcome": "dropped"}, self.dropped),
+              ({"outcome": "failed"}, self.failed)]),
+            ("helpdesk_escalation_commits_total", "counter", "Group commits to the escalation queue",
+             [({}, self.commits)])
+        ]
+
+    def get_stats(self) -> dict:
+        return {
+            "path": self.path,
+            "buffered": self.buffered,
+            "buffer_size": self.buffer_size,
+            "batch_size": self.batch_size,
+            "flush_interval_ms": self.flush_interval * 1000.0,
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "commits": self.commits,
+            "mean_commit_size": round(self.written / self.commits, 2) if self.commits else 0.0,
+            "last_id": self.last_id
+        }
+
+
+def webhook(url: str, timeout: float = 10.0) -> Callable[[List[dict]], None]:
+    """Deliver function that POSTs `{"escalations": [...]}` as JSON to `url`"""
+    def deliver(tickets: List[dict]):
+        body = json.dumps({"escalations": tickets}).encode()
+        request = urllib.request.Request(url, data=body, headers={"Content-Type": "application/json"})
+        # Non-2xx responses raise HTTPError, so the batch is retried
+        with urllib.request.urlopen(request, timeout=timeout):
+            pass
+    return deliver
+
+
+class EscalationDispatcher:
+    """Background thread that hands queued escalations to a downstream consumer.
+
+    Tickets after the consumer's cursor are passed to `deliver` in batches of
+    up to `batch_size`, and the cursor only advances once `deliver` returns:
+    delivery is at least once, and a crash or failure re-sends rather than
+    loses tickets. Failures back off exponentially up to `max_backoff`
+    seconds. While idle the thread wakes on each commit in this process and
+    otherwise polls every `poll_interval` seconds, which picks up tickets
+    written by other worker processes.
+    """
+
+    def __init__(self, escalation_queue: EscalationQueue, deliver: Callable[[List[dict]], None],
+                 consumer: str = "webhook", batch_size: int = 50, poll_interval: float = 1.0,
+                 max_backoff: float = 60.0):
+        self.queue = escalation_queue
+        self.deliver = deliver
+        self.consumer = consumer
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_backoff = max_backoff
+        self._stop = threading.Event()
+        self._thread = None
+
+        self.delivered = 0
+        self.failures = 0
+        self.last_error: Optional[str] = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name=f"escalation-{self.consumer}", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.poll_interval + 1)
+            self._thread = None
+
+    def dispatch_once(self) -> int:
+        """Deliver the next batch; the number of tickets delivered"""
+        tickets = self.queue.read(self.queue.get_cursor(self.consumer), self.batch_size)
+        if tickets:
+            self.deliver(tickets)
+            self.queue.set_cursor(self.consumer, tickets[-1]["id"])
+            self.delivered += len(tickets)
+        return len(tickets)
+
+    def _run(self):
+        backoff = 0.0
+        while not self._stop.is_set():
+            try:
+                delivered = self.dispatch_once()
+                backoff = 0.0
+            except Exception as e:
+                self.failures += 1
+                self.last_error = f"{type(e).__name__}: {e}"
+                backoff = min(self.max_backoff, backoff * 2 or 1.0)
+                print(f"Warning: escalation delivery to {self.consumer} failed, retrying in {backoff:.0f}s: {self.last_error}")
+                self._stop.wait(backoff)
+                continue
+            if delivered < self.batch_size:
+                self.queue.wait_for_commit(self.poll_interval)
+
+    def get_stats(self) -> dict:
+        return {
+            "consumer": self.consumer,
+            "delivered": self.delivered,
+            "failures": self.failures,
+            "last_error": self.last_error
+        }
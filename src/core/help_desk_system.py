@@ -1,9 +1,10 @@
+from typing import Any, AsyncIterator, List, Tuple
 from ..workflows.helpdesk_workflow import HelpDeskWorkflow
 from .state import HelpDeskRequest, HelpDeskResponse, ClassificationResult, RequestCategory
 
 class HelpDeskSystem:
-    def __init__(self):
-        self.multi_agent_workflow = HelpDeskWorkflow()
+    def __init__(self, workflow: HelpDeskWorkflow = None):
+        self.multi_agent_workflow = workflow or HelpDeskWorkflow()
     
     def process_request(self, request: HelpDeskRequest) -> HelpDeskResponse:
         # Process request through multi-agent workflow
@@ -11,13 +12,60 @@ class HelpDeskSystem:
             request=request.request,
             user_id=request.user_id
         )
-        
+        return self._to_response(request, result)
+    
+    async def aprocess_request(self, request: HelpDeskRequest) -> HelpDeskResponse:
+        result = await self.multi_agent_workflow.aprocess_request(
+            request=request.request,
+            user_id=request.user_id
+        )
+        return self._to_response(request, result)
+    
+    async def astream_request(self, request: HelpDeskRequest) -> AsyncIterator[Tuple[str, Any]]:
+        """Stream (event, data) pairs; the last event is "result" with the HelpDeskResponse"""
+        async for event, data in self.multi_agent_workflow.astream_request(
+            request=request.request,
+            user_id=request.user_id
+        ):
+            if event == "result":
+                data = self._to_response(request, data)
+            yield event, data
+    
+    async def aprocess_batch(self, requests: List[HelpDeskRequest], concurrency: int = 8) -> list:
+        """Responses in input order; a failed request yields its exception"""
+        results = await self.multi_agent_workflow.aprocess_batch(
+            [(request.request, request.user_id) for request in requests],
+            concurrency=concurrency
+        )
+        return [
+            result if isinstance(result, Exception) else self._to_response(request, result)
+            for request, result in zip(requests, results)
+        ]
+    
+    def admission_priority(self, request: HelpDeskRequest) -> Tuple[int, str]:
+        return self.multi_agent_workflow.classifier_agent.admission_priority(request.request)
+    
+    def warm_up(self):
+        self.multi_agent_workflow.warm_up()
+    
+    def close(self):
+        self.multi_agent_workflow.close()
+    
+    def reload_knowledge(self) -> dict:
+        return self.multi_agent_workflow.reload_knowledge()
+    
+    def reload_escalation_rules(self) -> dict:
+        return self.multi_agent_workflow.reload_escalation_rules()
+    
+    def _to_response(self, request: HelpDeskRequest, result: dict) -> HelpDeskResponse:
         # Convert multi-agent result to original response format
         return HelpDeskResponse(
             request=request.request,
             user_id=request.user_id,
             classification=result['classification'].category,
+            classification_scores=result['classification'].top_categories,
             response=result['response'],
             escalate=result['escalate'],
-            escalation_reason=result['escalation_reason']
-        )
\ No newline at end of file
+            escalation_reason=result['escalation_reason'],
+            prompt_tokens=result['prompt_tokens']
+        )
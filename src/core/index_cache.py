@@ -0,0 +1,129 @@
+from langchain_community.vectorstores import FAISS
+from langchain_core.embeddings import Embeddings
+from typing import List, Optional
+import numpy as np
+import hashlib
+import json
+import os
+import pickle
+import shutil
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(__file__), '..', '..', '.index_cache')
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class IndexCache:
+    """On-disk store for embedded indexes.
+
+    Every entry is saved next to a manifest holding the hashes of the source
+    files it was built from and the embedding model identity. An entry is only
+    loaded back when both still match; otherwise the caller rebuilds it.
+    Set INDEX_CACHE_DIR to an empty string to disable caching.
+
+    With `mmap` (INDEX_MMAP=true) indexes and arrays are memory-mapped
+    read-only instead of copied into the process, so several server workers
+    share one copy in the page cache.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, mmap: Optional[bool] = None):
+        if cache_dir is None:
+            cache_dir = os.getenv('INDEX_CACHE_DIR', DEFAULT_CACHE_DIR)
+        self.cache_dir = os.path.abspath(cache_dir) if cache_dir else None
+        if mmap is None:
+            mmap = os.getenv('INDEX_MMAP', 'false').lower() == 'true'
+        self.mmap = mmap
+
+    @property
+    def enabled(self) -> bool:
+        return self.cache_dir is not None
+
+    def fingerprint(self, sources: List[str], model_id: str, extra=None) -> dict:
+        """Build the manifest describing what an index was built from"""
+        return {
+            "model": model_id,
+            "sources": {os.path.basename(path): file_sha256(path) for path in sources},
+            "extra": extra
+        }
+
+    @staticmethod
+    def digest(manifest: dict) -> str:
+        """Short content version of a manifest, e.g. for cache invalidation"""
+        return hashlib.sha256(json.dumps(manifest, sort_keys=True).encode()).hexdigest()[:16]
+
+    def _entry_dir(self, name: str) -> str:
+        return os.path.join(self.cache_dir, name)
+
+    def _is_fresh(self, name: str, manifest: dict) -> bool:
+        manifest_file = os.path.join(self._entry_dir(name), 'manifest.json')
+        try:
+            with open(manifest_file, 'r') as f:
+                return json.load(f) == manifest
+        except (OSError, ValueError):
+            return False
+
+    def _write_entry(self, name: str, manifest: dict, write_payload):
+        # Write into a scratch directory first so a crash never leaves a
+        # half-written entry behind a valid manifest
+        entry_dir = self._entry_dir(name)
+        tmp_dir = f"{entry_dir}.tmp-{os.getpid()}"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        try:
+            os.makedirs(tmp_dir)
+            write_payload(tmp_dir)
+            with open(os.path.join(tmp_dir, 'manifest.json'), 'w') as f:
+                json.dump(manifest, f, indent=2)
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            os.replace(tmp_dir, entry_dir)
+        except OSError as e:
+            # Caching is best effort; the in-memory index is still usable
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            print(f"Warning: could not cache index '{name}': {e}")
+
+    def load_faiss(self, name: str, manifest: dict, embeddings: Embeddings) -> Optional[FAISS]:
+        if not self.enabled or not self._is_fresh(name, manifest):
+            return None
+        try:
+            if self.mmap:
+                return self._load_faiss_mmap(self._entry_dir(name), embeddings)
+            return FAISS.load_local(
+                self._entry_dir(name), embeddings, allow_dangerous_deserialization=True
+            )
+        except Exception:
+            return None
+
+    def _load_faiss_mmap(self, path: str, embeddings: Embeddings) -> FAISS:
+        import faiss
+        # IO_FLAG_MMAP_IFC maps the vector codes of flat, IVF and HNSW indexes
+        flags = getattr(faiss, 'IO_FLAG_MMAP_IFC', faiss.IO_FLAG_MMAP) | faiss.IO_FLAG_READ_ONLY
+        index = faiss.read_index(os.path.join(path, 'index.faiss'), flags)
+        # Same layout as FAISS.save_local
+        with open(os.path.join(path, 'index.pkl'), 'rb') as f:
+            docstore, index_to_docstore_id = pickle.load(f)
+        return FAISS(embeddings, index, docstore, index_to_docstore_id)
+
+    def save_faiss(self, name: str, store: FAISS, manifest: dict):
+        if self.enabled:
+            self._write_entry(name, manifest, store.save_local)
+
+    def load_array(self, name: str, manifest: dict, mmap: Optional[bool] = None) -> Optional[np.ndarray]:
+        if not self.enabled or not self._is_fresh(name, manifest):
+            return None
+        mmap = self.mmap if mmap is None else mmap
+        try:
+            return np.load(os.path.join(self._entry_dir(name), 'vectors.npy'), mmap_mode='r' if mmap else None)
+        except (OSError, ValueError):
+            return None
+
+    def save_array(self, name: str, array, manifest: dict):
+        if self.enabled:
+            self._write_entry(
+                name, manifest,
+                lambda path: np.save(os.path.join(path, 'vectors.npy'), np.asarray(array, dtype=np.float32))
+            )
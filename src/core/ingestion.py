@@ -0,0 +1,256 @@
+from langchain_core.documents import Document
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+import itertools
+import json
+import multiprocessing
+import os
+import tempfile
+import time
+
+import numpy as np
+
+
+def _source_name(path: str, name: Optional[str]) -> str:
+    return name or os.path.basename(path)
+
+
+def markdown_sections(path: str, name: str = None) -> Iterator[Document]:
+    """One document per `## ` section, read line by line"""
+    name = _source_name(path, name)
+    title, body = None, []
+    with open(path, 'r') as f:
+        for line in f:
+            if line.startswith('## '):
+                if title is not None:
+                    yield Document(page_content=''.join(body).strip(), metadata={'source': f'{name}#{title}'})
+                title, body = line[3:].rstrip('\n'), []
+            elif title is not None:
+                body.append(line)
+    if title is not None:
+        yield Document(page_content=''.join(body).strip(), metadata={'source': f'{name}#{title}'})
+
+
+def format_record(record) -> str:
+    """Text of a JSON record: its `text` or `content` field, else its fields as `Key: value` lines"""
+    if not isinstance(record, dict):
+        return record if isinstance(record, str) else json.dumps(record)
+    for field in ('text', 'content', 'page_content'):
+        if isinstance(record.get(field), str):
+            return record[field]
+    lines = []
+    for key, value in record.items():
+        if key == 'id' or value in (None, '', []):
+            continue
+        if isinstance(value, list):
+            value = ' '.join(item if isinstance(item, str) else json.dumps(item) for item in value)
+        elif isinstance(value, dict):
+            value = json.dumps(value)
+        lines.append(f"{key.replace('_', ' ').title()}: {value}")
+    return '\n'.join(lines)
+
+
+def _record_id(record, default) -> str:
+    if isinstance(record, dict) and record.get('id') is not None:
+        return str(record['id'])
+    return str(default)
+
+
+def json_records(path: str, name: str = None, format_record: Callable[[Any], str] = format_record) -> Iterator[Document]:
+    """One document per item of a JSON list, or per value of a JSON object.
+
+    A JSON document has to be parsed whole; export large corpora as JSONL.
+    """
+    name = _source_name(path, name)
+    with open(path, 'r') as f:
+        data = json.load(f)
+    items = data.items() if isinstance(data, dict) else enumerate(data)
+    for key, record in items:
+        text = format_record(record)
+        if text:
+            yield Document(page_content=text, metadata={'source': f'{name}#{_record_id(record, key)}'})
+
+
+def jsonl_records(path: str, name: str = None, format_record: Callable[[Any], str] = format_record) -> Iterator[Document]:
+    """One document per line of a JSON Lines file, read line by line"""
+    name = _source_name(path, name)
+    with open(path, 'r') as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            text = format_record(record)
+            if text:
+                yield Document(page_content=text, metadata={'source': f'{name}#{_record_id(record, line_number)}'})
+
+
+# File suffix -> loader(path) yielding Documents
+LOADERS: Dict[str, Callable[..., Iterator[Document]]] = {
+    '.md': markdown_sections,
+    '.json': json_records,
+    '.jsonl': jsonl_records
+}
+
+
+def register_loader(suffix: str, loader: Callable[..., Iterator[Document]]):
+    LOADERS[suffix.lower()] = loader
+
+
+def load_source(path: str) -> Iterator[Document]:
+    suffix = os.path.splitext(path)[1].lower()
+    if suffix not in LOADERS:
+        raise ValueError(f"No loader for {path}; known suffixes: {', '.join(sorted(LOADERS))}")
+    return LOADERS[suffix](path)
+
+
+def chunked(iterable: Iterable, size: int) -> Iterator[list]:
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+_worker_model = None
+
+
+def _init_worker(model_factory: Callable):
+    global _worker_model
+    # One inference thread per process; the pool provides the parallelism
+    os.environ.setdefault('OMP_NUM_THREADS', '1')
+    _worker_model = model_factory()
+
+
+def _embed_in_worker(texts: List[str]) -> np.ndarray:
+    return np.asarray(_worker_model.embed_documents(texts), dtype=np.float32)
+
+
+class ChunkEmbedder:
+    """Embeds a stream of text chunks and yields the vectors in input order.
+
+    Items are `(payload, texts)` pairs and come back as `(payload, vectors)`.
+    With `workers` > 1 and a picklable `model_factory`, chunks are embedded
+    on a process pool, each process holding its own copy of the model; the
+    pool is only started once a second chunk needs embedding, so small
+    corpora never pay for it. At most `2 * workers` chunks are in flight,
+    which bounds memory whatever the length of the stream.
+    """
+
+    def __init__(self, embed_documents: Callable[[List[str]], List[List[float]]],
+                 model_factory: Optional[Callable] = None, workers: int = 1):
+        self.embed_documents = embed_documents
+        self.model_factory = model_factory
+        self.workers = workers
+        self._pool = None
+
+    def _embed_inline(self, texts: List[str]) -> np.ndarray:
+        return np.asarray(self.embed_documents(texts), dtype=np.float32)
+
+    def map(self, items: Iterable[Tuple[Any, List[str]]]) -> Iterator[Tuple[Any, np.ndarray]]:
+        pending = deque()
+        embedded_chunks = 0
+        try:
+            for payload, texts in items:
+                if not texts:
+                    result = np.zeros((0, 0), dtype=np.float32)
+                elif embedded_chunks and self._use_pool():
+                    result = self._pool.submit(_embed_in_worker, texts)
+                else:
+                    result = self._embed_inline(texts)
+                embedded_chunks += bool(texts)
+                pending.append((payload, result))
+
+                # Hand back finished chunks in order, with at most 2 * workers in flight
+                while pending and (len(pending) > 2 * self.workers or not isinstance(pending[0][1], Future)):
+                    yield self._resolve(pending.popleft())
+            while pending:
+                yield self._resolve(pending.popleft())
+        finally:
+            for _, result in pending:
+                if isinstance(result, Future):
+                    result.cancel()
+
+    @staticmethod
+    def _resolve(entry):
+        payload, result = entry
+        return payload, result.result() if isinstance(result, Future) else result
+
+    def _use_pool(self) -> bool:
+        if self.workers <= 1 or self.model_factory is None:
+            return False
+        if self._pool is None:
+            # spawn, not fork: the parent may already hold model threads and locks
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker, initargs=(self.model_factory,)
+            )
+        return True
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+
+class VectorSpool:
+    """Append-only float32 vectors kept in a temporary file instead of memory"""
+
+    def __init__(self):
+        self._file = tempfile.TemporaryFile()
+        self.count = 0
+        self.dimension = None
+
+    def append(self, vectors: np.ndarray):
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        if len(vectors):
+            self.dimension = vectors.shape[1]
+            self._file.write(vectors.tobytes())
+            self.count += len(vectors)
+
+    def array(self) -> np.ndarray:
+        self._file.flush()
+        if not self.count:
+            return np.zeros((0, 0), dtype=np.float32)
+        return np.memmap(self._file, dtype=np.float32, mode='r', shape=(self.count, self.dimension))
+
+    def close(self):
+        self._file.close()
+
+
+class IngestionProgress:
+    """Counters for one ingestion run, printed at most every `interval` seconds"""
+
+    def __init__(self, label: str, interval: float = None):
+        self.label = label
+        self.interval = interval if interval is not None else float(os.getenv('KNOWLEDGE_PROGRESS_INTERVAL', '10'))
+        self.documents = 0
+        self.passages = 0
+        self.embedded = 0
+        self.start = time.perf_counter()
+        self._last_report = self.start
+
+    def count_documents(self, documents: Iterable[Document]) -> Iterator[Document]:
+        for document in documents:
+            self.documents += 1
+            yield document
+
+    def update(self, passages: int, embedded: int):
+        self.passages += passages
+        self.embedded += embedded
+        now = time.perf_counter()
+        if self.interval > 0 and now - self._last_report >= self.interval:
+            self._last_report = now
+            print(f"{self.label}: {self.passages} passages indexed ({self.embedded} embedded), "
+                  f"{self.passages / (now - self.start):.0f}/s")
+
+    def as_dict(self) -> dict:
+        elapsed = time.perf_counter() - self.start
+        return {
+            "documents": self.documents,
+            "passages": self.passages,
+            "embedded": self.embedded,
+            "seconds": round(elapsed, 3),
+            "passages_per_second": round(self.passages / elapsed, 1) if elapsed else 0.0
+        }
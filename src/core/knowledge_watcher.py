@@ -0,0 +1,62 @@
+from typing import Callable, Dict, List, Tuple
+import os
+import threading
+
+
+class KnowledgeWatcher:
+    """Background thread that hot-reloads the knowledge base when its files change.
+
+    Files are polled by modification time and size every `interval` seconds.
+    A change is only acted on once the files have stayed the same for a full
+    interval, so a reload never picks up a half-saved edit. A failed reload
+    (e.g. invalid JSON) keeps the live index and is retried on the next change.
+    """
+
+    def __init__(self, source_files: Callable[[], List[str]], reload: Callable[[], dict],
+                 interval: float = 5.0):
+        self.source_files = source_files
+        self.reload = reload
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+        self._loaded = self._snapshot()
+
+    def _snapshot(self) -> Dict[str, Tuple[int, int]]:
+        snapshot = {}
+        for path in self.source_files():
+            try:
+                stat = os.stat(path)
+                snapshot[path] = (stat.st_mtime_ns, stat.st_size)
+            except OSError:
+                snapshot[path] = None
+        return snapshot
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="knowledge-watcher", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 1)
+            self._thread = None
+
+    def _run(self):
+        pending = self._loaded
+        while not self._stop.wait(self.interval):
+            snapshot = self._snapshot()
+            if snapshot != pending:
+                # Still being edited; wait for it to settle
+                pending = snapshot
+                continue
+            if snapshot == self._loaded:
+                continue
+            try:
+                stats = self.reload()
+                self._loaded = snapshot
+                if stats.get("reloaded"):
+                    print(f"Knowledge base reloaded: {stats}")
+            except Exception as e:
+                print(f"Warning: knowledge base reload failed, keeping current index: {e}")
+                self._loaded = snapshot
@@ -0,0 +1,396 @@
+from langchain_core.language_models import BaseLanguageModel
+from langchain_core.runnables import Runnable
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from collections import deque
+from typing import AsyncIterator, Callable, List, Optional
+import asyncio
+import os
+import threading
+import time
+
+from .metrics import (LLM_FAILOVERS, LLM_HEDGES, LLM_PROVIDER_CALLS, LLM_PROVIDER_DURATION,
+                      LLM_PROVIDER_IN_FLIGHT)
+
+
+class LLMGatewayError(Exception):
+    """Every provider attempt failed or the deadline passed"""
+
+
+def _text(result) -> str:
+    return result if isinstance(result, str) else result.content
+
+
+class LLMProvider:
+    """One LLM client plus its concurrency cap and recent latencies.
+
+    The client is created once and reused, so its HTTP connection pool stays
+    warm across requests. Async calls are capped by a semaphore (one per
+    event loop) and sync calls run on a thread pool of the same size.
+    `on_dispatch` is called once a call holds its slot or thread, i.e. when
+    it stops queueing and starts on the provider.
+    """
+
+    def __init__(self, name: str, llm: Runnable, max_concurrency: int = 8, window: int = 200):
+        self.name = name
+        self.llm = llm
+        self.max_concurrency = max_concurrency
+        self.latencies = deque(maxlen=window)
+        self.executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix=f"llm-{name}")
+        # Sync calls submitted and not finished, queued ones included
+        self._threads_busy = 0
+        self._threads_lock = threading.Lock()
+        self._loop = None
+        self._semaphore = None
+
+        self._in_flight = LLM_PROVIDER_IN_FLIGHT.labels(name)
+        self._duration = LLM_PROVIDER_DURATION.labels(name)
+        self._results = {
+            result: LLM_PROVIDER_CALLS.labels(name, result) for result in ('ok', 'error', 'cancelled')
+        }
+
+    def semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    def has_capacity(self, threaded: bool = False) -> bool:
+        """Whether a new call would start at once instead of waiting for a slot"""
+        if threaded:
+            return self._threads_busy < self.max_concurrency
+        return not self.semaphore().locked()
+
+    def submit(self, prompt: str, on_dispatch: Callable[[], None] = None) -> Future:
+        """Run `invoke` on the provider's thread pool"""
+        with self._threads_lock:
+            self._threads_busy += 1
+        future = self.executor.submit(self.invoke, prompt, on_dispatch)
+        future.add_done_callback(self._thread_done)
+        return future
+
+    def _thread_done(self, _):
+        with self._threads_lock:
+            self._threads_busy -= 1
+
+    def p95(self, min_samples: int) -> Optional[float]:
+        if len(self.latencies) < min_samples:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[int(0.95 * (len(ordered) - 1))]
+
+    def _record(self, start: float, result: str):
+        elapsed = time.perf_counter() - start
+        self._results[result].inc()
+        if result == 'ok':
+            self.latencies.append(elapsed)
+            self._duration.observe(elapsed)
+
+    def invoke(self, prompt: str, on_dispatch: Callable[[], None] = None) -> str:
+        if on_dispatch is not None:
+            on_dispatch()
+        start = time.perf_counter()
+        self._in_flight.inc()
+        try:
+            text = _text(self.llm.invoke(prompt))
+        except Exception:
+            self._record(start, 'error')
+            raise
+        finally:
+            self._in_flight.dec()
+        self._record(start, 'ok')
+        return text
+
+    async def ainvoke(self, prompt: str, on_dispatch: Callable[[], None] = None) -> str:
+        async with self.semaphore():
+            if on_dispatch is not None:
+                on_dispatch()
+            start = time.perf_counter()
+            self._in_flight.inc()
+            try:
+                text = _text(await self.llm.ainvoke(prompt))
+            except asyncio.CancelledError:
+                # The other hedged request won
+                self._record(start, 'cancelled')
+                raise
+            except Exception:
+                self._record(start, 'error')
+                raise
+            finally:
+                self._in_flight.dec()
+            self._record(start, 'ok')
+            return text
+
+
+class LLMGateway:
+    """Deadline, hedging and failover in front of one or more LLM providers.
+
+    A call goes to the first provider. If it has not answered once that
+    provider's rolling p95 latency has passed since it got a slot, a hedged
+    request is sent to the next provider (or again to the same one when
+    only one is configured), and whichever answers first wins; the other is
+    cancelled. Time spent queueing for a slot does not count, and no hedge
+    is sent to a provider without a free slot, so a saturated provider is
+    not handed twice the load.
+    A failed attempt fails over to the next provider straight away. The
+    whole call is bounded by `timeout` seconds.
+
+    Streaming fails over only until the first token; after that the stream
+    belongs to the provider that produced it.
+
+    LLM_TIMEOUT_SECONDS (default 20), LLM_MAX_CONCURRENCY (per provider,
+    default 8), LLM_HEDGE (default true) and LLM_HEDGE_MIN_SAMPLES (latencies
+    needed before hedging, default 20) configure it.
+    """
+
+    def __init__(self, providers: List[LLMProvider], timeout: float = None, hedge: bool = None,
+                 hedge_min_samples: int = None):
+        if not providers:
+            raise ValueError("LLMGateway needs at least one provider")
+        self.providers = providers
+        self.timeout = timeout if timeout is not None else float(os.getenv('LLM_TIMEOUT_SECONDS', '20'))
+        if hedge is None:
+            hedge = os.getenv('LLM_HEDGE', 'true').lower() == 'true'
+        self.hedge = hedge
+        self.hedge_min_samples = hedge_min_samples if hedge_min_samples is not None else int(
+            os.getenv('LLM_HEDGE_MIN_SAMPLES', '20'))
+        self.hedges_skipped = 0
+
+    @classmethod
+    def from_env(cls, llm: BaseLanguageModel = None) -> "LLMGateway":
+        """Gateway over an injected model, or over the configured providers.
+
+        LLM_PROVIDER selects the primary; the other provider is added as the
+        failover target when its API key is set and LLM_FAILOVER is not false.
+        """
+        max_concurrency = int(os.getenv('LLM_MAX_CONCURRENCY', '8'))
+        if llm is not None:
+            return cls([LLMProvider('custom', llm, max_concurrency)])
+
+        timeout = float(os.getenv('LLM_TIMEOUT_SECONDS', '20'))
+        primary = os.getenv('LLM_PROVIDER', 'gemini').lower()
+        names = [primary, 'openai' if primary == 'gemini' else 'gemini']
+        if os.getenv('LLM_FAILOVER', 'true').lower() != 'true':
+            names = names[:1]
+
+        providers = []
+        for name in names:
+            if name != primary and not os.getenv('OPENAI_API_KEY' if name == 'openai' else 'GEMINI_API_KEY'):
+                continue
+            providers.append(LLMProvider(name, _build_client(name, timeout, max_concurrency), max_concurrency))
+        return cls(providers)
+
+    def _attempts(self) -> List[LLMProvider]:
+        # A single provider still gets one hedge or retry
+        return self.providers if len(self.providers) > 1 else self.providers * 2
+
+    def _hedge_delay(self, provider: LLMProvider) -> Optional[float]:
+        return provider.p95(self.hedge_min_samples) if self.hedge else None
+
+    def invoke(self, prompt: str) -> str:
+        attempts = self._attempts()
+        deadline = time.monotonic() + self.timeout
+        futures = {}
+        errors = []
+        launched = 0
+        # Resolves to the time the first attempt got a thread; the hedge timer starts there
+        dispatched = Future()
+        hedge_declined = False
+
+        def launch():
+            nonlocal launched
+            provider = attempts[launched]
+            on_dispatch = (lambda: dispatched.set_result(time.monotonic())) if not launched else None
+            launched += 1
+            futures[provider.submit(prompt, on_dispatch)] = provider
+
+        launch()
+        while futures:
+            now = time.monotonic()
+            remaining = deadline - now
+            if remaining <= 0:
+                break
+            hedge_delay = self._hedge_delay(attempts[0])
+            can_hedge = (launched == 1 and launched < len(attempts) and hedge_delay is not None
+                         and not hedge_declined)
+            timeout, waiting = remaining, set(futures)
+            if can_hedge and dispatched.done():
+                timeout = min(remaining, max(0.0, dispatched.result() + hedge_delay - now))
+            elif can_hedge:
+                # Wake up when the first attempt leaves the queue
+                waiting.add(dispatched)
+            done, _ = wait(waiting, timeout=timeout, return_when=FIRST_COMPLETED)
+            done.discard(dispatched)
+            if not done:
+                if can_hedge and dispatched.done() and time.monotonic() >= dispatched.result() + hedge_delay:
+                    if attempts[launched].has_capacity(threaded=True):
+                        LLM_HEDGES.inc()
+                        launch()
+                    else:
+                        hedge_declined = True
+                        self.hedges_skipped += 1
+                continue
+            for future in done:
+                futures.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    errors.append(e)
+                    continue
+                for other in futures:
+                    other.cancel()
+                return result
+            if not futures and launched < len(attempts):
+                LLM_FAILOVERS.inc()
+                launch()
+
+        for future in futures:
+            future.cancel()
+        raise LLMGatewayError(self._describe_failure(errors))
+
+    async def ainvoke(self, prompt: str) -> str:
+        attempts = self._attempts()
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.timeout
+        tasks = {}
+        errors = []
+        launched = 0
+        # Resolves to the time the first attempt got its slot; the hedge timer starts there
+        dispatched = loop.create_future()
+        hedge_declined = False
+
+        def launch():
+            nonlocal launched
+            provider = attempts[launched]
+            on_dispatch = (lambda: dispatched.set_result(loop.time())) if not launched else None
+            launched += 1
+            tasks[loop.create_task(provider.ainvoke(prompt, on_dispatch))] = provider
+
+        launch()
+        try:
+            while tasks:
+                now = loop.time()
+                remaining = deadline - now
+                if remaining <= 0:
+                    break
+                hedge_delay = self._hedge_delay(attempts[0])
+                can_hedge = (launched == 1 and launched < len(attempts) and hedge_delay is not None
+                             and not hedge_declined)
+                timeout, waiting = remaining, set(tasks)
+                if can_hedge and dispatched.done():
+                    timeout = min(remaining, max(0.0, dispatched.result() + hedge_delay - now))
+                elif can_hedge:
+                    # Wake up when the first attempt leaves the queue
+                    waiting.add(dispatched)
+                done, _ = await asyncio.wait(waiting, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                done.discard(dispatched)
+                if not done:
+                    if can_hedge and dispatched.done() and loop.time() >= dispatched.result() + hedge_delay:
+                        if attempts[launched].has_capacity():
+                            LLM_HEDGES.inc()
+                            launch()
+                        else:
+                            hedge_declined = True
+                            self.hedges_skipped += 1
+                    continue
+                for task in done:
+                    tasks.pop(task)
+                    try:
+                        return task.result()
+                    except Exception as e:
+                        errors.append(e)
+                if not tasks and launched < len(attempts):
+                    LLM_FAILOVERS.inc()
+                    launch()
+        finally:
+            for task in tasks:
+                task.cancel()
+        raise LLMGatewayError(self._describe_failure(errors))
+
+    async def astream(self, prompt: str) -> AsyncIterator[str]:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.timeout
+        errors = []
+        for index, provider in enumerate(self.providers):
+            if index:
+                LLM_FAILOVERS.inc()
+            async with provider.semaphore():
+                stream = provider.llm.astream(prompt)
+                start = time.perf_counter()
+                provider._in_flight.inc()
+                try:
+                    try:
+                        first = await asyncio.wait_for(stream.__anext__(), max(0.0, deadline - loop.time()))
+                    except StopAsyncIteration:
+                        provider._record(start, 'ok')
+                        return
+                    except Exception as e:
+                        # Nothing was sent yet, so the next provider can take over
+                        provider._record(start, 'error')
+                        await stream.aclose()
+                        errors.append(e)
+                        continue
+
+                    yield _text(first)
+                    # The deadline covers the whole answer, not just the first token
+                    while True:
+                        try:
+                            chunk = await asyncio.wait_for(stream.__anext__(), max(0.0, deadline - loop.time()))
+                        except StopAsyncIteration:
+                            break
+                        except asyncio.TimeoutError:
+                            await stream.aclose()
+                            raise LLMGatewayError(f"LLM stream exceeded {self.timeout:g}s")
+                        yield _text(chunk)
+                    provider._record(start, 'ok')
+                    return
+                except Exception:
+                    provider._record(start, 'error')
+                    raise
+                finally:
+                    provider._in_flight.dec()
+        raise LLMGatewayError(self._describe_failure(errors))
+
+    def _describe_failure(self, errors: list) -> str:
+        if not errors:
+            return f"no LLM response within {self.timeout:g}s"
+        return "; ".join(f"{type(e).__name__}: {e}" for e in errors)
+
+    def get_stats(self) -> dict:
+        return {
+            "providers": [provider.name for provider in self.providers],
+            "timeout_seconds": self.timeout,
+            "hedge": self.hedge,
+            "hedges_skipped": self.hedges_skipped,
+            "p95_seconds": {
+                provider.name: provider.p95(self.hedge_min_samples) for provider in self.providers
+            }
+        }
+
+
+def _build_client(name: str, timeout: float, max_concurrency: int) -> Runnable:
+    # Retries are left to the gateway (hedging and failover), not the client
+    if name == 'gemini':
+        from langchain_google_genai import ChatGoogleGenerativeAI
+        llm = ChatGoogleGenerativeAI(
+            model="gemini-2.5-pro",
+            google_api_key=os.getenv('GEMINI_API_KEY'),
+            temperature=0.7
+        )
+        # langchain-google-genai 1.x ignores its timeout and max_retries fields,
+        # so the deadline and retry policy go straight to the API call. Its own
+        # wrapper still retries a failed call once, after a backoff of a few seconds
+        return llm.bind(timeout=timeout, retry=None)
+
+    import httpx
+    from langchain_openai import ChatOpenAI
+    limits = httpx.Limits(max_connections=max_concurrency, max_keepalive_connections=max_concurrency)
+    return ChatOpenAI(
+        openai_api_key=os.getenv('OPENAI_API_KEY'),
+        temperature=0.7,
+        max_tokens=300,
+        request_timeout=timeout,
+        max_retries=0,
+        http_client=httpx.Client(limits=limits, timeout=timeout),
+        http_async_client=httpx.AsyncClient(limits=limits, timeout=timeout)
+    )
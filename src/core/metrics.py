@@ -0,0 +1,264 @@
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+import functools
+import inspect
+import math
+import time
+
+# Latency buckets in seconds, from sub-millisecond vector math up to slow LLM calls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class _CounterChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+
+class _GaugeChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        self.value -= amount
+
+    def set(self, value: float):
+        self.value = value
+
+
+class _HistogramChild:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class _Metric:
+    """A metric family: one child per label-value combination.
+
+    Children are created on first use and then reused, so hot paths should
+    look a child up once (e.g. at construction time) and keep it. Updates are
+    plain attribute increments without locks; under the GIL a rare lost
+    increment is accepted in exchange for near-zero recording cost.
+    """
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        if not self.labelnames:
+            self._children[()] = self._new_child()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values: str):
+        child = self._children.get(values)
+        if child is None:
+            child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def _label_text(self, values: Tuple[str, ...], extra: str = "") -> str:
+        pairs = [f'{name}="{value}"' for name, value in zip(self.labelnames, values)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def samples(self) -> List[str]:
+        return [
+            f"{self.name}{self._label_text(values)} {_format_value(child.value)}"
+            for values, child in sorted(self._children.items())
+        ]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0):
+        self._children[()].inc(amount)
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value: float):
+        self._children[()].set(value)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float):
+        self._children[()].observe(value)
+
+    def samples(self) -> List[str]:
+        lines = []
+        for values, child in sorted(self._children.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), child.counts):
+                cumulative += count
+                le = "+Inf" if bound == math.inf else _format_value(bound)
+                bucket_labels = self._label_text(values, 'le="' + le + '"')
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{self.name}_sum{self._label_text(values)} {_format_value(child.sum)}")
+            lines.append(f"{self.name}_count{self._label_text(values)} {child.count}")
+        return lines
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class MetricsRegistry:
+    """Holds metric families and renders them in the Prometheus text format.
+
+    Collectors are callables returning (name, kind, help, samples) tuples, for
+    components that already keep their own statistics (e.g. caches); they are
+    only called when /metrics is scraped.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: Dict[str, Callable[[], Iterable[tuple]]] = {}
+
+    def _register(self, metric: _Metric) -> _Metric:
+        return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def set_collector(self, key: str, collector: Callable[[], Iterable[tuple]]):
+        """Register (or replace) a scrape-time collector"""
+        self._collectors[key] = collector
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        for collector in list(self._collectors.values()):
+            for name, kind, documentation, samples in collector():
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    label_text = "{" + ",".join(f'{k}="{v}"' for k, v in labels.items()) + "}" if labels else ""
+                    lines.append(f"{name}{label_text} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def timed(histogram_child: _HistogramChild):
+    """Decorator recording a function's duration (sync or async) in a histogram child"""
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    histogram_child.observe(time.perf_counter() - start)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                histogram_child.observe(time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+REGISTRY = MetricsRegistry()
+
+NODE_DURATION = REGISTRY.histogram(
+    "helpdesk_node_duration_seconds", "Time spent in each workflow node", ("node",))
+REQUEST_DURATION = REGISTRY.histogram(
+    "helpdesk_request_duration_seconds", "Request processing time, excluding admission queue wait", ("endpoint",))
+REQUESTS_IN_FLIGHT = REGISTRY.gauge(
+    "helpdesk_requests_in_flight", "Requests currently being processed", ("endpoint",))
+ADMISSION_QUEUE_WAIT = REGISTRY.histogram(
+    "helpdesk_admission_queue_wait_seconds", "Time spent waiting for an admission slot, by pre-classified category",
+    ("category",))
+ADMISSION_REJECTIONS = REGISTRY.counter(
+    "helpdesk_admission_rejections_total", "Requests turned away by admission control", ("reason",))
+REQUESTS_BY_CATEGORY = REGISTRY.counter(
+    "helpdesk_requests_total", "Processed requests by category", ("category",))
+ESCALATIONS_BY_CATEGORY = REGISTRY.counter(
+    "helpdesk_escalations_total", "Escalated requests by category", ("category",))
+EMBEDDING_CALLS = REGISTRY.counter(
+    "helpdesk_embedding_calls_total", "Embedding model calls", ("operation",))
+EMBEDDING_TEXTS = REGISTRY.counter(
+    "helpdesk_embedding_texts_total", "Texts embedded", ("operation",))
+EMBEDDING_DURATION = REGISTRY.histogram(
+    "helpdesk_embedding_duration_seconds", "Embedding model call latency", ("operation",))
+EMBEDDING_ERRORS = REGISTRY.counter(
+    "helpdesk_embedding_errors_total", "Failed embedding model calls", ("operation",))
+LLM_CALLS = REGISTRY.counter(
+    "helpdesk_llm_calls_total", "LLM calls", ("mode",))
+LLM_DURATION = REGISTRY.histogram(
+    "helpdesk_llm_duration_seconds", "LLM call latency", ("mode",))
+LLM_ERRORS = REGISTRY.counter(
+    "helpdesk_llm_errors_total", "LLM calls that failed and fell back to the apology response", ("mode",))
+LLM_PROVIDER_CALLS = REGISTRY.counter(
+    "helpdesk_llm_provider_calls_total", "LLM provider attempts by result", ("provider", "result"))
+LLM_PROVIDER_DURATION = REGISTRY.histogram(
+    "helpdesk_llm_provider_duration_seconds", "Latency of successful LLM provider attempts", ("provider",))
+LLM_PROVIDER_IN_FLIGHT = REGISTRY.gauge(
+    "helpdesk_llm_provider_in_flight", "LLM provider attempts in progress", ("provider",))
+LLM_HEDGES = REGISTRY.counter(
+    "helpdesk_llm_hedges_total", "Hedged LLM requests sent after the p95 latency passed")
+LLM_FAILOVERS = REGISTRY.counter(
+    "helpdesk_llm_failovers_total", "LLM requests retried on the next provider after a failure")
+PROMPT_TOKENS = REGISTRY.histogram(
+    "helpdesk_prompt_tokens", "Approximate tokens per LLM prompt",
+    buckets=(64, 128, 256, 512, 1024, 2048, 4096, 8192))
+CONTEXT_TOKENS_TRIMMED = REGISTRY.counter(
+    "helpdesk_context_tokens_trimmed_total", "Knowledge context tokens removed by the context budget")
+KNOWLEDGE_RELOADS = REGISTRY.counter(
+    "helpdesk_knowledge_reloads_total", "Knowledge base reload attempts by result", ("result",))
+KNOWLEDGE_SECTIONS_EMBEDDED = REGISTRY.counter(
+    "helpdesk_knowledge_sections_embedded_total", "Knowledge sections embedded by reloads")
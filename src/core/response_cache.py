@@ -0,0 +1,145 @@
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Set, Tuple
+import numpy as np
+import itertools
+import os
+import threading
+import time
+
+
+class _CacheEntry:
+    __slots__ = ("key", "vector", "response", "created_at")
+
+    def __init__(self, key, vector, response, created_at):
+        self.key = key
+        self.vector = vector
+        self.response = response
+        self.created_at = created_at
+
+
+class SemanticResponseCache:
+    """LLM response cache for near-duplicate tickets.
+
+    Entries are grouped by category and the set of retrieved knowledge
+    sources, so a cached answer is only reused when it was grounded in the
+    same context. Within a group, a request whose embedding lies within
+    `max_distance` cosine distance of a cached request reuses its answer.
+
+    Eviction is LRU (`max_entries`) plus a TTL, and the whole cache is dropped
+    whenever the knowledge base version changes. Configured through
+    RESPONSE_CACHE_SIZE (0 disables), RESPONSE_CACHE_TTL (seconds) and
+    RESPONSE_CACHE_MAX_DISTANCE.
+    """
+
+    def __init__(self, max_entries: int = None, ttl_seconds: float = None, max_distance: float = None):
+        self.max_entries = max_entries if max_entries is not None else int(os.getenv('RESPONSE_CACHE_SIZE', '1000'))
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else float(os.getenv('RESPONSE_CACHE_TTL', '3600'))
+        self.max_distance = max_distance if max_distance is not None else float(os.getenv('RESPONSE_CACHE_MAX_DISTANCE', '0.05'))
+
+        self._entries: "OrderedDict[int, _CacheEntry]" = OrderedDict()
+        self._groups: Dict[Tuple[str, frozenset], Set[int]] = {}
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self.version = None
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    @staticmethod
+    def _group_key(category: str, sources: Iterable[str]) -> Tuple[str, frozenset]:
+        return category, frozenset(sources)
+
+    @staticmethod
+    def _normalize(embedding) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _remove(self, entry_id: int):
+        entry = self._entries.pop(entry_id)
+        group = self._groups.get(entry.key)
+        if group is not None:
+            group.discard(entry_id)
+            if not group:
+                del self._groups[entry.key]
+
+    def lookup(self, embedding, category: str, sources: Iterable[str]) -> Optional[str]:
+        """Return a cached response for a near-duplicate request, if any"""
+        if not self.enabled or embedding is None:
+            return None
+
+        key = self._group_key(category, sources)
+        vector = self._normalize(embedding)
+        now = time.monotonic()
+
+        with self._lock:
+            best_id, best_similarity = None, -1.0
+            for entry_id in list(self._groups.get(key, ())):
+                entry = self._entries[entry_id]
+                if now - entry.created_at > self.ttl_seconds:
+                    self._remove(entry_id)
+                    self.expirations += 1
+                    continue
+                similarity = float(np.dot(vector, entry.vector))
+                if similarity > best_similarity:
+                    best_id, best_similarity = entry_id, similarity
+
+            if best_id is not None and 1.0 - best_similarity <= self.max_distance:
+                self._entries.move_to_end(best_id)
+                self.hits += 1
+                return self._entries[best_id].response
+
+            self.misses += 1
+            return None
+
+    def store(self, embedding, category: str, sources: Iterable[str], response: str):
+        if not self.enabled or embedding is None:
+            return
+
+        key = self._group_key(category, sources)
+        entry_id = next(self._ids)
+        with self._lock:
+            self._entries[entry_id] = _CacheEntry(key, self._normalize(embedding), response, time.monotonic())
+            self._groups.setdefault(key, set()).add(entry_id)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def set_version(self, version: str):
+        """Record the knowledge base version; a change drops every entry"""
+        with self._lock:
+            if self.version is not None and version != self.version:
+                self._entries.clear()
+                self._groups.clear()
+                self.invalidations += 1
+            self.version = version
+
+    def collect_metrics(self):
+        """Scrape-time samples for the metrics registry"""
+        return [
+            ("helpdesk_response_cache_entries", "gauge", "Cached LLM responses", [({}, len(self._entries))]),
+            ("helpdesk_response_cache_lookups_total", "counter", "Response cache lookups by result",
+             [({"result": "hit"}, self.hits), ({"result": "miss"}, self.misses)]),
+            ("helpdesk_response_cache_evictions_total", "counter", "Response cache removals by reason",
+             [({"reason": "lru"}, self.evictions), ({"reason": "ttl"}, self.expirations)])
+        ]
+
+    def get_stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations
+        }
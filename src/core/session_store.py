@@ -0,0 +1,150 @@
+from collections import OrderedDict
+from typing import List, Optional
+import numpy as np
+import os
+import threading
+import time
+
+from .state import ClassificationResult, KnowledgeItem, SessionContext
+
+# Rough fixed cost of an entry besides its vector and text, in bytes
+_ENTRY_OVERHEAD = 512
+
+
+class _Session:
+    __slots__ = ("request", "classification", "vector", "knowledge_items", "turns", "updated_at", "nbytes")
+
+    def __init__(self, request, classification, vector, knowledge_items, turns, updated_at):
+        self.request = request
+        self.classification = classification
+        self.vector = vector
+        self.knowledge_items = knowledge_items
+        self.turns = turns
+        self.updated_at = updated_at
+        self.nbytes = _session_bytes(request, vector, knowledge_items)
+
+
+def _session_bytes(request: str, vector: Optional[np.ndarray], knowledge_items: List[KnowledgeItem]) -> int:
+    items = sum(len(item.content) + len(item.source) for item in knowledge_items)
+    return _ENTRY_OVERHEAD + len(request) + items + (vector.nbytes if vector is not None else 0)
+
+
+class SessionStore:
+    """Context of each user's last ticket, so follow-ups can build on it.
+
+    A session keeps the ticket text, its classification, its query vector
+    (float32) and its retrieved knowledge items. Each session is capped at
+    `max_session_bytes`: the least relevant items are dropped first, then
+    the ticket text is truncated. Eviction is LRU (`max_sessions`) plus a TTL
+    since the user's last ticket. Configured through SESSION_STORE_SIZE
+    (0 disables), SESSION_TTL (seconds) and SESSION_MAX_BYTES.
+    """
+
+    def __init__(self, max_sessions: int = None, ttl_seconds: float = None, max_session_bytes: int = None):
+        self.max_sessions = max_sessions if max_sessions is not None else int(os.getenv('SESSION_STORE_SIZE', '10000'))
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else float(os.getenv('SESSION_TTL', '1800'))
+        self.max_session_bytes = max_session_bytes if max_session_bytes is not None else int(os.getenv('SESSION_MAX_BYTES', '16384'))
+
+        self._sessions: "OrderedDict[str, _Session]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.total_bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.follow_ups = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.trimmed_items = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_sessions > 0
+
+    def _remove(self, user_id: str):
+        self.total_bytes -= self._sessions.pop(user_id).nbytes
+
+    def get(self, user_id: Optional[str]) -> Optional[SessionContext]:
+        """The user's live session, if any"""
+        if not self.enabled or not user_id:
+            return None
+
+        with self._lock:
+            session = self._sessions.get(user_id)
+            if session is not None and time.monotonic() - session.updated_at > self.ttl_seconds:
+                self._remove(user_id)
+                self.expirations += 1
+                session = None
+            if session is None:
+                self.misses += 1
+                return None
+            self._sessions.move_to_end(user_id)
+            self.hits += 1
+
+        return SessionContext(
+            request=session.request,
+            classification=session.classification,
+            query_embedding=session.vector.tolist() if session.vector is not None else None,
+            knowledge_items=session.knowledge_items,
+            turns=session.turns
+        )
+
+    def update(self, user_id: Optional[str], request: str, classification: Optional[ClassificationResult],
+               query_embedding, knowledge_items: List[KnowledgeItem], follow_up: bool = False):
+        """Record a finished ticket as the user's latest context"""
+        if not self.enabled or not user_id or classification is None:
+            return
+
+        vector = np.asarray(query_embedding, dtype=np.float32) if query_embedding is not None else None
+        items = sorted(knowledge_items, key=lambda item: item.relevance_score, reverse=True)
+        trimmed = 0
+        while items and _session_bytes(request, vector, items) > self.max_session_bytes:
+            items.pop()
+            trimmed += 1
+        overflow = _session_bytes(request, vector, items) - self.max_session_bytes
+        if overflow > 0:
+            request = request[:max(0, len(request) - overflow)]
+
+        with self._lock:
+            previous = self._sessions.get(user_id)
+            turns = previous.turns + 1 if follow_up and previous is not None else 1
+            if previous is not None:
+                self._remove(user_id)
+            session = _Session(request, classification, vector, items, turns, time.monotonic())
+            self._sessions[user_id] = session
+            self.total_bytes += session.nbytes
+            self.trimmed_items += trimmed
+            self.follow_ups += follow_up
+            while len(self._sessions) > self.max_sessions:
+                self._remove(next(iter(self._sessions)))
+                self.evictions += 1
+
+    def collect_metrics(self):
+        """Scrape-time samples for the metrics registry"""
+        return [
+            ("helpdesk_sessions", "gauge", "Live user sessions", [({}, len(self._sessions))]),
+            ("helpdesk_session_bytes", "gauge", "Approximate memory held by user sessions",
+             [({}, self.total_bytes)]),
+            ("helpdesk_session_lookups_total", "counter", "Session lookups by result",
+             [({"result": "hit"}, self.hits), ({"result": "miss"}, self.misses)]),
+            ("helpdesk_session_follow_ups_total", "counter", "Tickets handled as a follow-up of the previous one",
+             [({}, self.follow_ups)]),
+            ("helpdesk_session_evictions_total", "counter", "Session removals by reason",
+             [({"reason": "lru"}, self.evictions), ({"reason": "ttl"}, self.expirations)])
+        ]
+
+    def get_stats(self) -> dict:
+        sessions = len(self._sessions)
+        return {
+            "sessions": sessions,
+            "max_sessions": self.max_sessions,
+            "ttl_seconds": self.ttl_seconds,
+            "max_session_bytes": self.max_session_bytes,
+            "total_bytes": self.total_bytes,
+            "mean_session_bytes": round(self.total_bytes / sessions) if sessions else 0,
+            "hits": self.hits,
+            "misses": self.misses,
+            "follow_ups": self.follow_ups,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "trimmed_items": self.trimmed_items
+        }
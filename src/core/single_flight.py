@@ -0,0 +1,89 @@
+from typing import Awaitable, Callable, Dict, Hashable, TypeVar
+import asyncio
+import os
+
+from .text import tokenize
+
+T = TypeVar("T")
+
+
+def coalescing_key(request: str) -> str:
+    """Case, punctuation and whitespace-insensitive form of a ticket's text"""
+    return " ".join(tokenize(request))
+
+
+class SingleFlight:
+    """Coalesces concurrent calls that share a key into one execution.
+
+    The first caller for a key starts the call as its own task; callers that
+    arrive with the same key while it is running await that task and receive
+    its result (or its exception) instead of starting another. The task is
+    not tied to any one caller, so a client that disconnects does not cancel
+    the call for the others. Nothing is kept once the call finishes; reusing
+    finished results is the response cache's job. Configured through
+    REQUEST_COALESCING (default true).
+    """
+
+    def __init__(self, enabled: bool = None):
+        self.enabled = enabled if enabled is not None else os.getenv('REQUEST_COALESCING', 'true').lower() == 'true'
+
+        # Bound lazily to the running event loop
+        self._loop = None
+        self._calls: Dict[Hashable, asyncio.Task] = {}
+        self._waiters: Dict[Hashable, int] = {}
+
+        self.executions = 0
+        self.coalesced = 0
+        self.largest_group = 0
+
+    async def run(self, key: Hashable, func: Callable[[], Awaitable[T]]) -> T:
+        if not self.enabled:
+            return await func()
+
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._calls = {}
+            self._waiters = {}
+
+        task = self._calls.get(key)
+        if task is None:
+            task = loop.create_task(func())
+            self._calls[key] = task
+            self._waiters[key] = 1
+            self.executions += 1
+            task.add_done_callback(lambda _, key=key: self._finish(key))
+        else:
+            self._waiters[key] += 1
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def _finish(self, key: Hashable):
+        self._calls.pop(key, None)
+        self.largest_group = max(self.largest_group, self._waiters.pop(key, 0))
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    def collect_metrics(self):
+        """Scrape-time samples for the metrics registry"""
+        return [
+            ("helpdesk_coalesced_in_flight", "gauge", "Distinct tickets being processed with coalescing",
+             [({}, self.in_flight)]),
+            ("helpdesk_coalescing_requests_total", "counter",
+             "Tickets that ran the workflow (leader) or waited on an identical in-flight run (coalesced)",
+             [({"role": "leader"}, self.executions), ({"role": "coalesced"}, self.coalesced)])
+        ]
+
+    def get_stats(self) -> dict:
+        requests = self.executions + self.coalesced
+        return {
+            "enabled": self.enabled,
+            "in_flight": self.in_flight,
+            "requests": requests,
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "coalesced_ratio": round(self.coalesced / requests, 4) if requests else 0.0,
+            "largest_group": self.largest_group
+        }
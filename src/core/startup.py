@@ -0,0 +1,105 @@
+from contextlib import contextmanager
+from typing import Callable, Dict, Generic, List, Optional, TypeVar
+import threading
+import time
+
+T = TypeVar("T")
+
+
+class StartupReport:
+    """Seconds spent in each named startup phase, in the order they ran"""
+
+    def __init__(self):
+        self.phases: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - start
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            phases = {name: round(seconds, 3) for name, seconds in self.phases.items()}
+        return {"phases": phases, "total_seconds": round(sum(phases.values()), 3)}
+
+    def summary(self) -> str:
+        report = self.as_dict()
+        parts = ", ".join(f"{name} {seconds:.2f}s" for name, seconds in report["phases"].items())
+        return f"{report['total_seconds']:.2f}s ({parts})"
+
+
+# Process-wide report filled in by the components as they initialize
+STARTUP_REPORT = StartupReport()
+
+
+class NotReady(Exception):
+    """The component is still starting, or failed to start"""
+
+
+class Readiness(Generic[T]):
+    """Builds a component on a background thread and tracks its state.
+
+    The state goes starting -> warming -> ready, or to failed with the
+    error. `factory` builds the component and each `warm_up` hook then runs
+    against it before it is handed out, so the first real request does not
+    pay for lazy initialization. `get` returns the component or raises
+    NotReady.
+    """
+
+    def __init__(self, factory: Callable[[], T], warm_up: List[Callable[[T], None]] = ()):
+        self.factory = factory
+        self.warm_up = list(warm_up)
+        self.state = "starting"
+        self.error: Optional[str] = None
+        self.started_at = time.perf_counter()
+        self.ready_after: Optional[float] = None
+        self._component: Optional[T] = None
+        self._ready = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="readiness", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        try:
+            component = self.factory()
+            self.state = "warming"
+            for hook in self.warm_up:
+                hook(component)
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {e}"
+            self.state = "failed"
+            print(f"Warning: startup failed: {self.error}")
+        else:
+            self._component = component
+            self.ready_after = time.perf_counter() - self.started_at
+            self.state = "ready"
+        finally:
+            self._ready.set()
+
+    @property
+    def ready(self) -> bool:
+        return self.state == "ready"
+
+    def wait(self, timeout: float = None) -> bool:
+        self._ready.wait(timeout)
+        return self.ready
+
+    def get(self) -> T:
+        if not self.ready:
+            raise NotReady(self.error or f"still {self.state}")
+        return self._component
+
+    def status(self) -> dict:
+        return {
+            "status": self.state,
+            "error": self.error,
+            "seconds_since_start": round(time.perf_counter() - self.started_at, 3),
+            "ready_after_seconds": round(self.ready_after, 3) if self.ready_after is not None else None
+        }
@@ -17,9 +17,26 @@ class KnowledgeItem(BaseModel):
     source: str
     relevance_score: float
 
+class CategoryScore(BaseModel):
+    category: RequestCategory
+    score: float
+
 class ClassificationResult(BaseModel):
     category: RequestCategory
     confidence: float
+    # "lexical" for the keyword fast path, "session" when a follow-up kept the
+    # previous ticket's category, "embedding" otherwise
+    method: str = "embedding"
+    # Best-scoring categories, highest first; close scores mark ambiguous tickets
+    top_categories: List[CategoryScore] = []
+
+class SessionContext(BaseModel):
+    """What the user's previous ticket left behind, offered to a follow-up"""
+    request: str
+    classification: ClassificationResult
+    query_embedding: Optional[List[float]] = None
+    knowledge_items: List[KnowledgeItem] = []
+    turns: int = 1
 
 # API Models
 class HelpDeskRequest(BaseModel):
@@ -30,17 +47,24 @@ class HelpDeskResponse(BaseModel):
     request: str
     user_id: Optional[str]
     classification: RequestCategory
+    classification_scores: List[CategoryScore] = []
     response: str
     escalate: bool
     escalation_reason: Optional[str] = None
+    # Approximate tokens sent to the LLM; None when no prompt was sent
+    prompt_tokens: Optional[int] = None
 
 # LangGraph State
 class HelpDeskState(TypedDict):
     request: str
     user_id: Optional[str]
+    query_embedding: Optional[List[float]]
     classification: Optional[ClassificationResult]
     knowledge_items: List[KnowledgeItem]
     escalate: bool
     escalation_reason: Optional[str]
     response: str
-    next_action: str
\ No newline at end of file
+    prompt_tokens: Optional[int]
+    next_action: str
+    # Previous ticket of the same user; cleared when the ticket starts a new topic
+    session: Optional[SessionContext]
\ No newline at end of file
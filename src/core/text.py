@@ -0,0 +1,29 @@
+from typing import List
+import re
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "but", "by", "can", "do", "for", "from", "get", "have",
+    "how", "i", "if", "in", "is", "it", "its", "me", "my", "not", "of", "on", "or", "so", "that", "the",
+    "this", "to", "was", "we", "what", "when", "with", "you", "your"
+}
+
+_SENTENCE_BOUNDARY = re.compile(r"\n+|(?<=[.!?])\s+")
+
+
+def tokenize(text: str) -> List[str]:
+    return re.findall(r"[a-z0-9]+", text.lower())
+
+
+def content_terms(text: str) -> set:
+    """Distinct tokens of a text without stopwords"""
+    return {token for token in tokenize(text) if token not in STOPWORDS}
+
+
+def split_sentences(text: str) -> List[str]:
+    """Sentences and markdown list items, stripped and non-empty"""
+    return [sentence.strip() for sentence in _SENTENCE_BOUNDARY.split(text) if sentence.strip()]
+
+
+def count_tokens(text: str) -> int:
+    """Approximate LLM token count (about four characters per token)"""
+    return (len(text) + 3) // 4
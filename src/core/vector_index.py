@@ -0,0 +1,138 @@
+from typing import Optional
+import math
+import os
+
+import faiss
+import numpy as np
+
+INDEX_TYPES = ('flat', 'ivf', 'hnsw', 'ivfpq', 'sq8')
+
+
+class VectorIndexConfig:
+    """Which FAISS index the knowledge base is stored in, and how it is searched.
+
+    - flat: exact search over float32 vectors (the default)
+    - ivf: inverted lists over `nlist` k-means cells, `nprobe` cells searched
+    - hnsw: graph index with `hnsw_m` links per node, `ef_search` candidates
+    - ivfpq: ivf with vectors compressed to `pq_m` codes of `pq_bits` bits each
+    - sq8: exact scan over vectors stored as int8, a quarter of the memory
+
+    IVF and SQ8 types are trained on the first `train_size` vectors indexed
+    (KNOWLEDGE_INDEX_TRAIN_SIZE, default 50000), or all of them for a smaller
+    corpus. An `nlist` of 0 picks sqrt(n) cells for n training vectors. A
+    corpus too small to train the chosen type is indexed flat instead. Every
+    type uses squared L2 distance like the flat index, so relevance scores
+    keep their meaning.
+
+    KNOWLEDGE_INDEX_TYPE, KNOWLEDGE_INDEX_NLIST (default 0),
+    KNOWLEDGE_INDEX_NPROBE (default 8), KNOWLEDGE_INDEX_HNSW_M (default 32),
+    KNOWLEDGE_INDEX_EF_SEARCH (default 64), KNOWLEDGE_INDEX_PQ_M (default 16)
+    and KNOWLEDGE_INDEX_PQ_BITS (default 8) configure it.
+    """
+
+    def __init__(self, index_type: str = None, nlist: int = None, nprobe: int = None,
+                 hnsw_m: int = None, ef_search: int = None, pq_m: int = None, pq_bits: int = None):
+        self.index_type = (index_type or os.getenv('KNOWLEDGE_INDEX_TYPE', 'flat')).lower()
+        if self.index_type not in INDEX_TYPES:
+            raise ValueError(f"Unknown index type {self.index_type!r}; expected one of {', '.join(INDEX_TYPES)}")
+        self.nlist = nlist if nlist is not None else int(os.getenv('KNOWLEDGE_INDEX_NLIST', '0'))
+        self.nprobe = nprobe if nprobe is not None else int(os.getenv('KNOWLEDGE_INDEX_NPROBE', '8'))
+        self.hnsw_m = hnsw_m if hnsw_m is not None else int(os.getenv('KNOWLEDGE_INDEX_HNSW_M', '32'))
+        self.ef_search = ef_search if ef_search is not None else int(os.getenv('KNOWLEDGE_INDEX_EF_SEARCH', '64'))
+        self.pq_m = pq_m if pq_m is not None else int(os.getenv('KNOWLEDGE_INDEX_PQ_M', '16'))
+        self.pq_bits = pq_bits if pq_bits is not None else int(os.getenv('KNOWLEDGE_INDEX_PQ_BITS', '8'))
+        self.train_sample = int(os.getenv('KNOWLEDGE_INDEX_TRAIN_SIZE', '50000'))
+
+    @property
+    def lossy(self) -> bool:
+        """Whether the index stores compressed codes instead of the vectors"""
+        return self.index_type in ('ivfpq', 'sq8')
+
+    @property
+    def train_size(self) -> int:
+        """Vectors to collect before building the index; 0 for types that need no training"""
+        # SQ8 learns each dimension's range; trained on too few vectors, later ones are clipped
+        return self.train_sample if self.index_type in ('ivf', 'ivfpq', 'sq8') else 0
+
+    def build_params(self) -> dict:
+        """Parameters baked into a built index; a change means rebuilding it"""
+        params = {"type": self.index_type}
+        if self.index_type in ('ivf', 'ivfpq'):
+            params["nlist"] = self.nlist
+        if self.index_type == 'ivfpq':
+            params.update(pq_m=self.pq_m, pq_bits=self.pq_bits)
+        if self.index_type == 'hnsw':
+            params["hnsw_m"] = self.hnsw_m
+        return params
+
+    def _nlist_for(self, count: int) -> int:
+        return self.nlist if self.nlist > 0 else max(1, int(math.sqrt(count)))
+
+    def _pq_m_for(self, dimension: int) -> int:
+        # Sub-quantizers must split the vector evenly
+        m = max(1, min(self.pq_m, dimension))
+        while dimension % m:
+            m -= 1
+        return m
+
+    def factory_string(self, count: int, dimension: int) -> str:
+        """faiss.index_factory description for `count` vectors, falling back to Flat"""
+        if self.index_type == 'hnsw':
+            return f"HNSW{self.hnsw_m}"
+        if self.index_type == 'sq8':
+            return "SQ8"
+        if self.index_type in ('ivf', 'ivfpq'):
+            nlist = self._nlist_for(count)
+            # Each k-means needs at least as many points as centroids
+            needed = max(nlist, 2 ** self.pq_bits) if self.index_type == 'ivfpq' else nlist
+            if count >= needed:
+                if self.index_type == 'ivf':
+                    return f"IVF{nlist},Flat"
+                return f"IVF{nlist},PQ{self._pq_m_for(dimension)}x{self.pq_bits}"
+            print(f"Warning: {count} vectors are too few to train a {self.index_type} index; using flat")
+        return "Flat"
+
+    def build(self, vectors: np.ndarray) -> faiss.Index:
+        """Create and train an empty index for vectors; the caller adds them"""
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        count, dimension = vectors.shape
+        index = faiss.index_factory(dimension, self.factory_string(count, dimension), faiss.METRIC_L2)
+        if not index.is_trained:
+            index.train(vectors)
+        self.configure(index)
+        return index
+
+    def configure(self, index: faiss.Index) -> faiss.Index:
+        """Apply the search-time parameters, also to indexes loaded from disk"""
+        ivf = _ivf(index)
+        if ivf is not None:
+            ivf.nprobe = min(self.nprobe, ivf.nlist)
+            # Lets reconstruct() find a vector's list entry
+            if ivf.direct_map.type == faiss.DirectMap.NoMap and ivf.ntotal == 0:
+                ivf.make_direct_map()
+        if isinstance(index, faiss.IndexHNSW):
+            index.hnsw.efSearch = self.ef_search
+        return index
+
+
+def _ivf(index: faiss.Index) -> Optional[faiss.IndexIVF]:
+    try:
+        return faiss.extract_index_ivf(index)
+    except RuntimeError:
+        return None
+
+
+def describe_index(index: faiss.Index) -> dict:
+    """Kind, size and search parameters of a built index"""
+    info = {"kind": type(index).__name__, "vectors": index.ntotal, "dimension": index.d}
+    ivf = _ivf(index)
+    if ivf is not None:
+        info.update(nlist=ivf.nlist, nprobe=ivf.nprobe)
+    if isinstance(index, faiss.IndexHNSW):
+        info["ef_search"] = index.hnsw.efSearch
+    try:
+        info["bytes_per_vector"] = index.sa_code_size()
+    except RuntimeError:
+        # No standalone codec, e.g. HNSW
+        pass
+    return info
@@ -1,58 +1,260 @@
 from langgraph.graph import StateGraph, END
-from ..core.state import HelpDeskState
+from langchain_core.language_models import BaseLanguageModel
+from langchain_core.runnables import RunnableLambda
+from typing import Any, AsyncIterator, List, Optional, Tuple
+import asyncio
+from ..core.metrics import (REGISTRY, NODE_DURATION, REQUESTS_BY_CATEGORY, ESCALATIONS_BY_CATEGORY,
+                            KNOWLEDGE_RELOADS, KNOWLEDGE_SECTIONS_EMBEDDED, timed)
+from ..core.knowledge_watcher import KnowledgeWatcher
+from ..core.startup import STARTUP_REPORT
+from ..core.state import HelpDeskState, RequestCategory, SessionContext
+from ..core.embeddings import EmbeddingService
+from ..core.escalation_queue import EscalationQueue
+from ..core.index_cache import IndexCache
+from ..core.response_cache import SemanticResponseCache
+from ..core.session_store import SessionStore
+from ..core.single_flight import SingleFlight, coalescing_key
 from ..agents.classifier_agent import ClassifierAgent
 from ..agents.knowledge_agent import KnowledgeAgent
 from ..agents.escalation_agent import EscalationAgent
 from ..agents.response_agent import ResponseAgent
 
 class HelpDeskWorkflow:
-    def __init__(self):
-        self.classifier_agent = ClassifierAgent()
-        self.knowledge_agent = KnowledgeAgent()
-        self.escalation_agent = EscalationAgent()
-        self.response_agent = ResponseAgent()
+    def __init__(self, embedding_service: EmbeddingService = None, index_cache: IndexCache = None,
+                 llm: BaseLanguageModel = None, escalation_queue: EscalationQueue = None):
+        # One embedding model per process, shared by every agent
+        with STARTUP_REPORT.phase("embedding_model"):
+            self.embedding_service = embedding_service or EmbeddingService()
+        # Persisted indexes so restarts skip re-embedding unchanged data
+        self.index_cache = index_cache or IndexCache()
         
-        self.workflow = self._build_workflow()
+        with STARTUP_REPORT.phase("knowledge_index"):
+            self.knowledge_agent = KnowledgeAgent(self.embedding_service, self.index_cache)
+        # The lexical fast path indexes the knowledge sections mapped to each category
+        with STARTUP_REPORT.phase("classifier"):
+            self.classifier_agent = ClassifierAgent(
+                self.embedding_service, self.index_cache, self.knowledge_agent.load_documents()
+            )
+        with STARTUP_REPORT.phase("escalation_rules"):
+            self.escalation_agent = EscalationAgent(self.embedding_service, self.index_cache)
+        with STARTUP_REPORT.phase("llm_clients"):
+            self.response_agent = ResponseAgent(SemanticResponseCache(), llm=llm)
+        self.response_agent.cache.set_version(self.knowledge_agent.version)
+        # Identical tickets arriving together share one workflow run
+        self.coalescer = SingleFlight()
+        # Each user's last ticket, reused by follow-ups
+        self.sessions = SessionStore()
+        # Escalated tickets are recorded for the support team off the request path
+        self.escalation_queue = escalation_queue or EscalationQueue()
+        
+        # Per-category outcome counters, resolved once up front
+        self._requests_by_category = {c.value: REQUESTS_BY_CATEGORY.labels(c.value) for c in RequestCategory}
+        self._escalations_by_category = {c.value: ESCALATIONS_BY_CATEGORY.labels(c.value) for c in RequestCategory}
+        if self.embedding_service.batcher is not None:
+            REGISTRY.set_collector("embedding_batcher", self.embedding_service.batcher.collect_metrics)
+        REGISTRY.set_collector("response_cache", self.response_agent.cache.collect_metrics)
+        REGISTRY.set_collector("request_coalescing", self.coalescer.collect_metrics)
+        REGISTRY.set_collector("sessions", self.sessions.collect_metrics)
+        REGISTRY.set_collector("escalation_queue", self.escalation_queue.collect_metrics)
+        if self.classifier_agent.lexical is not None:
+            REGISTRY.set_collector("lexical_classifier", self.classifier_agent.lexical.collect_metrics)
+        
+        with STARTUP_REPORT.phase("graph"):
+            self.workflow = self._build_workflow()
+            # Same graph without the LLM node, used when the response is streamed
+            self.triage_workflow = self._build_workflow(include_response=False)
+    
+    def warm_up(self, request: str = "How do I reset my password?"):
+        """Run one query through the embedding model and every index, without the LLM"""
+        vector = self.embedding_service.embed_query(request)
+        self.classifier_agent.classify_batch([vector])
+        self.knowledge_agent.vectorstore.similarity_search_with_score_by_vector(vector, k=1)
+    
+    def close(self):
+        """Flush buffered escalations to disk"""
+        self.escalation_queue.close()
     
-    def _build_workflow(self):
+    def reload_knowledge(self) -> dict:
+        """Re-embed changed knowledge sections and swap the index in place"""
+        try:
+            stats = self.knowledge_agent.reload()
+        except Exception:
+            KNOWLEDGE_RELOADS.labels("error").inc()
+            raise
+        KNOWLEDGE_RELOADS.labels("reloaded" if stats["reloaded"] else "unchanged").inc()
+        if stats["reloaded"]:
+            KNOWLEDGE_SECTIONS_EMBEDDED.inc(stats["embedded"])
+            self.classifier_agent.rebuild_lexical(self.knowledge_agent.load_documents())
+            # Answers generated from the old knowledge base are dropped
+            self.response_agent.cache.set_version(self.knowledge_agent.version)
+        return stats
+    
+    def reload_escalation_rules(self) -> dict:
+        """Recompile escalation rules after categories.json was edited"""
+        return self.escalation_agent.reload_rules()
+    
+    def knowledge_watcher(self, interval: float) -> KnowledgeWatcher:
+        return KnowledgeWatcher(self.knowledge_agent._source_files, self.reload_knowledge, interval)
+    
+    def _build_workflow(self, include_response: bool = True):
         # Create the state graph
         workflow = StateGraph(HelpDeskState)
         
-        # Add nodes (agents)
-        workflow.add_node("classify", self.classifier_agent.classify)
-        workflow.add_node("retrieve_knowledge", self.knowledge_agent.retrieve_knowledge)
-        workflow.add_node("check_escalation", self.escalation_agent.check_escalation)
-        workflow.add_node("generate_response", self.response_agent.generate_response)
+        # Add nodes (agents); each node has a sync and an async implementation
+        # so the same graph serves both invoke and ainvoke
+        workflow.add_node("classify", self._node(
+            "classify", self.classifier_agent.classify, self.classifier_agent.aclassify))
+        workflow.add_node("retrieve_knowledge", self._node(
+            "retrieve_knowledge", self.knowledge_agent.retrieve_knowledge, self.knowledge_agent.aretrieve_knowledge))
+        workflow.add_node("check_escalation", self._node(
+            "check_escalation", self.escalation_agent.check_escalation, self.escalation_agent.acheck_escalation))
+        if include_response:
+            workflow.add_node("generate_response", self._node(
+                "generate_response", self.response_agent.generate_response, self.response_agent.agenerate_response))
+        response_node = "generate_response" if include_response else END
         
-        # Define the workflow edges
+        # Define the workflow edges. Escalation is decided before retrieval so
+        # escalated tickets, which get a canned reply, skip retrieval entirely
         workflow.set_entry_point("classify")
         
-        workflow.add_edge("classify", "retrieve_knowledge")
-        workflow.add_edge("retrieve_knowledge", "check_escalation")
-        workflow.add_edge("check_escalation", "generate_response")
-        workflow.add_edge("generate_response", END)
+        workflow.add_edge("classify", "check_escalation")
+        workflow.add_conditional_edges(
+            "check_escalation",
+            self._route_after_escalation,
+            {"retrieve_knowledge": "retrieve_knowledge", "generate_response": response_node}
+        )
+        workflow.add_edge("retrieve_knowledge", response_node)
+        if include_response:
+            workflow.add_edge("generate_response", END)
         
         return workflow.compile()
     
-    def process_request(self, request: str, user_id: str = None) -> dict:
-        initial_state = HelpDeskState(
+    def _node(self, name: str, func, afunc) -> RunnableLambda:
+        # Both implementations record into the node's latency histogram
+        histogram = NODE_DURATION.labels(name)
+        return RunnableLambda(timed(histogram)(func), afunc=timed(histogram)(afunc))
+    
+    def _route_after_escalation(self, state: HelpDeskState) -> str:
+        # check_escalation points escalated tickets straight at generate_response
+        return state["next_action"]
+    
+    def _initial_state(self, request: str, user_id: str = None, session: SessionContext = None) -> HelpDeskState:
+        return HelpDeskState(
             request=request,
             user_id=user_id,
+            query_embedding=None,
             classification=None,
             knowledge_items=[],
             escalate=False,
             escalation_reason=None,
             response="",
-            next_action="classify"
+            prompt_tokens=None,
+            next_action="classify",
+            session=session
         )
-        
-        # Run the workflow
-        result = self.workflow.invoke(initial_state)
-        
+    
+    def _complete_request(self, result: HelpDeskState, request: str, user_id: str = None) -> dict:
+        # request and user_id are the caller's: a coalesced result carries the leader's
+        self.classifier_agent.record_agreement(result)
+        self.sessions.update(user_id, request, result["classification"], result.get("query_embedding"),
+                             result["knowledge_items"], follow_up=result.get("session") is not None)
+        classification = result["classification"]
+        if classification is not None:
+            category = classification.category.value
+            self._requests_by_category[category].inc()
+            if result["escalate"]:
+                self._escalations_by_category[category].inc()
+                self.escalation_queue.enqueue({
+                    "user_id": user_id,
+                    "category": category,
+                    "reason": result["escalation_reason"],
+                    "request": request,
+                    "confidence": classification.confidence,
+                    "classification_method": classification.method
+                })
         return {
             "classification": result["classification"],
             "response": result["response"],
             "knowledge_items": result["knowledge_items"],
             "escalate": result["escalate"],
-            "escalation_reason": result["escalation_reason"]
-        }
\ No newline at end of file
+            "escalation_reason": result["escalation_reason"],
+            "prompt_tokens": result["prompt_tokens"]
+        }
+    
+    def process_request(self, request: str, user_id: str = None) -> dict:
+        # Run the workflow
+        result = self.workflow.invoke(self._initial_state(request, user_id, self.sessions.get(user_id)))
+        return self._complete_request(result, request, user_id)
+    
+    async def aprocess_request(self, request: str, user_id: str = None) -> dict:
+        """Run the workflow without blocking the event loop.
+        
+        Concurrent tickets with the same normalized text wait on one run and
+        each get its result. Only the user's session makes a run user-specific,
+        so follow-ups are coalesced per user.
+        """
+        session = self.sessions.get(user_id)
+        key = coalescing_key(request)
+        if session is not None:
+            key = (key, user_id)
+        result = await self.coalescer.run(
+            key, lambda: self.workflow.ainvoke(self._initial_state(request, user_id, session))
+        )
+        return self._complete_request(result, request, user_id)
+    
+    async def astream_request(self, request: str, user_id: str = None) -> AsyncIterator[Tuple[str, Any]]:
+        """Run the workflow, yielding (event, data) pairs as results become available.
+        
+        Emits "classification" and "escalation" as soon as check_escalation
+        finishes, then one "token" per streamed chunk of the response, and
+        finally "result" with the same dict process_request returns.
+        """
+        state = self._initial_state(request, user_id, self.sessions.get(user_id))
+        
+        async for update in self.triage_workflow.astream(state, stream_mode="updates"):
+            for node, node_state in update.items():
+                state.update(node_state)
+                if node == "check_escalation":
+                    yield "classification", state["classification"]
+                    yield "escalation", {
+                        "escalate": state["escalate"],
+                        "escalation_reason": state["escalation_reason"]
+                    }
+        
+        async for token in self.response_agent.astream_response(state):
+            yield "token", token
+        
+        yield "result", self._complete_request(state, request, user_id)
+    
+    async def aprocess_batch(self, requests: List[Tuple[str, Optional[str]]], concurrency: int = 8) -> list:
+        """Process (request, user_id) pairs as one batch.
+        
+        Requests the lexical fast path can't classify are embedded and
+        classified once, vectorized, for the whole batch; the remaining nodes
+        (including the LLM call) run per request with at most `concurrency`
+        in flight; duplicate tickets share one run. Tickets are classified
+        without their users' sessions but still update them. Failed requests
+        are returned as their exception, in input order.
+        """
+        classifications = [self.classifier_agent.classify_lexical(request) for request, _ in requests]
+        pending = [i for i, classification in enumerate(classifications) if classification is None]
+        embeddings = [None] * len(requests)
+        if pending:
+            vectors = await self.embedding_service.aembed_queries([requests[i][0] for i in pending])
+            for i, vector, classification in zip(pending, vectors, self.classifier_agent.classify_batch(vectors)):
+                embeddings[i] = vector
+                classifications[i] = classification
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        async def invoke(state):
+            async with semaphore:
+                return await self.workflow.ainvoke(state)
+        
+        async def run(index):
+            state = self._initial_state(*requests[index])
+            state["query_embedding"] = embeddings[index]
+            state["classification"] = classifications[index]
+            result = await self.coalescer.run(coalescing_key(requests[index][0]), lambda: invoke(state))
+            return self._complete_request(result, *requests[index])
+        
+        return await asyncio.gather(*[run(i) for i in range(len(requests))], return_exceptions=True)
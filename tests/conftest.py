@@ -0,0 +1,66 @@
+import shutil
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import pytest
+
+from benchmarks.fakes import FakeEmbeddings, FakeLLM
+from src.core.embeddings import EmbeddingService
+from src.core.escalation_queue import EscalationQueue
+from src.core.help_desk_system import HelpDeskSystem
+from src.core.index_cache import IndexCache
+from src.workflows.helpdesk_workflow import HelpDeskWorkflow
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data')
+
+
+@pytest.fixture
+def fake_embeddings():
+    """Deterministic offline embeddings; `calls` and `texts_embedded` count model use"""
+    return FakeEmbeddings()
+
+
+@pytest.fixture
+def make_embedding_service():
+    """Factory for embedding services on offline embeddings, for tests that need several"""
+    def make(embeddings=None):
+        return EmbeddingService(model=embeddings if embeddings is not None else FakeEmbeddings(),
+                                model_name='fake-hash-384')
+    return make
+
+
+@pytest.fixture
+def embedding_service(make_embedding_service, fake_embeddings):
+    return make_embedding_service(fake_embeddings)
+
+
+@pytest.fixture
+def index_cache(tmp_path):
+    return IndexCache(str(tmp_path))
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    """Private copy of data/ that a test can edit"""
+    path = os.path.join(str(tmp_path), 'data')
+    shutil.copytree(DATA_DIR, path)
+    return path
+
+
+@pytest.fixture
+def workflow(embedding_service, index_cache, tmp_path):
+    """Workflow on offline embeddings whose LLM always answers 'Restart your network adapter.'"""
+    workflow = HelpDeskWorkflow(
+        embedding_service,
+        index_cache,
+        escalation_queue=EscalationQueue(os.path.join(str(tmp_path), 'escalations.db')),
+        llm=FakeLLM(response="Restart your network adapter.")
+    )
+    yield workflow
+    workflow.close()
+
+
+@pytest.fixture
+def help_desk(workflow):
+    return HelpDeskSystem(workflow)
@@ -0,0 +1,79 @@
+import asyncio
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from src.core.admission import AdmissionController, Overloaded
+
+
+def test_queued_requests_are_served_by_priority():
+    admission = AdmissionController(max_concurrency=1, max_queue=10, max_wait=5)
+    order = []
+
+    async def request(priority, label):
+        async with admission.admit(priority, label):
+            order.append(label)
+            await asyncio.sleep(0.01)
+
+    async def run():
+        first = asyncio.ensure_future(request(3, "first"))
+        await asyncio.sleep(0)
+        waiting = [asyncio.ensure_future(request(priority, label)) for priority, label in
+                   [(3, "password_reset"), (5, "policy_question"), (0, "security_incident")]]
+        await asyncio.gather(first, *waiting)
+
+    asyncio.run(run())
+    assert order == ["first", "security_incident", "password_reset", "policy_question"]
+    assert admission.get_stats()["active"] == 0
+
+
+def test_full_queue_sheds_the_lowest_priority_and_rejects_the_rest():
+    admission = AdmissionController(max_concurrency=1, max_queue=1, max_wait=5)
+
+    async def run():
+        held = await admission.acquire(3)
+        routine = asyncio.ensure_future(admission.acquire(3))
+        await asyncio.sleep(0)
+        urgent = asyncio.ensure_future(admission.acquire(0))
+        await asyncio.sleep(0)
+        try:
+            await admission.acquire(3)
+            rejected = None
+        except Overloaded as e:
+            rejected = e
+        held.release()
+        (await urgent).release()
+        return routine, rejected
+
+    routine, rejected = asyncio.run(run())
+    assert isinstance(routine.exception(), Overloaded) and routine.exception().reason == "shed"
+    assert rejected.status_code == 429 and rejected.retry_after >= 1
+    assert admission.get_stats()["rejections"] == {"queue_full": 1, "shed": 1, "timeout": 0}
+
+
+def test_queue_wait_times_out_with_503_and_cancelled_waiters_free_their_place():
+    admission = AdmissionController(max_concurrency=1, max_queue=10, max_wait=0.02)
+
+    async def run():
+        held = await admission.acquire(3)
+        try:
+            await admission.acquire(3)
+        except Overloaded as e:
+            timed_out = e
+        gone = asyncio.ensure_future(admission.acquire(3))
+        await asyncio.sleep(0)
+        gone.cancel()
+        await asyncio.sleep(0)
+        held.release()
+        return timed_out
+
+    timed_out = asyncio.run(run())
+    assert timed_out.status_code == 503
+    assert admission.get_stats()["active"] == 0 and admission.queue_depth == 0
+
+
+if __name__ == "__main__":
+    test_queued_requests_are_served_by_priority()
+    test_full_queue_sheds_the_lowest_priority_and_rejects_the_rest()
+    test_queue_wait_times_out_with_503_and_cancelled_waiters_free_their_place()
+    print("Admission tests passed")
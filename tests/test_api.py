@@ -0,0 +1,67 @@
+import asyncio
+import json
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src.api import routes
+
+
+@pytest.fixture
+def app(help_desk, monkeypatch):
+    """The API over the offline help desk, with one admission slot and no queue"""
+    monkeypatch.setenv('WARM_UP', 'false')
+    monkeypatch.setenv('ADMISSION_MAX_CONCURRENCY', '1')
+    monkeypatch.setenv('ADMISSION_QUEUE_SIZE', '0')
+    monkeypatch.setattr(routes, '_build_help_desk', lambda: help_desk)
+    return routes.create_app()
+
+
+@pytest.fixture
+def client(app):
+    with TestClient(app) as client:
+        assert app.state.readiness.wait(10)
+        yield client
+
+
+def test_batch_endpoint_streams_jsonl_results_in_input_order(client, monkeypatch):
+    monkeypatch.setenv('BATCH_CHUNK_SIZE', '2')
+    tickets = ["My password expired", "VPN keeps dropping", "My email stopped syncing", "I need to install Slack"]
+    lines = [json.dumps({"request": text}) for text in tickets]
+    lines.insert(1, "not json")
+
+    with client.stream("POST", "/support/batch", content="\n".join(lines)) as response:
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/x-ndjson"
+        outputs = [json.loads(line) for line in response.iter_lines() if line]
+
+    assert [output["line"] for output in outputs] == [1, 2, 3, 4, 5]
+    assert outputs[1]["error"].startswith("Invalid request")
+    assert [output["request"] for output in outputs if "error" not in output] == tickets
+
+
+def test_batch_is_admitted_per_chunk_and_rejected_with_429_when_full(app, client):
+    body = "\n".join(json.dumps({"request": text}) for text in ["My password expired", "VPN keeps dropping"])
+
+    response = client.post("/support/batch", content=body)
+    assert response.status_code == 200
+    assert [json.loads(line)["line"] for line in response.text.splitlines()] == [1, 2]
+    assert app.state.admission.active == 0
+
+    # An interactive request holds the only slot
+    held = asyncio.run(app.state.admission.acquire(3, "password_reset"))
+    try:
+        response = client.post("/support/batch", content=body)
+    finally:
+        held.release()
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+    assert app.state.admission.get_stats()["rejections"]["queue_full"] == 1
+
+
+if __name__ == "__main__":
+    # The tests use the fixtures in conftest.py
+    sys.exit(pytest.main([__file__, "-q"]))
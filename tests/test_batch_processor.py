@@ -0,0 +1,75 @@
+import asyncio
+import json
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import pytest
+
+from src.core.batch_processor import BatchProcessor, aiter_text_lines
+
+TICKETS = [
+    "My password expired",
+    "VPN keeps dropping",
+    "My email stopped syncing",
+    "I need to install Slack",
+    "The printer is jammed",
+]
+
+
+def run(processor, lines):
+    async def collect():
+        return [json.loads(line) async for line in processor.process_lines(aiter_text_lines(lines))]
+    return asyncio.run(collect())
+
+
+def test_invalid_lines_get_error_records_and_blank_lines_are_skipped(help_desk):
+    lines = [
+        json.dumps({"request": "My password expired", "user_id": "alice"}),
+        "",
+        "not json",
+        json.dumps({"user_id": "bob"}),
+        json.dumps({"request": "VPN keeps dropping"}),
+    ]
+
+    outputs = run(BatchProcessor(help_desk, chunk_size=64), lines)
+
+    assert [output["line"] for output in outputs] == [1, 3, 4, 5]
+    assert outputs[0]["request"] == "My password expired" and outputs[0]["user_id"] == "alice"
+    assert outputs[1]["error"].startswith("Invalid request")
+    assert outputs[2]["error"].startswith("Invalid request")
+    assert outputs[3]["request"] == "VPN keeps dropping" and "error" not in outputs[3]
+
+
+def test_results_keep_input_order_across_chunks(help_desk):
+    lines = [json.dumps({"request": text}) for text in TICKETS]
+    lines.insert(2, "{broken")
+
+    outputs = run(BatchProcessor(help_desk, chunk_size=2, concurrency=2), lines)
+
+    assert [output["line"] for output in outputs] == [1, 2, 3, 4, 5, 6]
+    assert [output.get("request") for output in outputs] == [*TICKETS[:2], None, *TICKETS[2:]]
+
+
+def test_each_chunk_is_streamed_before_the_next_is_read(help_desk):
+    lines_read = []
+
+    async def lines():
+        for number, text in enumerate(TICKETS, 1):
+            lines_read.append(number)
+            yield json.dumps({"request": text})
+
+    async def first_output():
+        outputs = BatchProcessor(help_desk, chunk_size=2).process_lines(lines())
+        first = json.loads(await outputs.__anext__())
+        await outputs.aclose()
+        return first
+
+    assert asyncio.run(first_output())["line"] == 1
+    # The first chunk is answered after reading the line that filled it
+    assert lines_read == [1, 2]
+
+
+if __name__ == "__main__":
+    # The tests use the fixtures in conftest.py
+    sys.exit(pytest.main([__file__, "-q"]))
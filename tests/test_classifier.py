@@ -0,0 +1,51 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import numpy as np
+import pytest
+
+from src.agents.classifier_agent import ClassifierAgent
+from src.core.state import RequestCategory
+
+
+@pytest.fixture
+def classifier(embedding_service, index_cache):
+    return ClassifierAgent(embedding_service, index_cache)
+
+
+def test_batch_matches_single_requests_and_ranks_top_k(classifier, fake_embeddings):
+    texts = [
+        "Network access issues including WiFi, VPN, and internet connectivity",
+        "Email setup, synchronization, and configuration issues",
+        "Potential security threats, malware, or suspicious activity"
+    ]
+    vectors = fake_embeddings.embed_documents(texts)
+
+    batch = classifier.classify_batch(vectors)
+    single = [classifier.classify_batch([vector])[0] for vector in vectors]
+
+    assert [r.category for r in batch] == [r.category for r in single] == [
+        RequestCategory.NETWORK_CONNECTIVITY, RequestCategory.EMAIL_CONFIGURATION, RequestCategory.SECURITY_INCIDENT
+    ]
+    for result in batch:
+        scores = [item.score for item in result.top_categories]
+        assert len(scores) == classifier.top_k
+        assert scores == sorted(scores, reverse=True)
+        assert np.isclose(scores[0], result.confidence)
+
+
+def test_per_category_threshold_falls_back_to_general(classifier, fake_embeddings):
+    vector = fake_embeddings.embed_query("Email setup, synchronization, and configuration issues")
+    email = classifier.category_names.index("email_configuration")
+
+    classifier.thresholds[email] = 1.01
+    result = classifier.classify_batch([vector])[0]
+
+    assert result.category == RequestCategory.GENERAL
+    assert result.top_categories[0].category == RequestCategory.EMAIL_CONFIGURATION
+
+
+if __name__ == "__main__":
+    # The tests use the fixtures in conftest.py
+    sys.exit(pytest.main([__file__, "-q"]))
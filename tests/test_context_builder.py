@@ -0,0 +1,48 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from src.core.context_builder import ContextBuilder
+from src.core.state import KnowledgeItem
+from src.core.text import count_tokens
+
+POLICY = (
+    "All laptops must use full disk encryption. "
+    "Personal software may only be installed with manager approval. "
+    "Software must come from an approved vendor list. "
+    "Printers are serviced every quarter by facilities. "
+    "Visitors must sign in at reception."
+)
+
+
+def test_items_that_fit_are_unchanged_and_irrelevant_ones_dropped():
+    builder = ContextBuilder(token_budget=400, relevance_floor=0.0)
+    items = [
+        KnowledgeItem(content="Reset at company.com/reset.", source="kb#Password", relevance_score=0.8),
+        KnowledgeItem(content="Unrelated section.", source="kb#Other", relevance_score=-0.5)
+    ]
+
+    context, full_tokens = builder.build("How do I reset my password?", items)
+
+    assert context == "Source: kb#Password\nContent: Reset at company.com/reset."
+    assert full_tokens > count_tokens(context)
+
+
+def test_budget_keeps_the_sentences_matching_the_request():
+    builder = ContextBuilder(token_budget=45, relevance_floor=-1.0)
+    items = [KnowledgeItem(content=POLICY, source="policies#Software", relevance_score=0.5)]
+
+    context, full_tokens = builder.build("Can I install personal software from any vendor?", items)
+
+    assert count_tokens(context) <= 45 < full_tokens
+    assert "Personal software may only be installed with manager approval." in context
+    assert "approved vendor" in context
+    assert "Visitors" not in context
+    # Selected sentences keep their original order
+    assert context.index("Personal software") < context.index("approved vendor")
+
+
+if __name__ == "__main__":
+    test_items_that_fit_are_unchanged_and_irrelevant_ones_dropped()
+    test_budget_keeps_the_sentences_matching_the_request()
+    print("Context builder tests passed")
@@ -0,0 +1,52 @@
+import asyncio
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from src.core.embedding_batcher import EmbeddingBatcher
+
+
+def test_concurrent_queries_share_batches():
+    """Concurrent callers are grouped into batched calls and get their own vector"""
+    calls = []
+
+    async def embed_batch(texts):
+        calls.append(list(texts))
+        await asyncio.sleep(0)
+        return [[float(len(text))] for text in texts]
+
+    batcher = EmbeddingBatcher(embed_batch, max_batch_size=8, window_ms=5)
+
+    async def run():
+        texts = ["x" * i for i in range(1, 21)]
+        return texts, await asyncio.gather(*[batcher.embed(text) for text in texts])
+
+    texts, vectors = asyncio.run(run())
+
+    assert vectors == [[float(len(text))] for text in texts]
+    assert all(len(batch) <= 8 for batch in calls)
+    assert len(calls) < len(texts)
+
+    stats = batcher.get_stats()
+    assert stats["requests"] == 20
+    assert stats["batches"] == len(calls)
+    assert stats["queue_depth"] == 0
+
+
+def test_batch_errors_reach_every_caller():
+    async def embed_batch(texts):
+        raise RuntimeError("provider down")
+
+    batcher = EmbeddingBatcher(embed_batch, max_batch_size=4, window_ms=1)
+
+    async def run():
+        return await asyncio.gather(*[batcher.embed("vpn") for _ in range(3)], return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+
+if __name__ == "__main__":
+    test_concurrent_queries_share_batches()
+    test_batch_errors_reach_every_caller()
+    print("Embedding batcher tests passed")
@@ -0,0 +1,74 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import pytest
+
+from src.agents.escalation_agent import EscalationAgent
+from src.core.state import ClassificationResult, RequestCategory
+
+
+@pytest.fixture
+def agent(embedding_service, index_cache):
+    return EscalationAgent(embedding_service, index_cache)
+
+
+def state_for(request, category, confidence=0.9):
+    return {
+        "request": request,
+        "query_embedding": None,
+        "classification": ClassificationResult(category=category, confidence=confidence),
+        "escalate": False,
+        "escalation_reason": None,
+        "next_action": "check_escalation"
+    }
+
+
+def test_rules_come_from_categories_json(agent, fake_embeddings):
+    calls_before = fake_embeddings.calls
+
+    assert agent.auto_escalate_categories == {
+        RequestCategory.SECURITY_INCIDENT, RequestCategory.HARDWARE_FAILURE, RequestCategory.GENERAL
+    }
+    state = agent.check_escalation(state_for("Nobody in the whole office can reach the VPN",
+                                             RequestCategory.NETWORK_CONNECTIVITY))
+    assert state["escalate"]
+    assert state["escalation_reason"] == "Network Connectivity escalation detected"
+
+    state = agent.check_escalation(state_for("12 people on my team lost internet access",
+                                             RequestCategory.NETWORK_CONNECTIVITY))
+    assert state["escalate"]
+    # Keyword and regex rules don't need the request vector
+    assert fake_embeddings.calls == calls_before
+
+
+def test_trigger_phrases_match_by_vector(agent):
+
+    state = agent.check_escalation(state_for("Account security concerns", RequestCategory.PASSWORD_RESET))
+    assert state["escalate"]
+    assert state["escalation_reason"] == "Password Reset escalation detected"
+
+    state = agent.check_escalation(state_for("How do I change my password?", RequestCategory.PASSWORD_RESET))
+    assert not state["escalate"]
+    assert state["next_action"] == "retrieve_knowledge"
+
+    # Triggers of other categories are never consulted
+    state = agent.check_escalation(state_for("Account security concerns", RequestCategory.EMAIL_CONFIGURATION))
+    assert not state["escalate"]
+
+
+def test_low_confidence_uses_the_category_threshold(agent):
+    category = RequestCategory.SOFTWARE_INSTALLATION
+    agent.rules[category] = agent.rules[category]._replace(confidence_threshold=0.5)
+
+    state = agent.check_escalation(state_for("How do I install Slack?", category, confidence=0.4))
+    assert state["escalate"]
+    assert state["escalation_reason"] == "Low confidence in classification - human review needed"
+
+    state = agent.check_escalation(state_for("How do I install Slack?", category, confidence=0.6))
+    assert not state["escalate"]
+
+
+if __name__ == "__main__":
+    # The tests use the fixtures in conftest.py
+    sys.exit(pytest.main([__file__, "-q"]))
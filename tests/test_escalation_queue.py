@@ -0,0 +1,70 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import time
+
+from src.core.escalation_queue import EscalationDispatcher, EscalationQueue
+
+
+def ticket(i):
+    return {"user_id": f"user-{i}", "category": "security_incident", "reason": "Security incident escalation detected",
+            "request": f"Phishing email number {i}", "confidence": 0.9}
+
+
+def test_tickets_are_group_committed_and_flushed_on_close(tmp_path):
+    queue = EscalationQueue(os.path.join(str(tmp_path), 'escalations.db'), buffer_size=1000,
+                            batch_size=64, flush_interval_ms=20)
+    for i in range(300):
+        assert queue.enqueue(ticket(i))
+    queue.close()
+
+    assert not queue.enqueue(ticket(300))
+    stats = queue.get_stats()
+    assert stats["written"] == queue.count() == 300
+    assert stats["commits"] < 300
+    tickets = queue.read(after_id=10, limit=5)
+    assert [t["id"] for t in tickets] == [11, 12, 13, 14, 15]
+    assert tickets[0]["request"] == "Phishing email number 10" and tickets[0]["confidence"] == 0.9
+
+
+def test_full_buffer_drops_instead_of_blocking(tmp_path):
+    queue = EscalationQueue(os.path.join(str(tmp_path), 'escalations.db'), buffer_size=2, flush_interval_ms=200)
+    # The writer may take the first ticket before the others arrive
+    results = [queue.enqueue(ticket(i)) for i in range(10)]
+    queue.close()
+
+    assert results.count(False) == queue.get_stats()["dropped"] > 0
+    assert queue.count() == results.count(True)
+
+
+def test_dispatcher_redelivers_after_a_failure(tmp_path):
+    queue = EscalationQueue(os.path.join(str(tmp_path), 'escalations.db'), flush_interval_ms=1)
+    delivered, attempts = [], []
+
+    def deliver(tickets):
+        attempts.append(len(tickets))
+        if len(attempts) == 1:
+            raise ConnectionError("consumer down")
+        delivered.extend(t["user_id"] for t in tickets)
+
+    for i in range(3):
+        queue.enqueue(ticket(i))
+    queue.close()
+    dispatcher = EscalationDispatcher(queue, deliver, batch_size=2)
+
+    try:
+        dispatcher.dispatch_once()
+    except ConnectionError:
+        pass
+    while dispatcher.dispatch_once():
+        pass
+
+    assert delivered == ["user-0", "user-1", "user-2"]
+    assert queue.get_cursor("webhook") == 3
+    assert EscalationDispatcher(queue, deliver).dispatch_once() == 0
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,97 @@
+import json
+import multiprocessing
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import numpy as np
+
+from benchmarks.fakes import FakeEmbeddings
+from src.agents.knowledge_agent import KnowledgeAgent
+from src.core.embeddings import EmbeddingService
+from src.core.index_cache import IndexCache
+from src.core.ingestion import ChunkEmbedder, chunked, load_source
+from src.core.vector_index import VectorIndexConfig
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data')
+
+
+def write_tickets(path, count, start=0):
+    with open(path, 'a') as f:
+        for i in range(start, start + count):
+            f.write(json.dumps({"id": f"T-{i}", "title": f"Ticket {i}",
+                                "resolution": f"Cleared cache number {i} and restarted"}) + "\n")
+
+
+def test_loaders_stream_markdown_json_and_jsonl(tmp_path):
+    tickets = os.path.join(str(tmp_path), 'tickets.jsonl')
+    write_tickets(tickets, 3)
+    guides = os.path.join(str(tmp_path), 'guides.json')
+    with open(guides, 'w') as f:
+        json.dump([{"id": "vpn", "text": "Install the VPN client"}], f)
+
+    docs = list(load_source(tickets))
+    assert [doc.metadata['source'] for doc in docs] == ['tickets.jsonl#T-0', 'tickets.jsonl#T-1', 'tickets.jsonl#T-2']
+    assert docs[0].page_content == "Title: Ticket 0\nResolution: Cleared cache number 0 and restarted"
+    assert list(load_source(guides))[0].page_content == "Install the VPN client"
+    assert len(list(load_source(os.path.join(DATA_DIR, 'knowledge_base.md')))) == 5
+
+
+def test_process_pool_keeps_chunk_order():
+    texts = [f"printer {i} is jammed" for i in range(40)]
+    embedder = ChunkEmbedder(FakeEmbeddings().embed_documents, model_factory=FakeEmbeddings, workers=2)
+    try:
+        results = list(embedder.map((chunk, chunk) for chunk in chunked(texts, 7)))
+    finally:
+        embedder.close()
+
+    assert [text for chunk, _ in results for text in chunk] == texts
+    assert np.allclose(np.concatenate([vectors for _, vectors in results]), FakeEmbeddings().embed_documents(texts))
+
+
+def test_extra_sources_are_ingested_in_chunks(embedding_service, fake_embeddings, data_dir, tmp_path, monkeypatch):
+    write_tickets(os.path.join(data_dir, 'tickets.jsonl'), 500)
+    monkeypatch.setenv('KNOWLEDGE_SOURCES', 'tickets.jsonl')
+    monkeypatch.setenv('KNOWLEDGE_INGEST_CHUNK_SIZE', '64')
+    monkeypatch.setenv('KNOWLEDGE_INDEX_TRAIN_SIZE', '200')
+
+    agent = KnowledgeAgent(embedding_service, IndexCache(os.path.join(str(tmp_path), 'cache')), data_dir=data_dir,
+                           index_config=VectorIndexConfig('ivf', nprobe=64))
+
+    assert agent.last_ingestion["documents"] == len(agent.load_documents()) + 500
+    assert agent.vectorstore.index.ntotal == agent.last_ingestion["passages"]
+    assert fake_embeddings.calls >= 500 // 64
+    assert agent.get_index_info()["kind"] == "IndexIVFFlat"
+
+    write_tickets(os.path.join(data_dir, 'tickets.jsonl'), 10, start=500)
+    stats = agent.reload()
+    assert stats["embedded"] == 10 and stats["removed"] == 0
+    assert agent.vectorstore.index.ntotal == stats["passages"]
+    sources = {doc.metadata['source'] for doc in agent.vectorstore.docstore._dict.values()}
+    assert 'tickets.jsonl#T-509' in sources
+
+
+class PooledEmbeddingService(EmbeddingService):
+    """Fake model that ingestion workers can rebuild, so the process pool is used"""
+
+    def model_factory(self):
+        return FakeEmbeddings
+
+
+def test_worker_processes_are_shut_down_after_the_build(data_dir, tmp_path, monkeypatch):
+    write_tickets(os.path.join(data_dir, 'tickets.jsonl'), 200)
+    monkeypatch.setenv('KNOWLEDGE_SOURCES', 'tickets.jsonl')
+    monkeypatch.setenv('KNOWLEDGE_INGEST_CHUNK_SIZE', '32')
+    monkeypatch.setenv('KNOWLEDGE_INGEST_WORKERS', '2')
+
+    agent = KnowledgeAgent(PooledEmbeddingService(model=FakeEmbeddings(), model_name='fake-hash-384'),
+                           IndexCache(os.path.join(str(tmp_path), 'cache')), data_dir=data_dir)
+
+    assert agent.last_ingestion["documents"] == len(agent.load_documents()) + 200
+    assert multiprocessing.active_children() == []
+
+
+if __name__ == "__main__":
+    import pytest
+    # The tests use the fixtures in conftest.py
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,74 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import pytest
+
+from benchmarks.fakes import FakeEmbeddings
+from src.agents.knowledge_agent import KnowledgeAgent
+from src.core.index_cache import IndexCache
+
+
+@pytest.fixture
+def build_agent(make_embedding_service, data_dir, tmp_path):
+    """Knowledge agent over the test's data copy, sharing one index cache between agents"""
+    def build(embeddings=None):
+        return KnowledgeAgent(make_embedding_service(embeddings),
+                              IndexCache(os.path.join(str(tmp_path), 'cache')), data_dir=data_dir)
+    return build
+
+
+def test_reload_embeds_only_changed_sections(build_agent, fake_embeddings, data_dir):
+    agent = build_agent(fake_embeddings)
+    old_store, old_version = agent.vectorstore, agent.version
+
+    assert agent.reload() == {"reloaded": False, "version": old_version}
+
+    kb_file = os.path.join(data_dir, 'knowledge_base.md')
+    with open(kb_file, 'a') as f:
+        f.write("\n## Printer Jams\nOpen tray B and remove the crumpled paper.\n")
+    texts_before = fake_embeddings.texts_embedded
+
+    stats = agent.reload()
+
+    assert stats["reloaded"] and stats["embedded"] == 1 and stats["removed"] == 0
+    assert fake_embeddings.texts_embedded - texts_before == 1
+    assert agent.version != old_version
+    assert agent.vectorstore is not old_store
+    # The old index is untouched for requests still using it
+    assert old_store.index.ntotal == agent.vectorstore.index.ntotal - 1
+
+    query = fake_embeddings.embed_query("Open tray B and remove the crumpled paper.")
+    doc, _ = agent.vectorstore.similarity_search_with_score_by_vector(query, k=1)[0]
+    assert doc.metadata['source'] == 'knowledge_base.md#Printer Jams'
+
+
+def test_vectors_are_reused_from_index_cache(build_agent, data_dir):
+    build_agent()
+
+    embeddings = FakeEmbeddings()
+    restarted = build_agent(embeddings)
+    assert embeddings.texts_embedded == 0
+
+    policies_file = os.path.join(data_dir, 'company_it_policies.md')
+    with open(policies_file, 'a') as f:
+        f.write("\n## Badge Policy\nWear your badge at all times.\n")
+    assert restarted.reload()["embedded"] == 1
+    assert embeddings.texts_embedded == 1
+
+
+def test_long_sections_are_indexed_as_passages(build_agent, monkeypatch):
+    monkeypatch.setenv('KNOWLEDGE_PASSAGE_CHARS', '200')
+    agent = build_agent()
+
+    docs = agent.vectorstore.docstore._dict.values()
+    assert len(docs) > len(agent.load_documents())
+    # Passages end at sentence boundaries; only a single long sentence may exceed the limit
+    assert all(len(doc.page_content) <= 200 or '\n' not in doc.page_content
+               for doc in docs if 'passage' in doc.metadata)
+    assert any(doc.metadata.get('passage') == 1 for doc in docs)
+
+
+if __name__ == "__main__":
+    # The tests use the fixtures in conftest.py
+    sys.exit(pytest.main([__file__, "-q"]))
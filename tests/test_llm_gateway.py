@@ -0,0 +1,133 @@
+import asyncio
+import sys
+import os
+import time
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import pytest
+from langchain_core.language_models.llms import LLM
+from langchain_core.outputs import GenerationChunk
+from benchmarks.fakes import FakeLLM
+from src.core.llm_gateway import LLMGateway, LLMGatewayError, LLMProvider
+from src.core.metrics import LLM_HEDGES
+
+
+class BrokenLLM(LLM):
+    @property
+    def _llm_type(self) -> str:
+        return "broken"
+
+    def _call(self, prompt, stop=None, run_manager=None, **kwargs):
+        raise ConnectionError("provider down")
+
+    async def _acall(self, prompt, stop=None, run_manager=None, **kwargs):
+        raise ConnectionError("provider down")
+
+
+class StallingLLM(LLM):
+    """Streams one token, then hangs"""
+
+    @property
+    def _llm_type(self) -> str:
+        return "stalling"
+
+    def _call(self, prompt, stop=None, run_manager=None, **kwargs):
+        return "first"
+
+    async def _astream(self, prompt, stop=None, run_manager=None, **kwargs):
+        yield GenerationChunk(text="first")
+        await asyncio.sleep(5)
+        yield GenerationChunk(text=" never")
+
+
+def gateway(*llms, timeout=5.0, hedge_after=None, max_concurrency=2):
+    providers = [LLMProvider(f"p{i}", llm, max_concurrency=max_concurrency) for i, llm in enumerate(llms)]
+    if hedge_after is not None:
+        # Seed the rolling latency window so the p95 is known
+        providers[0].latencies.extend([hedge_after] * 20)
+    return LLMGateway(providers, timeout=timeout, hedge=True, hedge_min_samples=20)
+
+
+def test_failover_to_the_next_provider():
+    llm_gateway = gateway(BrokenLLM(), FakeLLM(response="from backup"))
+
+    assert llm_gateway.invoke("hi") == "from backup"
+    assert asyncio.run(llm_gateway.ainvoke("hi")) == "from backup"
+
+
+def test_hedged_request_beats_a_stalled_provider():
+    llm_gateway = gateway(FakeLLM(response="slow", latency_ms=3000), FakeLLM(response="fast", latency_ms=10),
+                          hedge_after=0.05)
+
+    start = time.perf_counter()
+    assert asyncio.run(llm_gateway.ainvoke("hi")) == "fast"
+    assert llm_gateway.invoke("hi") == "fast"
+    assert time.perf_counter() - start < 1.0
+
+
+def test_no_hedge_into_a_saturated_provider():
+    llm_gateway = gateway(FakeLLM(response="only", latency_ms=200), hedge_after=0.02, max_concurrency=1)
+    hedges = LLM_HEDGES.labels().value
+
+    assert asyncio.run(llm_gateway.ainvoke("hi")) == "only"
+    assert llm_gateway.invoke("hi") == "only"
+    assert LLM_HEDGES.labels().value == hedges
+    assert llm_gateway.hedges_skipped == 2
+
+
+def test_hedge_timer_starts_when_the_call_gets_a_slot():
+    # The second call queues ~150ms behind the first, then finishes 150ms
+    # after getting the slot: inside the 200ms p95, so it is never hedged
+    llm_gateway = gateway(FakeLLM(response="slow", latency_ms=150), FakeLLM(response="fast"),
+                          hedge_after=0.2, max_concurrency=1)
+    hedges = LLM_HEDGES.labels().value
+
+    async def two_calls():
+        return await asyncio.gather(llm_gateway.ainvoke("a"), llm_gateway.ainvoke("b"))
+
+    assert asyncio.run(two_calls()) == ["slow", "slow"]
+    assert LLM_HEDGES.labels().value == hedges
+
+
+def test_deadline_bounds_the_call():
+    llm_gateway = gateway(FakeLLM(latency_ms=2000), timeout=0.1)
+
+    start = time.perf_counter()
+    with pytest.raises(LLMGatewayError):
+        asyncio.run(llm_gateway.ainvoke("hi"))
+    assert time.perf_counter() - start < 1.0
+
+
+def test_stream_fails_over_before_the_first_token():
+    llm_gateway = gateway(BrokenLLM(), FakeLLM(response="streamed answer"))
+
+    async def collect():
+        return "".join([text async for text in llm_gateway.astream("hi")])
+
+    assert asyncio.run(collect()) == "streamed answer"
+
+
+def test_deadline_bounds_the_whole_stream():
+    llm_gateway = gateway(StallingLLM(), timeout=0.2)
+    received = []
+
+    async def collect():
+        async for text in llm_gateway.astream("hi"):
+            received.append(text)
+
+    start = time.perf_counter()
+    with pytest.raises(LLMGatewayError):
+        asyncio.run(collect())
+    assert received == ["first"]
+    assert time.perf_counter() - start < 1.0
+
+
+if __name__ == "__main__":
+    test_failover_to_the_next_provider()
+    test_hedged_request_beats_a_stalled_provider()
+    test_no_hedge_into_a_saturated_provider()
+    test_hedge_timer_starts_when_the_call_gets_a_slot()
+    test_deadline_bounds_the_call()
+    test_stream_fails_over_before_the_first_token()
+    test_deadline_bounds_the_whole_stream()
+    print("LLM gateway tests passed")
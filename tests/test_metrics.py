@@ -0,0 +1,50 @@
+import asyncio
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from src.core.metrics import MetricsRegistry, timed
+
+
+def test_render_counters_gauges_and_histograms():
+    registry = MetricsRegistry()
+    calls = registry.counter("calls_total", "Calls", ("mode",))
+    in_flight = registry.gauge("in_flight", "In flight")
+    latency = registry.histogram("latency_seconds", "Latency", ("node",), buckets=(0.1, 1.0))
+
+    calls.labels("invoke").inc()
+    calls.labels("invoke").inc(2)
+    in_flight.set(3)
+    latency.labels("classify").observe(0.05)
+    latency.labels("classify").observe(0.5)
+    registry.set_collector("cache", lambda: [("cache_entries", "gauge", "Entries", [({}, 7)])])
+
+    text = registry.render()
+    assert 'calls_total{mode="invoke"} 3' in text
+    assert "in_flight 3" in text
+    assert 'latency_seconds_bucket{node="classify",le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{node="classify",le="+Inf"} 2' in text
+    assert 'latency_seconds_count{node="classify"} 2' in text
+    assert "# TYPE cache_entries gauge" in text and "cache_entries 7" in text
+
+
+def test_timed_records_sync_and_async():
+    child = MetricsRegistry().histogram("duration_seconds", "Duration", ("node",)).labels("x")
+
+    @timed(child)
+    def work():
+        return 1
+
+    @timed(child)
+    async def awork():
+        return 2
+
+    assert work() == 1
+    assert asyncio.run(awork()) == 2
+    assert child.count == 2
+
+
+if __name__ == "__main__":
+    test_render_counters_gauges_and_histograms()
+    test_timed_records_sync_and_async()
+    print("Metrics tests passed")
@@ -0,0 +1,51 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from src.core.response_cache import SemanticResponseCache
+
+SOURCES = ["knowledge_base.md#Password Management"]
+
+
+def test_near_duplicate_hits_and_distant_misses():
+    cache = SemanticResponseCache(max_entries=10, ttl_seconds=60, max_distance=0.05)
+    cache.store([1.0, 0.0, 0.0], "password_reset", SOURCES, "Use the reset portal.")
+
+    assert cache.lookup([0.99, 0.05, 0.0], "password_reset", SOURCES) == "Use the reset portal."
+    assert cache.lookup([0.0, 1.0, 0.0], "password_reset", SOURCES) is None
+    # Same vector but a different category or source set is a different answer
+    assert cache.lookup([1.0, 0.0, 0.0], "policy_question", SOURCES) is None
+    assert cache.lookup([1.0, 0.0, 0.0], "password_reset", []) is None
+
+    stats = cache.get_stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 3
+
+
+def test_lru_ttl_and_version_invalidation():
+    cache = SemanticResponseCache(max_entries=2, ttl_seconds=60, max_distance=0.01)
+    cache.store([1.0, 0.0], "general", [], "a")
+    cache.store([0.0, 1.0], "general", [], "b")
+    cache.lookup([1.0, 0.0], "general", [])
+    cache.store([-1.0, 0.0], "general", [], "c")
+
+    # "b" was least recently used
+    assert cache.lookup([0.0, 1.0], "general", []) is None
+    assert cache.lookup([1.0, 0.0], "general", []) == "a"
+    assert cache.get_stats()["evictions"] == 1
+
+    cache.set_version("v1")
+    cache.set_version("v2")
+    assert cache.get_stats()["entries"] == 0
+
+    expiring = SemanticResponseCache(max_entries=2, ttl_seconds=60, max_distance=0.01)
+    expiring.store([1.0, 0.0], "general", [], "a")
+    expiring.ttl_seconds = -1
+    assert expiring.lookup([1.0, 0.0], "general", []) is None
+    assert expiring.get_stats()["expirations"] == 1
+
+
+if __name__ == "__main__":
+    test_near_duplicate_hits_and_distant_misses()
+    test_lru_ttl_and_version_invalidation()
+    print("Response cache tests passed")
@@ -0,0 +1,51 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import time
+
+from src.core.session_store import SessionStore
+from src.core.state import ClassificationResult, KnowledgeItem, RequestCategory
+
+PASSWORD = ClassificationResult(category=RequestCategory.PASSWORD_RESET, confidence=0.8)
+
+
+def item(source, score, size=100):
+    return KnowledgeItem(content="x" * size, source=source, relevance_score=score)
+
+
+def test_sessions_are_evicted_lru_and_by_ttl():
+    store = SessionStore(max_sessions=2, ttl_seconds=60, max_session_bytes=65536)
+    for user in ("alice", "bob"):
+        store.update(user, "I am locked out", PASSWORD, [0.1] * 8, [item("kb#password", 0.9)])
+    store.get("alice")
+    store.update("carol", "I am locked out", PASSWORD, None, [])
+
+    assert store.get("bob") is None
+    session = store.get("alice")
+    assert session.classification.category == RequestCategory.PASSWORD_RESET
+    assert len(session.query_embedding) == 8 and session.knowledge_items[0].source == "kb#password"
+
+    store.ttl_seconds = 0.01
+    time.sleep(0.02)
+    assert store.get("alice") is None
+    stats = store.get_stats()
+    assert (stats["evictions"], stats["expirations"]) == (1, 1)
+
+
+def test_session_size_is_capped_by_dropping_least_relevant_items():
+    store = SessionStore(max_sessions=10, ttl_seconds=60, max_session_bytes=2048)
+    items = [item("kb#a", 0.5, 600), item("kb#b", 0.9, 600), item("kb#c", 0.7, 600)]
+    store.update("alice", "still locked out", PASSWORD, [0.0] * 64, items)
+    store.update("alice", "that did not work", PASSWORD, [0.0] * 64, items, follow_up=True)
+
+    session = store.get("alice")
+    assert [i.source for i in session.knowledge_items] == ["kb#b", "kb#c"]
+    assert session.turns == 2
+    assert store.get_stats()["total_bytes"] <= 2048
+
+
+if __name__ == "__main__":
+    test_sessions_are_evicted_lru_and_by_ttl()
+    test_session_size_is_capped_by_dropping_least_relevant_items()
+    print("Session store tests passed")
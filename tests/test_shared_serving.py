@@ -0,0 +1,52 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import numpy as np
+import pytest
+
+from benchmarks.fakes import FakeEmbeddings
+from src.agents.knowledge_agent import KnowledgeAgent
+from src.core.embedding_server import EmbeddingServer, RemoteEmbeddings
+from src.core.index_cache import IndexCache
+
+
+def test_remote_embeddings_match_the_served_model(embedding_service, tmp_path):
+    service = embedding_service
+    address = os.path.join(str(tmp_path), 'embeddings.sock')
+    server = EmbeddingServer(service, address, b'secret')
+    server.start()
+    try:
+        remote = RemoteEmbeddings(address, b'secret')
+        assert (remote.backend, remote.model_name) == ('custom', 'fake-hash-384')
+
+        texts = ["reset my password", "vpn keeps dropping"]
+        assert np.allclose(remote.embed_documents(texts), service.embed_documents(texts))
+        assert np.allclose(remote.embed_query(texts[0]), service.embed_query(texts[0]))
+        assert np.allclose(remote.embed_queries(texts), service.embed_queries(texts))
+    finally:
+        server.close()
+
+
+def test_workers_load_cached_index_memory_mapped(make_embedding_service, data_dir, tmp_path):
+    cache_dir = os.path.join(str(tmp_path), 'cache')
+    parent = KnowledgeAgent(make_embedding_service(), IndexCache(cache_dir, mmap=False), data_dir=data_dir)
+
+    embeddings = FakeEmbeddings()
+    worker = KnowledgeAgent(make_embedding_service(embeddings), IndexCache(cache_dir, mmap=True), data_dir=data_dir)
+
+    assert embeddings.texts_embedded == 0
+    assert worker.vectorstore.index.ntotal == parent.vectorstore.index.ntotal
+    state = {"request": "How do I reset my password?", "query_embedding": None}
+    worker.retrieve_knowledge(state)
+    assert state["knowledge_items"]
+    # Reloads rebuild in memory, reusing the vectors of the mapped index
+    with open(os.path.join(data_dir, 'knowledge_base.md'), 'a') as f:
+        f.write("\n## Printer Jams\nOpen tray B and remove the crumpled paper.\n")
+    stats = worker.reload()
+    assert stats["reloaded"] and stats["embedded"] == 1
+
+
+if __name__ == "__main__":
+    # The tests use the fixtures in conftest.py
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,66 @@
+import asyncio
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from src.core.single_flight import SingleFlight, coalescing_key
+
+
+def test_concurrent_duplicates_share_one_call():
+    calls = []
+
+    async def answer(text):
+        calls.append(text)
+        await asyncio.sleep(0.01)
+        return {"response": f"answer to {text}"}
+
+    flight = SingleFlight(enabled=True)
+
+    async def run():
+        requests = ["Email is down!"] * 5 + ["VPN drops"] * 2
+        return await asyncio.gather(*[flight.run(coalescing_key(text), lambda text=text: answer(text))
+                                      for text in requests])
+
+    results = asyncio.run(run())
+
+    assert sorted(calls) == ["Email is down!", "VPN drops"]
+    assert results[0] is results[4] and results[5]["response"] == "answer to VPN drops"
+    stats = flight.get_stats()
+    assert (stats["executions"], stats["coalesced"], stats["largest_group"]) == (2, 5, 5)
+    assert stats["in_flight"] == 0
+
+
+def test_key_ignores_case_punctuation_and_spacing():
+    assert coalescing_key("  EMAIL is down!!") == coalescing_key("email is   down") == "email is down"
+
+
+def test_followers_survive_a_cancelled_leader_and_share_errors():
+    flight = SingleFlight(enabled=True)
+
+    async def slow():
+        await asyncio.sleep(0.02)
+        return "done"
+
+    async def broken():
+        await asyncio.sleep(0)
+        raise RuntimeError("provider down")
+
+    async def run():
+        leader = asyncio.ensure_future(flight.run("k", slow))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flight.run("k", slow))
+        await asyncio.sleep(0)
+        leader.cancel()
+        errors = await asyncio.gather(flight.run("e", broken), flight.run("e", broken), return_exceptions=True)
+        return await follower, errors
+
+    result, errors = asyncio.run(run())
+    assert result == "done"
+    assert all(isinstance(error, RuntimeError) for error in errors)
+
+
+if __name__ == "__main__":
+    test_concurrent_duplicates_share_one_call()
+    test_key_ignores_case_punctuation_and_spacing()
+    test_followers_survive_a_cancelled_leader_and_share_errors()
+    print("Single-flight tests passed")
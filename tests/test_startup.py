@@ -0,0 +1,77 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src.api import routes
+from src.core.startup import NotReady, Readiness, StartupReport
+
+
+def test_component_is_handed_out_only_after_warm_up():
+    release = threading.Event()
+    warmed = []
+    readiness = Readiness(lambda: release.wait(5) and "system", warm_up=[warmed.append])
+    readiness.start()
+
+    assert readiness.status()["status"] == "starting"
+    with pytest.raises(NotReady):
+        readiness.get()
+
+    release.set()
+    assert readiness.wait(5)
+    assert readiness.get() == "system" and warmed == ["system"]
+    assert readiness.status()["ready_after_seconds"] is not None
+
+
+def test_failed_startup_reports_the_error():
+    def broken():
+        raise RuntimeError("index missing")
+
+    readiness = Readiness(broken)
+    readiness.start()
+
+    assert not readiness.wait(5)
+    assert readiness.status()["status"] == "failed"
+    assert "index missing" in readiness.status()["error"]
+
+
+def test_report_accumulates_phases_in_order():
+    report = StartupReport()
+    with report.phase("imports"):
+        pass
+    with report.phase("knowledge_index"):
+        pass
+    with report.phase("imports"):
+        pass
+
+    assert list(report.as_dict()["phases"]) == ["imports", "knowledge_index"]
+
+
+def test_health_answers_while_the_help_desk_is_still_being_built(help_desk, monkeypatch):
+    release = threading.Event()
+    monkeypatch.setenv('WARM_UP', 'false')
+    monkeypatch.setattr(routes, '_build_help_desk', lambda: release.wait(5) and help_desk)
+    app = routes.create_app()
+
+    with TestClient(app) as client:
+        try:
+            assert client.get("/health").status_code == 200
+            response = client.get("/ready")
+            assert response.status_code == 503
+            assert response.json()["status"] == "starting"
+            assert client.post("/support", json={"request": "My password expired"}).status_code == 503
+        finally:
+            release.set()
+
+        assert app.state.readiness.wait(5)
+        assert client.get("/ready").status_code == 200
+        assert client.get("/health").status_code == 200
+
+
+if __name__ == "__main__":
+    # The tests use the fixtures in conftest.py
+    sys.exit(pytest.main([__file__, "-q"]))
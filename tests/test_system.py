@@ -4,7 +4,7 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
 from src.core.help_desk_system import HelpDeskSystem
-from src.core.models import HelpDeskRequest
+from src.core.state import HelpDeskRequest
 from config.settings import Config
 
 def test_system():
@@ -28,7 +28,7 @@ def test_system():
         response = system.process_request(request)
         
         # Check classification accuracy
-        classification_correct = response.classification.category.value == test_case['expected_classification']
+        classification_correct = response.classification.value == test_case['expected_classification']
         if classification_correct:
             correct_classifications += 1
         
@@ -41,9 +41,8 @@ def test_system():
             'id': test_case['id'],
             'request': test_case['request'],
             'expected_category': test_case['expected_classification'],
-            'actual_category': response.classification.category.value,
+            'actual_category': response.classification.value,
             'classification_correct': classification_correct,
-            'confidence': response.classification.confidence,
             'expected_escalate': test_case['escalate'],
             'actual_escalate': response.escalate,
             'escalation_correct': escalation_correct,
@@ -51,7 +50,7 @@ def test_system():
         })
         
         print(f"Request {test_case['id']}: {test_case['request'][:50]}...")
-        print(f"  Category: {response.classification.category.value} (confidence: {response.classification.confidence:.2f})")
+        print(f"  Category: {response.classification.value}")
         print(f"  Escalate: {response.escalate}")
         print(f"  Response: {response.response[:100]}...")
         print()
@@ -0,0 +1,77 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import numpy as np
+import pytest
+
+from benchmarks.fakes import FakeEmbeddings
+from src.agents.knowledge_agent import KnowledgeAgent
+from src.core.index_cache import IndexCache
+from src.core.vector_index import INDEX_TYPES, VectorIndexConfig
+
+
+def clustered_vectors(count, dimension=64, clusters=20, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dimension))
+    vectors = centers[rng.integers(clusters, size=count)] + 0.3 * rng.normal(size=(count, dimension))
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+
+@pytest.mark.parametrize("index_type", INDEX_TYPES)
+def test_index_types_find_the_exact_neighbour(index_type):
+    vectors = clustered_vectors(1000)
+    # 4-bit codes keep product-quantizer training quick
+    config = VectorIndexConfig(index_type, nprobe=8, pq_bits=4)
+    index = config.build(vectors)
+    index.add(vectors)
+
+    _, found = index.search(vectors[:100], 1)
+    recall = float(np.mean(found[:, 0] == np.arange(100)))
+    assert recall >= (0.9 if config.lossy else 0.97)
+
+
+def test_small_corpus_falls_back_to_flat():
+    config = VectorIndexConfig('ivfpq')
+    assert config.factory_string(count=100, dimension=384) == "Flat"
+    assert config.factory_string(count=5000, dimension=384) == "IVF70,PQ16x8"
+
+
+def test_knowledge_agent_rebuilds_quantized_index_from_exact_vectors(make_embedding_service, data_dir, tmp_path):
+    cache_dir = os.path.join(str(tmp_path), 'cache')
+    build = lambda embeddings: KnowledgeAgent(
+        make_embedding_service(embeddings), IndexCache(cache_dir), data_dir=data_dir,
+        index_config=VectorIndexConfig('sq8')
+    )
+    build(FakeEmbeddings())
+
+    embeddings = FakeEmbeddings()
+    agent = build(embeddings)
+    assert embeddings.texts_embedded == 0
+    assert agent.get_index_info()["kind"] == "IndexScalarQuantizer"
+
+    with open(os.path.join(data_dir, 'knowledge_base.md'), 'a') as f:
+        f.write("\n## Printer Jams\nOpen tray B and remove the crumpled paper.\n")
+    assert agent.reload()["embedded"] == 1
+    # Reused vectors come from the saved float32 copy, not from the int8 codes
+    store = agent.vectorstore
+    exact = agent.index_cache.load_array('knowledge_vectors', agent._manifest())
+    for position, docstore_id in store.index_to_docstore_id.items():
+        doc = store.docstore.search(docstore_id)
+        assert np.array_equal(exact[position], embeddings.embed_query(doc.page_content))
+
+
+def test_sq8_is_trained_on_more_than_the_first_chunk(make_embedding_service, data_dir, tmp_path, monkeypatch):
+    monkeypatch.setenv('KNOWLEDGE_INGEST_CHUNK_SIZE', '4')
+    agent = KnowledgeAgent(make_embedding_service(), IndexCache(os.path.join(str(tmp_path), 'cache')),
+                           data_dir=data_dir, index_config=VectorIndexConfig('sq8'))
+
+    index = agent.vectorstore.index
+    exact = agent.index_cache.load_array('knowledge_vectors', agent._manifest())
+    # Dimension ranges learnt from a 4-vector chunk would clip most of the others
+    assert np.abs(index.reconstruct_n(0, index.ntotal) - exact).max() < 0.01
+
+
+if __name__ == "__main__":
+    # The tests use the fixtures in conftest.py
+    sys.exit(pytest.main([__file__, "-q"]))
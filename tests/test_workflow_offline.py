@@ -0,0 +1,144 @@
+import asyncio
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import pytest
+
+from benchmarks.fakes import FakeLLM
+from src.agents.response_agent import FALLBACK_MESSAGE
+from src.core.llm_gateway import LLMGateway
+from src.core.state import ClassificationResult, KnowledgeItem, RequestCategory
+
+
+def test_request_is_embedded_once(workflow, fake_embeddings):
+    calls_before = fake_embeddings.calls
+
+    # Answered rather than escalated, so it is classified, retrieved for and sent to the LLM
+    result = workflow.process_request("I can't connect to the VPN from home, the network connection keeps dropping")
+
+    assert fake_embeddings.calls - calls_before == 1
+    assert result["classification"].category == RequestCategory.NETWORK_CONNECTIVITY
+    assert not result["escalate"]
+    assert result["response"] == "Restart your network adapter."
+    assert result["knowledge_items"]
+    assert result["prompt_tokens"] > 0
+
+
+def test_escalated_requests_skip_retrieval(workflow):
+
+    def fail(*args, **kwargs):
+        raise AssertionError("retrieval should be skipped for escalated tickets")
+
+    workflow.knowledge_agent.retrieve_knowledge = fail
+    workflow.workflow = workflow._build_workflow()
+
+    state = workflow._initial_state("I clicked a link in a suspicious email")
+    state["classification"] = ClassificationResult(category=RequestCategory.SECURITY_INCIDENT, confidence=0.9)
+    result = workflow.workflow.invoke(state)
+
+    assert result["escalate"]
+    assert result["knowledge_items"] == []
+
+
+def test_async_and_streaming_paths_agree(workflow):
+    request = "Email setup, synchronization, and configuration issues with Outlook"
+
+    async def run():
+        result = await workflow.aprocess_request(request)
+        events = [event async for event in workflow.astream_request(request)]
+        return result, events
+
+    result, events = asyncio.run(run())
+    names = [name for name, _ in events]
+
+    assert names[:2] == ["classification", "escalation"]
+    assert names[-1] == "result"
+    streamed = "".join(data for name, data in events if name == "token").strip()
+    assert streamed == events[-1][1]["response"] == result["response"]
+
+
+def test_empty_answers_fall_back_and_are_not_cached(workflow):
+    workflow.response_agent.gateway = LLMGateway.from_env(FakeLLM(response="  "))
+    request = "Email setup, synchronization, and configuration issues with Outlook"
+
+    async def run():
+        events = [event async for event in workflow.astream_request(request)]
+        return events, await workflow.aprocess_request(request)
+
+    events, result = asyncio.run(run())
+    streamed = "".join(data for name, data in events if name == "token")
+
+    assert streamed == events[-1][1]["response"] == FALLBACK_MESSAGE
+    assert result["response"] == FALLBACK_MESSAGE
+    assert workflow.process_request(request)["response"] == FALLBACK_MESSAGE
+    assert workflow.response_agent.cache.get_stats()["entries"] == 0
+
+
+def test_concurrent_duplicate_tickets_share_one_run(workflow):
+    workflow.coalescer.enabled = True
+
+    async def run():
+        return await asyncio.gather(
+            workflow.aprocess_request("Email is down!", "alice"),
+            workflow.aprocess_request("email is down", "bob"),
+            workflow.aprocess_request("My printer is jammed", "carol")
+        )
+
+    first, second, other = asyncio.run(run())
+
+    assert first["response"] == second["response"]
+    assert workflow.coalescer.get_stats()["coalesced"] == 1
+    assert workflow.coalescer.get_stats()["executions"] == 2
+
+
+def test_coalesced_follower_keeps_its_own_ticket_in_its_session(workflow):
+    workflow.coalescer.enabled = True
+    workflow.sessions.max_sessions = 100
+
+    async def run():
+        return await asyncio.gather(
+            workflow.aprocess_request("Email is down!", "alice"),
+            workflow.aprocess_request("email is down", "bob")
+        )
+
+    asyncio.run(run())
+
+    assert workflow.coalescer.get_stats()["coalesced"] == 1
+    assert workflow.sessions.get("alice").request == "Email is down!"
+    assert workflow.sessions.get("bob").request == "email is down"
+
+
+def test_follow_up_reuses_the_previous_ticket(workflow):
+    workflow.sessions.max_sessions = 100
+    first = workflow.process_request("I forgot my password and I'm locked out of my account", "alice")
+    prompts = []
+    build_prompt = workflow.response_agent._build_prompt
+    workflow.response_agent._build_prompt = lambda state: prompts.append(build_prompt(state)) or prompts[-1]
+
+    follow_up = workflow.process_request("that didn't work, still nothing", "alice")
+    stranger = workflow.process_request("that didn't work, still nothing", "bob")
+
+    assert follow_up["classification"].category == first["classification"].category
+    assert follow_up["classification"].method == "session"
+    assert "locked out of my account\nFOLLOW-UP: that didn't work" in prompts[0]
+    assert stranger["classification"].method == "embedding"
+    assert workflow.sessions.get_stats()["follow_ups"] == 1
+
+
+def test_follow_up_merge_keeps_every_passage_of_a_source(workflow):
+    fresh = [KnowledgeItem(content="Reset it from the portal.", source="tickets.jsonl#T-1", relevance_score=0.9),
+             KnowledgeItem(content="Call the service desk.", source="tickets.jsonl#T-1", relevance_score=0.1)]
+    previous = [KnowledgeItem(content="Passwords expire every 90 days.", source="policies.md#Passwords",
+                              relevance_score=0.8)]
+
+    merged = workflow.knowledge_agent._merge_session_items(fresh, previous)
+
+    assert [item.content for item in merged] == [
+        "Reset it from the portal.", "Passwords expire every 90 days.", "Call the service desk."]
+    assert abs(merged[1].relevance_score - 0.6) < 1e-9
+
+
+if __name__ == "__main__":
+    # The tests use the fixtures in conftest.py
+    sys.exit(pytest.main([__file__, "-q"]))